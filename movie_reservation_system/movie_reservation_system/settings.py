@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'storages',
     'users',
     'movies'
@@ -73,6 +74,7 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'movie_reservation_system.urls'
 WSGI_APPLICATION = 'movie_reservation_system.wsgi.application'
+ASGI_APPLICATION = 'movie_reservation_system.asgi.application'
 
 # Templates
 TEMPLATES = [
@@ -102,6 +104,12 @@ DATABASES = {
     }
 }
 
+# Cache: local memory by default; point CACHE_URL at a shared backend
+# (e.g. redis://redis:6379/1) when running several workers
+CACHES = {
+    'default': env.cache("CACHE_URL", default="locmemcache://"),
+}
+
 # Storage
 if USE_AZURE_STORAGE:
     AZURE_ACCOUNT_NAME = env("AZURE_ACCOUNT_NAME")
@@ -139,7 +147,8 @@ else:
             "OPTIONS": {"location": os.path.join(BASE_DIR, "media")},
         },
         "staticfiles": {
-            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+            # Hashed names + .gz siblings, served by nginx (see nginx.conf)
+            "BACKEND": "movie_reservation_system.storage.CompressedManifestStaticFilesStorage",
         },
     }
 
@@ -166,7 +175,9 @@ AUTH_PASSWORD_VALIDATORS = [
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 LANGUAGE_CODE = 'en-us'
-TIME_ZONE = 'UTC'
+TIME_ZONE = env("TIME_ZONE", default="Europe/Kyiv")
+# Schedule days run from local midnight to local midnight in this zone
+CINEMA_TIME_ZONE = env("CINEMA_TIME_ZONE", default=TIME_ZONE)
 USE_I18N = True
 USE_TZ = True
 
@@ -180,3 +191,22 @@ MEDIA_ROOT = env("MEDIA_ROOT", default=os.path.join(BASE_DIR, "media"))
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = '/'
+
+# Seat holds: how long selected seats stay reserved while the user checks out
+SEAT_HOLD_SECONDS = env.int("SEAT_HOLD_SECONDS", default=300)
+
+# Live seat events (server-sent events, served through ASGI)
+SEAT_EVENTS_BROKER = env("SEAT_EVENTS_BROKER", default="movies.events.InProcessBroker")
+SEAT_EVENTS_HEARTBEAT_SECONDS = env.float("SEAT_EVENTS_HEARTBEAT_SECONDS", default=15)
+
+# Schedule pages: cached per day/movie for this many seconds, invalidated
+# when the schedule or a showtime's sold seat count changes
+SCHEDULE_CACHE_SECONDS = env.int("SCHEDULE_CACHE_SECONDS", default=60)
+
+# Movie search: movies.search.SimpleSearchBackend works without Postgres text search
+MOVIE_SEARCH_BACKEND = env("MOVIE_SEARCH_BACKEND", default="movies.search.PostgresSearchBackend")
+
+# Build resized poster variants right after a movie's poster URL changes.
+# This fetches and encodes the poster inside the saving request, so it is
+# off by default: run the build_poster_variants command (cron/worker) instead
+POSTER_VARIANTS_ON_SAVE = env.bool("POSTER_VARIANTS_ON_SAVE", default=False)
@@ -0,0 +1,60 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional: .br files are only written when it is installed
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".html", ".xml", ".ico"}
+# Don't bother compressing files smaller than this...
+MIN_COMPRESS_SIZE = 256
+# ...or whose compressed copy saves less than 5%.
+MIN_COMPRESS_RATIO = 0.95
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed file names) that also writes
+    precompressed ``.gz`` (and, with ``brotli`` installed, ``.br``) siblings
+    during ``collectstatic``, for nginx's ``gzip_static``.
+
+    Until ``collectstatic`` has written a manifest (development, tests),
+    unhashed names are used as they are.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as f:
+            content = f.read()
+        encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append((".br", lambda data: brotli.compress(data, quality=11)))
+        stat = os.stat(path)
+        for suffix, encode in encoders:
+            compressed = encode(content) if len(content) >= MIN_COMPRESS_SIZE else None
+            if compressed is None or len(compressed) > len(content) * MIN_COMPRESS_RATIO:
+                # nginx would otherwise keep serving a stale copy
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+                continue
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            # Same mtime as the original, so Last-Modified/ETag agree
+            os.utime(path + suffix, (stat.st_atime, stat.st_mtime))
@@ -1,33 +1,242 @@
-from django.contrib import admin
-from .models import MovieGenre, Movie, Hall, Showtime
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .booking import InvalidSeatsError, SeatsTakenError, book_seats, delete_booking, delete_bookings
+from .exports import bookings_of, export_response, is_asgi
+from .forms import BulkScheduleForm, CatalogImportForm
+from .imports import import_file
+from .models import Booking, MovieGenre, Movie, Hall, Order, Showtime, is_overlap_violation
+from .pagination import EstimatedCountPaginator
+from .scheduling import schedule_showtimes
+from .search import get_search_backend
 
 # Register your models here.
 
 
+@admin.action(description="Експорт бронювань (CSV)", permissions=['view'])
+def export_bookings_csv(modeladmin, request, queryset):
+    return export_response(bookings_of(queryset), 'csv', asynchronous=is_asgi(request))
+
+
+@admin.action(description="Експорт бронювань (JSONL)", permissions=['view'])
+def export_bookings_jsonl(modeladmin, request, queryset):
+    return export_response(bookings_of(queryset), 'jsonl', asynchronous=is_asgi(request))
+
+
+
+class OverlapErrorMixin:
+    """Report the showtime overlap constraint as a message instead of a 500."""
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except IntegrityError as e:
+            # Перевірка форми пройшла, але інший сеанс зайняв цей час раніше за збереження
+            if not is_overlap_violation(e):
+                raise
+            messages.error(request, "У цей час зал зайнятий: сеанси в залі накладаються. Змін не збережено.")
+            return redirect(request.get_full_path())
+
 
 @admin.register(MovieGenre)
 class GenreAdmin(admin.ModelAdmin):
     list_display = ('name',)
 
 @admin.register(Movie)
-class MovieAdmin(admin.ModelAdmin):
+class MovieAdmin(OverlapErrorMixin, admin.ModelAdmin):
     list_display = ('title', 'duration_minutes')
     search_fields = ('title',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_catalog_view),
+                 name='movies_movie_import_catalog'),
+        ] + super().get_urls()
+
+    def import_catalog_view(self, request):
+        """Upsert movies, genres and showtimes from an uploaded CSV/JSONL file."""
+        if not self.has_add_permission(request):
+            return redirect('admin:movies_movie_changelist')
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        report = None
+        if request.method == 'POST' and form.is_valid():
+            report = import_file(form.cleaned_data['file'], form.cleaned_data['format'] or None)
+            written = report.written
+            messages.success(
+                request,
+                f"Імпортовано фільмів: {written['movies']}, жанрів: {written['genres']}, "
+                f"сеансів: {written['showtimes']}; рядків з помилками: {len(report.errors)}.",
+            )
+            if not report.errors:
+                return redirect('admin:movies_movie_changelist')
+        return TemplateResponse(request, 'admin/movies/movie/import_catalog.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Імпорт каталогу',
+            'form': form,
+            'report': report,
+        })
 
 
 @admin.register(Showtime)
-class ShowtimeAdmin(admin.ModelAdmin):
-    list_display = ('movie', 'hall', 'start_time', 'price', 'created_at')
+class ShowtimeAdmin(OverlapErrorMixin, admin.ModelAdmin):
+    actions = (export_bookings_csv, export_bookings_jsonl)
+    list_display = ('movie', 'hall', 'start_time', 'price', 'occupancy', 'revenue', 'created_at')
     list_filter = ('hall', 'start_time', 'movie')
+    list_select_related = ('movie', 'hall')
     search_fields = ('movie__title',)
+    autocomplete_fields = ('movie', 'hall')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Заповненість і виручка рахуються в тому ж запиті, що й сторінка списку
+        revenue = Subquery(
+            Order.objects.filter(showtime=OuterRef('pk'))
+            .order_by()
+            .values('showtime')
+            .annotate(total=Sum('total_price'))
+            .values('total')
+        )
+        return super().get_queryset(request).annotate(
+            occupancy_percent=(
+                Cast('seats_sold', FloatField()) * 100
+                / NullIf(F('hall__rows') * F('hall__seats_per_row'), 0)
+            ),
+            revenue_total=Coalesce(revenue, Value(0), output_field=DecimalField(max_digits=12, decimal_places=2)),
+        )
+
+    @admin.display(description="Заповненість", ordering='occupancy_percent')
+    def occupancy(self, obj):
+        if obj.occupancy_percent is None:
+            return "—"
+        return f"{obj.occupancy_percent:.0f}% ({obj.seats_sold})"
+
+    @admin.display(description="Виручка", ordering='revenue_total')
+    def revenue(self, obj):
+        return obj.revenue_total
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        movies = get_search_backend().search(Movie.objects.all(), search_term)
+        return queryset.filter(movie__in=movies.values('pk')), False
+
+    def get_urls(self):
+        return [
+            path('bulk-schedule/', self.admin_site.admin_view(self.bulk_schedule_view),
+                 name='movies_showtime_bulk_schedule'),
+        ] + super().get_urls()
+
+    def bulk_schedule_view(self, request):
+        """Generate weeks of showtimes from a template, skipping hall overlaps."""
+        if not self.has_add_permission(request):
+            return redirect('admin:movies_showtime_changelist')
+        form = BulkScheduleForm(request.POST or None)
+        plan = None
+        if request.method == 'POST' and form.is_valid():
+            data = form.cleaned_data
+            try:
+                plan = schedule_showtimes(
+                    data['movies'], data['halls'], data['first_day'], data['weeks'] * 7, data['slots'],
+                    buffer_minutes=data['buffer_minutes'], price=data['price'], dry_run=data['dry_run'],
+                )
+            except ValidationError as e:
+                form.add_error(None, e)
+            else:
+                if not data['dry_run']:
+                    messages.success(
+                        request,
+                        f"Створено сеансів: {len(plan.showtimes)}, пропущено через накладки: {len(plan.conflicts)}.",
+                    )
+                    return redirect('admin:movies_showtime_changelist')
+        return TemplateResponse(request, 'admin/movies/showtime/bulk_schedule.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Розклад на кілька тижнів',
+            'form': form,
+            'plan': plan,
+        })
     
 @admin.register(Hall)
 class HallAdmin(admin.ModelAdmin):
     list_display = ("name", "rows", "seats_per_row", "total_seats")
+    search_fields = ("name",)
 
     def total_seats(self, obj):
         return obj.rows * obj.seats_per_row
     total_seats.short_description = "Всього місць"
 
 
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    actions = (export_bookings_csv, export_bookings_jsonl)
+    list_display = ('id', 'user', 'showtime', 'seat_count', 'total_price', 'created_at')
+    list_select_related = ('user', 'showtime__movie', 'showtime__hall')
+    raw_id_fields = ('user', 'showtime')
+    readonly_fields = ('seat_count', 'total_price')
+    search_fields = ('=user__email',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Order.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Місця звільняються через movies.booking; порожні замовлення вона видаляє сама
+        with transaction.atomic():
+            delete_bookings(Booking.objects.filter(order__in=queryset))
+            queryset.delete()
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    actions = (export_bookings_csv, export_bookings_jsonl)
+    list_display = ('id', 'showtime', 'seat', 'user', 'order', 'created_at')
+    list_select_related = ('showtime__movie', 'showtime__hall', 'seat__hall', 'user', 'order')
+    raw_id_fields = ('showtime', 'seat', 'user')
+    search_fields = ('=user__email',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_fields(self, request, obj=None):
+        # Замовлення створює book_seats
+        return ('showtime', 'seat', 'user') if obj is None else ('showtime', 'seat', 'user', 'order')
+
+    def get_readonly_fields(self, request, obj=None):
+        # Інше місце чи сеанс — це скасування і нове бронювання
+        return () if obj is None else ('showtime', 'seat', 'user', 'order')
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except InvalidSeatsError:
+            messages.error(request, "Це місце не належить залу цього сеансу.")
+        except SeatsTakenError as e:
+            messages.error(request, f"Місце вже зайняте або утримується іншим користувачем: {e}.")
+        return redirect(request.get_full_path())
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            return
+        # Як і при звичайному бронюванні: лічильник місць, версія і події для схеми залу
+        booking, = book_seats(obj.showtime, obj.user, [obj.seat_id])
+        obj.pk, obj.order, obj.created_at = booking.pk, booking.order, booking.created_at
+
+    def delete_model(self, request, obj):
+        delete_booking(obj)
+
+    def delete_queryset(self, request, queryset):
+        delete_bookings(queryset)
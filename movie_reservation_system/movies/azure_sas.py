@@ -1,13 +1,88 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
-from urllib.parse import quote
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from urllib.parse import quote, unquote
+
 from django.conf import settings
+from django.core.cache import cache
+
+# A cached SAS URL is handed out until this long before it expires, so the
+# browser still has time to load the poster.
+SAS_SAFETY_MARGIN = timedelta(minutes=10)
+# Tokens are valid from this long before their window started (clock skew).
+SAS_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def sas_validity(now, expiry_minutes=60):
+    """
+    ``(start, expiry)`` of a token signed at ``now``.
+
+    Time is cut into ``expiry_minutes`` windows and every token signed in
+    the same window gets the same start and expiry: one window before and
+    one window after its own. Signing is deterministic, so all processes
+    produce byte-identical URLs for a blob and browsers/CDNs can cache
+    posters across requests.
+    """
+    window = timedelta(minutes=expiry_minutes)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    window_start = epoch + (now - epoch) // window * window
+    return window_start - SAS_CLOCK_SKEW, window_start + 2 * window
+
 
 def generate_azure_read_sas_url(blob_name: str, expiry_minutes: int = 60) -> str:
     """
     Generate a SAS URL for reading a blob from Azure Blob Storage.
     """
+    return generate_azure_read_sas_urls([blob_name], expiry_minutes)[blob_name]
+
+
+def generate_azure_read_sas_urls(blob_names, expiry_minutes=60):
+    """
+    SAS URLs for several blobs, as ``{blob_name: url}``.
+
+    URLs are cached per blob until ``SAS_SAFETY_MARGIN`` before they expire;
+    all lookups of one call are a single cache round trip.
+    """
+    keys = {_cache_key(name, expiry_minutes): name for name in set(blob_names)}
+    urls = {keys[key]: url for key, url in cache.get_many(keys).items()}
+    missing = [name for name in keys.values() if name not in urls]
+    if not missing:
+        return urls
+
     now = datetime.now(timezone.utc)
+    start, expiry = sas_validity(now, expiry_minutes)
+    fresh = {name: _sign(name, start, expiry) for name in missing}
+    cache.set_many(
+        {_cache_key(name, expiry_minutes): url for name, url in fresh.items()},
+        timeout=int((expiry - SAS_SAFETY_MARGIN - now).total_seconds()),
+    )
+    urls.update(fresh)
+    return urls
+
+
+def media_blob_name(url):
+    """Blob name of a URL pointing into the media container, else ``None``."""
+    if not url or not url.startswith(settings.MEDIA_URL):
+        return None
+    return unquote(url[len(settings.MEDIA_URL):].split("?", 1)[0]) or None
+
+
+def sign_poster_urls(movies):
+    """Replace media-container poster URLs of ``movies`` with SAS URLs, in one batch."""
+    blobs = {movie.pk: media_blob_name(movie.poster_url) for movie in movies}
+    urls = generate_azure_read_sas_urls([name for name in blobs.values() if name])
+    for movie in movies:
+        if blobs[movie.pk]:
+            movie.poster_url = urls[blobs[movie.pk]]
+
+
+def _cache_key(blob_name, expiry_minutes):
+    digest = hashlib.sha1(blob_name.encode()).hexdigest()
+    return f"azure-sas:{settings.AZURE_MEDIA_CONTAINER}:{expiry_minutes}:{digest}"
+
+
+def _sign(blob_name, start, expiry):
+    # Imported here: the SDK is only needed (and installed) with USE_AZURE_STORAGE on
+    from azure.storage.blob import BlobSasPermissions, generate_blob_sas
 
     sas_token = generate_blob_sas(
         account_name=settings.AZURE_ACCOUNT_NAME,
@@ -15,11 +90,9 @@ def generate_azure_read_sas_url(blob_name: str, expiry_minutes: int = 60) -> str
         blob_name=blob_name,
         account_key=settings.AZURE_ACCOUNT_KEY,
         permission=BlobSasPermissions(read=True),
-        start=now - timedelta(minutes=5),
-        expiry=now + timedelta(minutes=expiry_minutes)
+        start=start,
+        expiry=expiry,
     )
 
     encoded_blob = quote(blob_name, safe='')
-    url = f"https://{settings.AZURE_ACCOUNT_NAME}.blob.core.windows.net/{settings.AZURE_MEDIA_CONTAINER}/{encoded_blob}?{sas_token}"
-
-    return url
\ No newline at end of file
+    return f"https://{settings.AZURE_ACCOUNT_NAME}.blob.core.windows.net/{settings.AZURE_MEDIA_CONTAINER}/{encoded_blob}?{sas_token}"
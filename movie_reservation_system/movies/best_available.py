@@ -0,0 +1,90 @@
+import re
+
+from .booking import BookingError, SeatsTakenError, book_seats
+from .seatmap import SeatMap
+
+# The "ideal" row sits this far back from the screen (0 = first row, 1 = last).
+IDEAL_ROW = 0.6
+# One row away from the ideal row weighs as much as this many seats sideways.
+ROW_WEIGHT = 1.5
+# Penalty for leaving a single free seat next to the block, which nobody
+# else is likely to buy.
+ORPHAN_PENALTY = 4.0
+
+# Largest group the booking page lets a user seat together.
+MAX_GROUP_SIZE = 10
+
+_FREE_RUN = re.compile(rb"0+")
+
+
+class NoContiguousSeatsError(BookingError):
+    """No row has enough free seats next to each other."""
+
+
+def find_best_block(rows, count):
+    """
+    Find the best block of ``count`` adjacent free seats.
+
+    ``rows`` is a sequence of availability strings (``"0"`` free, ``"1"``
+    taken), one per row, as produced by ``SeatMap.encode``. Returns
+    ``(row_index, first_seat_index)`` or ``None``.
+
+    Every free run is found with one regex scan per row and only a handful
+    of positions per run are scored (flush left, flush right and the one
+    closest to the centre), so the search is linear in the hall size.
+    Lower scores are better: distance of the block centre from the middle
+    of the row, distance of the row from the ideal row, and a penalty for
+    every orphaned single seat the block would leave behind.
+    """
+    if count <= 0 or not rows:
+        return None
+
+    ideal_row = (len(rows) - 1) * IDEAL_ROW
+    best, best_score = None, None
+    for row_index, bits in enumerate(rows):
+        row_score = abs(row_index - ideal_row) * ROW_WEIGHT
+        if best_score is not None and row_score >= best_score:
+            continue
+        if isinstance(bits, str):
+            bits = bits.encode()
+        middle = (len(bits) - count) / 2
+        for run in _FREE_RUN.finditer(bits):
+            start, end = run.span()
+            last = end - count
+            if last < start:
+                continue
+            centred = min(max(round(middle), start), last)
+            for first in {start, last, centred}:
+                score = row_score + abs(first - middle)
+                if first - start == 1:
+                    score += ORPHAN_PENALTY
+                if last - first == 1:
+                    score += ORPHAN_PENALTY
+                if best_score is None or score < best_score:
+                    best, best_score = (row_index, first), score
+    return best
+
+
+def book_best_available(showtime, user, count, attempts=3):
+    """
+    Book the best block of ``count`` adjacent seats for ``user``.
+
+    The block is chosen from a fresh seat map and booked atomically with
+    ``book_seats``; if somebody takes one of its seats in between, the
+    search is repeated up to ``attempts`` times.
+    """
+    for attempt in range(attempts):
+        seat_map = SeatMap.for_showtime(showtime, user)
+        block = find_best_block(list(seat_map.encode().values()), count)
+        if block is None:
+            raise NoContiguousSeatsError()
+
+        row_index, first = block
+        row = seat_map.rows[row_index]
+        by_number = {seat.number: seat.id for seat in row.seats}
+        seat_ids = [by_number[number] for number in range(first + 1, first + count + 1)]
+        try:
+            return book_seats(showtime, user, seat_ids)
+        except SeatsTakenError:
+            if attempt == attempts - 1:
+                raise
@@ -0,0 +1,319 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_schedule_version
+from .events import BOOKED, HELD, RELEASED, publish_seat_event
+from .models import Booking, Order, Seat, SeatHold, Showtime
+
+
+class BookingError(Exception):
+    """Base class for booking failures; nothing is written when it is raised."""
+
+    def __init__(self, seat_ids=(), labels=()):
+        self.seat_ids = sorted(seat_ids)
+        self.labels = list(labels)
+        super().__init__(", ".join(self.labels) or "no seats selected")
+
+
+class InvalidSeatsError(BookingError):
+    """Some of the requested seats do not belong to the showtime's hall."""
+
+
+class SeatsTakenError(BookingError):
+    """Some of the requested seats were booked or are held by somebody else."""
+
+
+def parse_seat_ids(raw_ids):
+    """Turn submitted seat ids into a set of ints, rejecting garbage."""
+    try:
+        return {int(seat_id) for seat_id in raw_ids}
+    except (TypeError, ValueError):
+        raise InvalidSeatsError()
+
+
+def book_seats(showtime, user, seat_ids):
+    """
+    Book all ``seat_ids`` for ``user`` or none of them.
+
+    Concurrent bookings of the same showtime are serialized on the showtime
+    row (whose seat version is bumped at the same time), the seats are
+    validated with a single query and the bookings are written with one
+    bulk insert, grouped under a new ``Order``. Seats held by other users
+    count as taken; the user's own holds on the showtime are converted and
+    released. Raises ``InvalidSeatsError`` or ``SeatsTakenError`` listing
+    exactly the offending seats.
+    """
+    seat_ids = set(seat_ids)
+    if not seat_ids:
+        raise InvalidSeatsError()
+
+    try:
+        return _book(showtime, user, seat_ids)
+    except IntegrityError:
+        # A booking slipped in without taking the showtime lock (e.g. the admin).
+        taken = _unavailable_seat_ids(showtime, user, seat_ids)
+        if not taken:
+            # It is gone again, or the conflict wasn't over a seat: try once
+            # more and let a second IntegrityError through.
+            return _book(showtime, user, seat_ids)
+        labels = {
+            seat_id: f"{row}{number}"
+            for seat_id, row, number in Seat.objects.filter(id__in=taken).values_list("id", "row", "number")
+        }
+        raise SeatsTakenError(taken, [labels[seat_id] for seat_id in sorted(taken)])
+
+
+def hold_seats(showtime, user, seat_ids, seconds=None):
+    """
+    Make ``seat_ids`` the user's current selection for the showtime.
+
+    Every selected seat gets a hold expiring ``seconds`` from now (default
+    ``settings.SEAT_HOLD_SECONDS``), holds on deselected seats are dropped.
+    All or nothing, like ``book_seats``. Returns the expiry time.
+    """
+    seat_ids = set(seat_ids)
+    seconds = settings.SEAT_HOLD_SECONDS if seconds is None else seconds
+    expires_at = timezone.now() + timedelta(seconds=seconds)
+
+    with transaction.atomic():
+        labels = _lock_and_validate(showtime, seat_ids)
+        _raise_if_unavailable(showtime, user, seat_ids, labels)
+
+        released = _drop_holds(showtime, user, keep=seat_ids)
+        if seat_ids:
+            # Expired holds of other users on these seats are simply taken over.
+            SeatHold.objects.bulk_create(
+                [SeatHold(showtime=showtime, seat_id=seat_id, user=user, expires_at=expires_at)
+                 for seat_id in sorted(seat_ids)],
+                update_conflicts=True,
+                unique_fields=["showtime", "seat"],
+                update_fields=["user", "expires_at"],
+            )
+        publish_seat_event(showtime.pk, RELEASED, released)
+        publish_seat_event(showtime.pk, HELD, seat_ids)
+    return expires_at
+
+
+def reap_expired_holds(batch_size=1000, now=None):
+    """
+    Delete one batch of expired holds, oldest first, using the expiry index.
+
+    The batch is picked and deleted in one transaction with its rows locked
+    (rows locked by a concurrent ``hold_seats`` are skipped), so a hold
+    renewed or taken over in the meantime keeps its seat. Returns the
+    number of deleted holds; call again while it equals ``batch_size``.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = list(
+            SeatHold.objects.select_for_update(skip_locked=True)
+            .filter(expires_at__lte=now)
+            .order_by("expires_at")
+            .values_list("id", "showtime_id", "seat_id")[:batch_size]
+        )
+        if not expired:
+            return 0
+        released = defaultdict(set)
+        for _, showtime_id, seat_id in expired:
+            released[showtime_id].add(seat_id)
+        deleted, _ = SeatHold.objects.filter(
+            id__in=[hold_id for hold_id, _, _ in expired], expires_at__lte=now
+        ).delete()
+        bump_seat_versions(released)
+        for showtime_id, seat_ids in released.items():
+            publish_seat_event(showtime_id, RELEASED, seat_ids)
+    return deleted
+
+
+def delete_booking(booking):
+    """
+    Cancel a single booking, updating its order's totals, the seat counter
+    and seat-map clients. An order left without seats is deleted.
+    """
+    delete_bookings(Booking.objects.filter(pk=booking.pk))
+
+
+def delete_bookings(bookings):
+    """
+    Cancel every booking of a queryset (e.g. an admin selection) like
+    ``delete_booking``, whether or not the showtime has started. Returns
+    ``{showtime_id: released seat ids}``.
+    """
+    with transaction.atomic():
+        return _cancel(bookings)
+
+
+def cancel_order(order):
+    """
+    Cancel all seats of an order at once. Returns the released seat ids
+    (empty if somebody cancelled it first).
+    """
+    with transaction.atomic():
+        released = _cancel(Booking.objects.filter(order=order))
+    return released.get(order.showtime_id, set())
+
+
+def cancel_bookings(user, booking_ids=(), showtime_ids=()):
+    """
+    Cancel the user's bookings among ``booking_ids`` plus all of their
+    bookings for ``showtime_ids``, in one transaction. Only bookings of
+    showtimes that have not started yet are touched; they are picked with a
+    single query. Returns ``{showtime_id: released seat ids}``.
+    """
+    if not booking_ids and not showtime_ids:
+        return {}
+    bookings = Booking.objects.filter(
+        Q(id__in=booking_ids) | Q(showtime_id__in=showtime_ids),
+        user=user,
+        order__starts_at__gt=timezone.now(),
+    )
+    with transaction.atomic():
+        return _cancel(bookings)
+
+
+def bump_seat_versions(showtime_ids, sold=0):
+    """
+    Invalidate the seat availability of the given showtimes, adjusting
+    their ``seats_sold`` counter by ``sold`` in the same statement. A new
+    count also invalidates the cached schedule, whose seat badges show it;
+    holds don't change it.
+    """
+    changes = {"seat_version": F("seat_version") + 1}
+    if sold:
+        changes["seats_sold"] = F("seats_sold") + sold
+        bump_schedule_version()
+    Showtime.objects.filter(pk__in=showtime_ids).update(**changes)
+
+
+def reconcile_seats_sold(showtimes=None):
+    """
+    Rebuild ``Showtime.seats_sold`` from the Booking table with a single
+    UPDATE; only rows whose counter drifted are touched. Returns the number
+    of corrected showtimes.
+    """
+    showtimes = Showtime.objects.all() if showtimes is None else showtimes
+    booked = Subquery(
+        Booking.objects.filter(showtime=OuterRef("pk"))
+        .order_by()
+        .values("showtime")
+        .annotate(n=Count("pk"))
+        .values("n"),
+        output_field=IntegerField(),
+    )
+    actual = Coalesce(booked, 0)
+    fixed = (
+        showtimes.annotate(actual=actual)
+        .exclude(seats_sold=F("actual"))
+        .update(seats_sold=actual, seat_version=F("seat_version") + 1)
+    )
+    if fixed:
+        bump_schedule_version()
+    return fixed
+
+
+def _cancel(bookings):
+    """
+    Delete ``bookings`` inside the caller's transaction with a constant
+    number of statements: one SELECT ... FOR UPDATE (a concurrent cancel
+    waits, then finds nothing), one DELETE, one UPDATE of the orders' totals
+    and one seat counter UPDATE per showtime. Returns
+    ``{showtime_id: released seat ids}``.
+    """
+    rows = list(
+        bookings.select_for_update(of=("self",)).order_by("id")
+        .values_list("id", "showtime_id", "order_id", "seat_id")
+    )
+    if not rows:
+        return {}
+    Booking.objects.filter(id__in=[booking_id for booking_id, _, _, _ in rows]).delete()
+
+    # Every seat of an order costs the same
+    removed = Counter(order_id for _, _, order_id, _ in rows)
+    seats = Case(*[When(pk=order_id, then=n) for order_id, n in removed.items()], output_field=IntegerField())
+    orders = Order.objects.filter(pk__in=removed)
+    orders.update(
+        seat_count=F("seat_count") - seats,
+        total_price=F("total_price") - F("total_price") / F("seat_count") * seats,
+    )
+    orders.filter(seat_count=0).delete()
+
+    released = defaultdict(set)
+    for _, showtime_id, _, seat_id in rows:
+        released[showtime_id].add(seat_id)
+    for showtime_id in sorted(released):
+        bump_seat_versions([showtime_id], sold=-len(released[showtime_id]))
+        publish_seat_event(showtime_id, RELEASED, released[showtime_id])
+    return dict(released)
+
+
+def _drop_holds(showtime, user, keep):
+    """Delete the user's holds on the showtime except ``keep``; return their seat ids."""
+    holds = SeatHold.objects.filter(showtime=showtime, user=user)
+    dropped = set(holds.values_list("seat_id", flat=True)) - set(keep)
+    if dropped:
+        holds.filter(seat_id__in=dropped).delete()
+    return dropped
+
+
+def _book(showtime, user, seat_ids):
+    with transaction.atomic():
+        labels = _lock_and_validate(showtime, seat_ids, sold=len(seat_ids))
+        _raise_if_unavailable(showtime, user, seat_ids, labels)
+
+        order = Order.objects.create(
+            user=user, showtime=showtime, starts_at=showtime.start_time,
+            seat_count=len(seat_ids), total_price=showtime.price * len(seat_ids),
+        )
+        bookings = Booking.objects.bulk_create([
+            Booking(showtime=showtime, seat_id=seat_id, user=user, order=order)
+            for seat_id in sorted(seat_ids)
+        ])
+        released = _drop_holds(showtime, user, keep=())
+        publish_seat_event(showtime.pk, BOOKED, seat_ids)
+        publish_seat_event(showtime.pk, RELEASED, released - seat_ids)
+        return bookings
+
+
+def _lock_and_validate(showtime, seat_ids, sold=0):
+    """Lock the showtime row and return ``{seat_id: label}`` for the hall's seats."""
+    # Bumping the version row-locks the showtime, so competing checkouts
+    # queue up behind us; a rollback undoes the bump (and ``sold``) as well.
+    bump_seat_versions([showtime.pk], sold=sold)
+    if not seat_ids:
+        return {}
+
+    labels = {
+        seat_id: f"{row}{number}"
+        for seat_id, row, number in Seat.objects.filter(
+            hall_id=showtime.hall_id, id__in=seat_ids
+        ).order_by().values_list("id", "row", "number")
+    }
+    invalid = seat_ids - labels.keys()
+    if invalid:
+        raise InvalidSeatsError(invalid)
+    return labels
+
+
+def _raise_if_unavailable(showtime, user, seat_ids, labels):
+    taken = _unavailable_seat_ids(showtime, user, seat_ids)
+    if taken:
+        raise SeatsTakenError(taken, [labels[seat_id] for seat_id in sorted(taken)])
+
+
+def _unavailable_seat_ids(showtime, user, seat_ids):
+    """Seats among ``seat_ids`` that are booked or actively held by someone else."""
+    if not seat_ids:
+        return set()
+    booked = Booking.objects.filter(showtime=showtime, seat_id__in=seat_ids).values_list("seat_id")
+    held = (
+        SeatHold.objects.filter(showtime=showtime, seat_id__in=seat_ids, expires_at__gt=timezone.now())
+        .exclude(user=user)
+        .values_list("seat_id")
+    )
+    return {seat_id for seat_id, in booked.union(held)}
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "schedule:version"
+
+
+def schedule_version():
+    """
+    Current schedule version; every cached schedule entry is keyed by it.
+
+    Starts from a timestamp so that a version key lost to eviction can never
+    come back with a value old entries were stored under.
+    """
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def bump_schedule_version():
+    """
+    Make every cached schedule entry unreachable.
+
+    The version is bumped right away and again once the surrounding
+    transaction commits, so a page rebuilt from not yet committed data in
+    between does not outlive the change.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def cached_schedule(key, build, version=None):
+    """
+    Return the cached value for ``key`` under the schedule version, calling
+    ``build`` to compute it on a miss.
+
+    Entries also expire after ``settings.SCHEDULE_CACHE_SECONDS``. Seat
+    badges stay current: a change of ``Showtime.seats_sold`` bumps the
+    version too (movies.booking).
+    """
+    version = schedule_version() if version is None else version
+    return cache.get_or_set(f"schedule:{version}:{key}", build, settings.SCHEDULE_CACHE_SECONDS)
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
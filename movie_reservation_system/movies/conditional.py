@@ -0,0 +1,58 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import schedule_version
+
+
+def _freshness_bucket():
+    """``(bucket, seconds left in it)`` of the SCHEDULE_CACHE_SECONDS clock."""
+    ttl = settings.SCHEDULE_CACHE_SECONDS
+    if ttl <= 0:
+        return time.time_ns(), 0
+    now = time.time()
+    return int(now // ttl), int(ttl - now % ttl) or ttl
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Validator of an anonymous catalog page, computed without rendering it.
+
+    It combines the schedule version (bumped whenever movies, halls,
+    showtimes or their sold seat counts change) with the
+    SCHEDULE_CACHE_SECONDS bucket that also bounds the cached fragments.
+    Logged-in users get none.
+    """
+    if request.user.is_authenticated:
+        return None
+    bucket, _ = _freshness_bucket()
+    return f'W/"{schedule_version()}.{bucket}"'
+
+
+def catalog_page(view):
+    """
+    Conditional GET support and cache headers for catalog pages.
+
+    Anonymous visitors get an ETag (answered with 304 when it still
+    matches) and a public response that nginx may keep until the freshness
+    bucket ends (``X-Accel-Expires``); browsers revalidate every time.
+    Pages of logged-in users are private and never cached or shared.
+    """
+    conditional_view = condition(etag_func=catalog_etag)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_vary_headers(response, ["Cookie"])
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        elif response.status_code in (200, 304):
+            _, seconds_left = _freshness_bucket()
+            patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+            response["X-Accel-Expires"] = seconds_left
+        return response
+
+    return wrapper
@@ -0,0 +1,101 @@
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+BOOKED = "booked"
+RELEASED = "released"
+HELD = "held"
+# Sent to a subscriber that fell behind; the client should refetch the seat map.
+SYNC = "sync"
+
+
+class Subscription:
+    __slots__ = ("loop", "queue", "overflowed")
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self):
+        if self.overflowed and self.queue.empty():
+            self.overflowed = False
+            return {"type": SYNC}
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Fans seat events out to subscribers living in this process.
+
+    The broker class is taken from ``settings.SEAT_EVENTS_BROKER``, so a
+    shared implementation (or a test stand-in) can replace it.
+
+    ``publish`` may be called from any thread; events are handed to each
+    subscriber's event loop. A subscriber whose queue fills up gets a
+    single ``sync`` event instead of the backlog.
+    """
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = Lock()
+
+    def publish(self, showtime_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(showtime_id, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription._put, event)
+
+    @contextmanager
+    def subscribe(self, showtime_id):
+        """Register a subscriber bound to the running event loop."""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[showtime_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscribers[showtime_id].discard(subscription)
+                if not self._subscribers[showtime_id]:
+                    del self._subscribers[showtime_id]
+
+    def subscriber_count(self, showtime_id):
+        with self._lock:
+            return len(self._subscribers.get(showtime_id, ()))
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.SEAT_EVENTS_BROKER)()
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    if setting == "SEAT_EVENTS_BROKER":
+        get_broker.cache_clear()
+
+
+def publish_seat_event(showtime_id, kind, seat_ids):
+    """Publish a seat event once the surrounding transaction commits."""
+    if not seat_ids:
+        return
+    event = {"type": kind, "seats": sorted(seat_ids)}
+    transaction.on_commit(lambda: get_broker().publish(showtime_id, event))
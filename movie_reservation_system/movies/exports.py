@@ -0,0 +1,132 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Booking
+from .schedule import cinema_timezone
+
+# Exported column -> ORM path (or annotation) on Booking
+BOOKING_COLUMNS = {
+    "booking_id": "id",
+    "booked_at": "created_at",
+    "order_id": "order_id",
+    "showtime_id": "showtime_id",
+    "starts_at": "showtime__start_time",
+    "movie": "showtime__movie__title",
+    "hall": "showtime__hall__name",
+    "seat_row": "seat__row",
+    "seat_number": "seat__number",
+    "price": "paid",
+    "user_email": "user__email",
+}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson; charset=utf-8", "jsonl"),
+}
+
+# Rows fetched per round trip of the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+
+def booking_rows(bookings, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one dict per booking, joined with its showtime, movie, hall, seat
+    and user, in booking order.
+
+    A single ``.values()`` query read through a server-side cursor: memory
+    use does not depend on how many bookings are exported. Times are in the
+    cinema's time zone.
+    """
+    paid = ExpressionWrapper(
+        F("order__total_price") / F("order__seat_count"), output_field=DecimalField(max_digits=9, decimal_places=2)
+    )
+    tz = cinema_timezone()
+    rows = (
+        bookings.annotate(paid=paid)
+        .order_by("id")
+        .values_list(*BOOKING_COLUMNS.values())
+        .iterator(chunk_size=chunk_size)
+    )
+    for values in rows:
+        row = dict(zip(BOOKING_COLUMNS, values))
+        row["booked_at"] = timezone.localtime(row["booked_at"], tz).isoformat()
+        row["starts_at"] = timezone.localtime(row["starts_at"], tz).isoformat()
+        row["price"] = round(row["price"], 2)
+        yield row
+
+
+class _Echo:
+    """File-like object handing back what ``csv.writer`` writes."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(BOOKING_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def export_lines(bookings, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    rows = booking_rows(bookings, chunk_size)
+    return csv_lines(rows) if fmt == "csv" else jsonl_lines(rows)
+
+
+async def aexport_lines(bookings, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    ``export_lines`` for ASGI, one piece per cursor chunk.
+
+    Under ASGI Django drains a sync iterator into a list before sending
+    anything. Here each chunk is read in the thread that owns the
+    connection (and so the cursor), and sent before the next one is read.
+    """
+    lines = export_lines(bookings, fmt, chunk_size)
+    next_chunk = sync_to_async(lambda: "".join(islice(lines, chunk_size)))
+    try:
+        while chunk := await next_chunk():
+            yield chunk
+    finally:
+        # a client that went away leaves the cursor open otherwise
+        await sync_to_async(lines.close)()
+
+
+def export_response(bookings, fmt, filename="bookings", asynchronous=False):
+    """
+    Stream the bookings as a CSV or JSONL download, starting right away.
+    Pass ``asynchronous=True`` when serving under ASGI.
+    """
+    content_type, extension = EXPORT_FORMATS[fmt]
+    lines = aexport_lines(bookings, fmt) if asynchronous else export_lines(bookings, fmt)
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{extension}"'
+    # Let nginx pass the rows on as they come instead of buffering the file
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+def bookings_of(queryset):
+    """Bookings behind an admin selection of bookings, orders or showtimes."""
+    if queryset.model is Booking:
+        return queryset
+    field = {"Order": "order__in", "Showtime": "showtime__in"}[queryset.model.__name__]
+    return Booking.objects.filter(**{field: queryset.values("pk")})
@@ -0,0 +1,39 @@
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import Movie, MovieGenre
+
+MovieGenres = Movie.genres.through
+
+
+def parse_genre_ids(raw_ids):
+    """Genre ids from the query string; blanks and garbage are ignored."""
+    return sorted({int(raw) for raw in raw_ids if raw.isdigit()})
+
+
+def filter_by_genres(queryset, genre_ids, match_all=False):
+    """
+    Movies having any (or, with ``match_all``, every) genre in ``genre_ids``.
+
+    Written as EXISTS subqueries on the M2M table rather than a join, so no
+    movie is repeated and no DISTINCT is needed.
+    """
+    if not genre_ids:
+        return queryset
+    has_genres = MovieGenres.objects.filter(movie=OuterRef("pk"))
+    if match_all:
+        for genre_id in genre_ids:
+            queryset = queryset.filter(Exists(has_genres.filter(moviegenre=genre_id)))
+        return queryset
+    return queryset.filter(Exists(has_genres.filter(moviegenre__in=genre_ids)))
+
+
+def genre_facets(movies=None):
+    """
+    All genres, each annotated with ``movie_count``: how many of ``movies``
+    (default: the whole catalogue) have it. A single aggregate query.
+    """
+    if movies is None:
+        movie_count = Count("movies")
+    else:
+        movie_count = Count("movies", filter=Q(movies__in=movies.values("pk")))
+    return MovieGenre.objects.annotate(movie_count=movie_count)
@@ -0,0 +1,36 @@
+from django import forms
+
+from .imports import IMPORT_FORMATS
+from .models import Hall, Movie
+from .scheduling import parse_slots
+
+
+class BulkScheduleForm(forms.Form):
+    """Weekly template for ``movies.scheduling.schedule_showtimes``."""
+    movies = forms.ModelMultipleChoiceField(queryset=Movie.objects.order_by("title"), label="Фільми")
+    halls = forms.ModelMultipleChoiceField(queryset=Hall.objects.order_by("name"), label="Зали")
+    first_day = forms.DateField(label="Перший день", widget=forms.DateInput(attrs={"type": "date"}))
+    weeks = forms.IntegerField(label="Тижнів", min_value=1, max_value=12, initial=4)
+    slots = forms.CharField(label="Час сеансів", initial="10:00, 13:30, 17:00, 20:30",
+                            help_text="Через кому, у часовому поясі кінотеатру")
+    buffer_minutes = forms.IntegerField(label="Прибирання залу, хв", min_value=0, max_value=240, initial=15)
+    price = forms.DecimalField(label="Ціна", max_digits=7, decimal_places=2, initial=120)
+    dry_run = forms.BooleanField(label="Лише перевірити, нічого не створювати", required=False)
+
+    def clean_slots(self):
+        try:
+            slots = parse_slots(self.cleaned_data["slots"])
+        except ValueError:
+            raise forms.ValidationError("Вкажіть час у форматі ГГ:ХХ через кому.")
+        if not slots:
+            raise forms.ValidationError("Вкажіть хоча б один час.")
+        return slots
+
+
+class CatalogImportForm(forms.Form):
+    """Upload for ``movies.imports.import_file``."""
+    file = forms.FileField(label="Файл", help_text="CSV із заголовком або JSONL, UTF-8")
+    format = forms.ChoiceField(
+        label="Формат", required=False,
+        choices=[("", "За розширенням файлу"), *((fmt, fmt.upper()) for fmt in IMPORT_FORMATS)],
+    )
@@ -0,0 +1,44 @@
+"""
+Poster resizing. Deliberately free of Django imports: ``render_variants``
+runs in worker processes of ``movies.posters.build_poster_variants``.
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+# Widths of the generated variants, for srcset
+POSTER_WIDTHS = (160, 320, 640)
+
+# format -> (Pillow format, extension, save options); best first
+ENCODINGS = {
+    "avif": ("AVIF", "avif", {"quality": 55}),
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def available_formats():
+    """Formats this Pillow build can encode; JPEG is always there as the fallback."""
+    return [fmt for fmt in ENCODINGS if fmt == "jpeg" or features.check(fmt)]
+
+
+def render_variants(data, widths=POSTER_WIDTHS, formats=None):
+    """
+    Resize an encoded image to each of ``widths`` (never upscaling) and
+    encode it in each format.
+
+    Returns ``[(format, width, extension, bytes)]``.
+    """
+    formats = formats or available_formats()
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        variants = []
+        for width in sorted({min(width, image.width) for width in widths}):
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                pil_format, extension, options = ENCODINGS[fmt]
+                out = BytesIO()
+                resized.save(out, pil_format, **options)
+                variants.append((fmt, width, extension, out.getvalue()))
+    return variants
@@ -0,0 +1,343 @@
+import csv
+import io
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import DurationField, Exists, ExpressionWrapper, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_schedule_version
+from .models import DEFAULT_DURATION_MINUTES, Booking, Hall, Movie, MovieGenre, Showtime, is_overlap_violation
+from .schedule import cinema_timezone
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_FORMATS = ("csv", "jsonl")
+MOVIE_FIELDS = ("title", "description", "duration_minutes", "poster_url")
+
+
+class ImportReport:
+    """Counts of upserted rows and ``(line, message)`` of rejected ones."""
+
+    __slots__ = ("written", "errors")
+
+    def __init__(self):
+        self.written = Counter()
+        self.errors = []
+
+
+def read_records(lines, fmt):
+    """
+    Yield ``(line number, dict)`` for each record of a CSV (with a header)
+    or JSONL text stream; a line that can't be parsed yields its error
+    message instead of a dict.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"некоректний JSON: {e}"
+            continue
+        yield line_number, record if isinstance(record, dict) else "очікувався JSON-об'єкт"
+
+
+def import_file(file, fmt=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import a binary UTF-8 file (an upload or ``open(path, "rb")``), read as
+    a stream; ``fmt`` defaults to the file name's extension.
+    """
+    if fmt is None:
+        fmt = "jsonl" if str(getattr(file, "name", "")).lower().endswith((".jsonl", ".ndjson")) else "csv"
+    lines = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        return import_catalog(read_records(lines, fmt), batch_size=batch_size)
+    finally:
+        # the caller owns ``file``
+        lines.detach()
+
+
+def import_catalog(records, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Upsert movies, their genres and showtimes from ``read_records`` output.
+
+    A record names a movie by ``movie_id`` (``Movie.external_id``) with
+    optional ``title``, ``description``, ``duration_minutes``,
+    ``poster_url`` and ``genres`` (``|``-separated names; replace the
+    movie's genres), and optionally a showtime: ``hall`` (name),
+    ``start_time`` (ISO, cinema time when naive) and ``price``. Movie
+    columns are only read from records with a title, and an absent or empty
+    one leaves the stored value alone; a new movie gets the model defaults.
+
+    Records are processed ``batch_size`` at a time, each batch in its own
+    transaction with one upsert per table (``bulk_create(update_conflicts=
+    True)``) and one insert of genre links. Halls, genres and movies are
+    resolved through dicts that live across batches. A bad record is
+    reported and skipped; if the database rejects a batch's movies or
+    showtimes they are retried one by one so only the offending ones are
+    lost. A showtime with bookings can't be given another movie.
+    """
+    report = ImportReport()
+    halls = defaultdict(list)
+    for name, hall_id in Hall.objects.values_list("name", "id"):
+        halls[name].append(hall_id)
+    lookups = {
+        "halls": halls,
+        "genres": {},
+        "movies": {},
+    }
+    records = iter(records)
+    while batch := list(islice(records, batch_size)):
+        with transaction.atomic():
+            _import_batch(batch, lookups, report)
+    report.errors.sort()
+    if report.written:
+        # bulk_create sends no post_save
+        bump_schedule_version()
+    return report
+
+
+def _import_batch(batch, lookups, report):
+    movies, genre_names, showtimes = {}, {}, {}
+    for line_number, record in batch:
+        try:
+            if isinstance(record, str):
+                raise ValueError(record)
+            external_id, movie, genres, showtime = _parse(record, lookups["halls"])
+        except ValueError as e:
+            report.errors.append((line_number, str(e)))
+            continue
+        # Later rows win over earlier ones with the same key
+        if movie:
+            movies[external_id] = (line_number, {**movies.get(external_id, (None, {}))[1], **movie})
+        if genres is not None:
+            genre_names[external_id] = (line_number, genres)
+        if showtime:
+            showtimes[(showtime["hall_id"], showtime["start_time"])] = (line_number, external_id, showtime)
+
+    known = lookups["movies"]
+    _upsert_movies(movies, known, report)
+    _resolve_movies(genre_names.keys() | {external_id for _, external_id, _ in showtimes.values()}, known)
+
+    for external_id, (line_number, _) in list(genre_names.items()):
+        if external_id not in known:
+            report.errors.append((line_number, f"невідомий фільм: {external_id}"))
+            del genre_names[external_id]
+    _upsert_genres({name for _, names in genre_names.values() for name in names}, lookups["genres"], report)
+    through = Movie.genres.through
+    through.objects.filter(movie_id__in=[known[external_id][0] for external_id in genre_names]).delete()
+    through.objects.bulk_create([
+        through(movie_id=known[external_id][0], moviegenre_id=lookups["genres"][name])
+        for external_id, (_, names) in genre_names.items()
+        for name in names
+    ])
+
+    _upsert_showtimes(showtimes.values(), known, report)
+
+
+def _parse(record, halls):
+    """Validate one record: ``(external id, movie fields, genre names, showtime fields)``."""
+    record = {key: value.strip() if isinstance(value, str) else value for key, value in record.items() if key}
+    external_id = str(record.get("movie_id") or "").strip()
+    if not external_id:
+        raise ValueError("не вказано movie_id")
+    _validate(Movie, "external_id", external_id, "movie_id")
+
+    movie = {}
+    if record.get("title"):
+        movie = {field: record[field] for field in MOVIE_FIELDS if record.get(field) not in ("", None)}
+        if "duration_minutes" in movie:
+            try:
+                movie["duration_minutes"] = int(movie["duration_minutes"])
+            except (TypeError, ValueError):
+                raise ValueError(f"некоректна тривалість: {movie['duration_minutes']}")
+        for field, value in movie.items():
+            _validate(Movie, field, value)
+
+    # an empty CSV cell leaves the genres alone, ``[]`` in JSONL clears them
+    genres = record.get("genres")
+    if genres not in ("", None):
+        if isinstance(genres, str):
+            genres = genres.split("|")
+        genres = sorted({name.strip() for name in genres if name and name.strip()})
+    else:
+        genres = None
+
+    showtime = None
+    if record.get("hall") or record.get("start_time"):
+        hall_ids = halls.get(record.get("hall"), ())
+        if not hall_ids:
+            raise ValueError(f"невідомий зал: {record.get('hall')}")
+        if len(hall_ids) > 1:
+            raise ValueError(f"кілька залів з назвою {record.get('hall')}")
+        hall_id = hall_ids[0]
+        try:
+            start_time = datetime.fromisoformat(str(record.get("start_time")))
+        except ValueError:
+            raise ValueError(f"некоректний час сеансу: {record.get('start_time')}")
+        if timezone.is_naive(start_time):
+            start_time = start_time.replace(tzinfo=cinema_timezone())
+        showtime = {"hall_id": hall_id, "start_time": start_time}
+        if record.get("price") not in ("", None):
+            try:
+                showtime["price"] = Decimal(str(record["price"]))
+            except InvalidOperation:
+                raise ValueError(f"некоректна ціна: {record['price']}")
+            _validate(Showtime, "price", showtime["price"])
+    return external_id, movie, genres, showtime
+
+
+def _validate(model, field, value, column=None):
+    """Run the model field's validators, so the upsert can't fail on this value."""
+    try:
+        model._meta.get_field(field).run_validators(value)
+    except ValidationError as e:
+        raise ValueError(f"{column or field}: {' '.join(e.messages)}")
+
+
+def _upsert_genres(names, known, report):
+    new = sorted(names - known.keys())
+    if not new:
+        return
+    genres = MovieGenre.objects.bulk_create(
+        [MovieGenre(name=name) for name in new],
+        update_conflicts=True, unique_fields=["name"], update_fields=["name"],
+    )
+    known.update((genre.name, genre.pk) for genre in genres)
+    report.written["genres"] += len(genres)
+
+
+def _upsert_movies(movies, known, report):
+    """
+    Upsert ``{external id: (line, fields)}``, one statement per set of
+    fields given, and move the end times of the showtimes of movies with a
+    new duration. If that makes showtimes overlap the movies are retried one
+    by one, as showtimes are.
+    """
+    if not movies:
+        return
+
+    def upsert(items):
+        groups = defaultdict(list)
+        for external_id, (_, fields) in items:
+            groups[tuple(field for field in MOVIE_FIELDS if field in fields)].append(
+                Movie(external_id=external_id, **fields)
+            )
+        objs, timed = [], []
+        for update_fields, group in groups.items():
+            objs += Movie.objects.bulk_create(
+                group, update_conflicts=True, unique_fields=["external_id"],
+                update_fields=[*update_fields, "updated_at"],
+            )
+            if "duration_minutes" in update_fields:
+                timed += [movie.pk for movie in group]
+        _sync_end_times(timed)
+        return objs
+
+    try:
+        with transaction.atomic():
+            objs = upsert(movies.items())
+    except DatabaseError:
+        objs = []
+        for item in movies.items():
+            try:
+                with transaction.atomic():
+                    objs += upsert([item])
+            except DatabaseError as e:
+                report.errors.append((item[1][0], _describe(e, "сеанси фільму з новою тривалістю накладаються")))
+    # An upsert without a duration keeps the stored one
+    known.update(
+        (external_id, (pk, duration))
+        for external_id, pk, duration in Movie.objects.filter(pk__in=[movie.pk for movie in objs])
+        .values_list("external_id", "pk", "duration_minutes")
+    )
+    report.written["movies"] += len(objs)
+
+
+def _sync_end_times(movie_ids):
+    """``sync_showtime_end_time`` for movies written by bulk_create, in one UPDATE."""
+    minutes = Coalesce("duration_minutes", Value(DEFAULT_DURATION_MINUTES))
+    running = Subquery(
+        Movie.objects.filter(pk=OuterRef("movie_id"))
+        .values(running=ExpressionWrapper(minutes * Value(timedelta(minutes=1)), output_field=DurationField()))
+    )
+    end_time = F("start_time") + running
+    Showtime.objects.filter(movie_id__in=movie_ids).exclude(end_time=end_time).update(end_time=end_time)
+
+
+def _describe(error, overlap_message):
+    if isinstance(error, IntegrityError) and is_overlap_violation(error):
+        return overlap_message
+    return str(error).splitlines()[0]
+
+
+def _resolve_movies(external_ids, known):
+    """Look up, in one query, referenced movies not seen yet."""
+    missing = external_ids - known.keys()
+    if missing:
+        known.update(
+            (external_id, (pk, duration))
+            for external_id, pk, duration in Movie.objects.filter(external_id__in=missing)
+            .values_list("external_id", "pk", "duration_minutes")
+        )
+
+
+def _upsert_showtimes(rows, movies, report):
+    rows = list(rows)
+    if not rows:
+        return
+    # Existing showtimes with bookings keep their movie
+    booked = {
+        (hall_id, start_time): movie_id
+        for hall_id, start_time, movie_id in Showtime.objects.filter(
+            Exists(Booking.objects.filter(showtime=OuterRef("pk"))),
+            hall_id__in={fields["hall_id"] for _, _, fields in rows},
+            start_time__in={fields["start_time"] for _, _, fields in rows},
+        ).values_list("hall_id", "start_time", "movie_id")
+    }
+
+    showtimes = []
+    for line_number, external_id, fields in rows:
+        if external_id not in movies:
+            report.errors.append((line_number, f"невідомий фільм: {external_id}"))
+            continue
+        movie_id, duration = movies[external_id]
+        if booked.get((fields["hall_id"], fields["start_time"]), movie_id) != movie_id:
+            report.errors.append((line_number, "на цей сеанс уже є бронювання, фільм змінити не можна"))
+            continue
+        showtime = Showtime(movie=Movie(pk=movie_id, duration_minutes=duration), **fields)
+        # bulk_create skips Showtime.save
+        showtime.end_time = showtime.start_time + showtime.running_time()
+        showtimes.append((line_number, showtime))
+    if not showtimes:
+        return
+
+    def upsert(objs):
+        Showtime.objects.bulk_create(
+            objs, update_conflicts=True, unique_fields=["hall", "start_time"],
+            update_fields=["movie", "price", "end_time"],
+        )
+
+    try:
+        with transaction.atomic():
+            upsert([showtime for _, showtime in showtimes])
+        report.written["showtimes"] += len(showtimes)
+    except DatabaseError:
+        for line_number, showtime in showtimes:
+            try:
+                with transaction.atomic():
+                    upsert([showtime])
+                report.written["showtimes"] += 1
+            except DatabaseError as e:
+                report.errors.append((line_number, _describe(e, "у цей час зал зайнятий")))
@@ -0,0 +1,37 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.best_available import find_best_block
+
+
+class Command(BaseCommand):
+    help = "Вимірює швидкість підбору місць поруч на синтетичних залах (без БД)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--layouts", nargs="+", default=["10x12", "30x50", "50x100", "80x120"],
+                            help="Розміри залів у форматі РЯДИxМІСЦЬ")
+        parser.add_argument("--occupancy", nargs="+", type=float, default=[0.5, 0.9, 0.97])
+        parser.add_argument("--group", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        group = options["group"]
+        self.stdout.write(f"{'зал':>8} {'місць':>6} {'зайнято':>8} {'мкс/пошук':>10}  результат")
+        for layout in options["layouts"]:
+            rows, per_row = (int(x) for x in layout.lower().split("x"))
+            for occupancy in options["occupancy"]:
+                hall = [
+                    "".join("1" if rng.random() < occupancy else "0" for _ in range(per_row))
+                    for _ in range(rows)
+                ]
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    block = find_best_block(hall, group)
+                elapsed = (time.perf_counter() - started) / options["repeat"]
+                self.stdout.write(
+                    f"{layout:>8} {rows * per_row:>6} {occupancy:>8.0%} {elapsed * 1e6:>10.1f}  {block}"
+                )
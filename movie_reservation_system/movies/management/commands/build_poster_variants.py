@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from movies.models import Movie
+from movies.posters import build_poster_variants
+
+
+class Command(BaseCommand):
+    help = "Створює зменшені копії постерів (AVIF/WebP/JPEG) для srcset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movie", type=int, action="append", dest="movies",
+                            help="ID фільму (можна вказати кілька разів)")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Кількість процесів (за замовчуванням — за числом CPU, 0 — без пулу)")
+        parser.add_argument("--force", action="store_true",
+                            help="Перебудувати навіть незмінені постери")
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.exclude(poster_url="", poster_variants={}).order_by("id")
+        if options["movies"]:
+            movies = movies.filter(id__in=options["movies"])
+
+        stats = build_poster_variants(movies.iterator(), workers=options["workers"], force=options["force"])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Створено: {stats['built']}, без змін: {stats['skipped']}, помилок: {stats['failed']}"
+        ))
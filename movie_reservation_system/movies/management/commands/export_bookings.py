@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from movies.exports import EXPORT_FORMATS, export_lines
+from movies.models import Booking
+from movies.schedule import day_bounds
+
+
+class Command(BaseCommand):
+    help = "Вивантажує бронювання (з сеансом, фільмом, залом, місцем і користувачем) у CSV або JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv", help="Формат файлу")
+        parser.add_argument("--from", dest="first_day", type=date.fromisoformat, default=None,
+                            help="Сеанси від цього дня, РРРР-ММ-ДД")
+        parser.add_argument("--to", dest="last_day", type=date.fromisoformat, default=None,
+                            help="Сеанси до цього дня включно, РРРР-ММ-ДД")
+        parser.add_argument("--output", default="-", help="Файл (за замовчуванням — stdout)")
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.all()
+        if options["first_day"]:
+            bookings = bookings.filter(showtime__start_time__gte=day_bounds(options["first_day"])[0])
+        if options["last_day"]:
+            bookings = bookings.filter(showtime__start_time__lt=day_bounds(options["last_day"])[1])
+
+        lines = export_lines(bookings, options["format"])
+        if options["output"] == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        count = -1 if options["format"] == "csv" else 0  # header
+        with open(options["output"], "w", encoding="utf-8", newline="") as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f"✅ Вивантажено бронювань: {count}"))
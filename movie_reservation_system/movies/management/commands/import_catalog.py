@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.imports import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_file
+
+
+class Command(BaseCommand):
+    help = "Імпортує фільми, жанри та сеанси з CSV або JSONL (оновлює наявні)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл для імпорту")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                            help="Формат файлу (за замовчуванням — за розширенням)")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Рядків в одній транзакції")
+
+    def handle(self, *args, **options):
+        try:
+            f = open(options["path"], "rb")
+        except OSError as e:
+            raise CommandError(f"Не вдалося відкрити файл: {e}")
+        with f:
+            report = import_file(f, options["format"], batch_size=options["batch_size"])
+
+        for line_number, message in report.errors:
+            self.stderr.write(f"Рядок {line_number}: {message}")
+        written = report.written
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Імпортовано фільмів: {written['movies']}, жанрів: {written['genres']}, "
+            f"сеансів: {written['showtimes']}; рядків з помилками: {len(report.errors)}"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from movies.models import Hall
+
+
+class Command(BaseCommand):
+    help = "Створює (або видаляє зайві) місця для всіх залів відповідно до їх розмірів"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hall", type=int, action="append", dest="halls",
+                            help="ID залу (можна вказати кілька разів)")
+
+    def handle(self, *args, **options):
+        halls = Hall.objects.order_by("id")
+        if options["halls"]:
+            halls = halls.filter(id__in=options["halls"])
+
+        count = 0
+        for hall in halls.iterator():
+            hall.sync_seats()
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Місця синхронізовано для залів: {count}"))
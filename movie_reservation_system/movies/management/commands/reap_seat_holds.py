@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.booking import reap_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Видаляє прострочені тимчасові утримання місць (пакетами)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--loop", action="store_true",
+                            help="Працювати безперервно як фоновий процес")
+        parser.add_argument("--interval", type=float, default=30,
+                            help="Пауза між проходами у режимі --loop, секунд")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            total = 0
+            while True:
+                deleted = reap_expired_holds(batch_size)
+                total += deleted
+                if deleted < batch_size:
+                    break
+
+            if total or not options["loop"]:
+                self.stdout.write(f"Видалено утримань: {total}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
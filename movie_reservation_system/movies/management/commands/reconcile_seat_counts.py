@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from movies.booking import reconcile_seats_sold
+from movies.models import Showtime
+
+
+class Command(BaseCommand):
+    help = "Перераховує кількість проданих місць сеансів за бронюваннями"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--showtime", type=int, action="append", dest="showtimes",
+                            help="ID сеансу (можна вказати кілька разів)")
+
+    def handle(self, *args, **options):
+        showtimes = Showtime.objects.all()
+        if options["showtimes"]:
+            showtimes = showtimes.filter(id__in=options["showtimes"])
+
+        fixed = reconcile_seats_sold(showtimes)
+        self.stdout.write(self.style.SUCCESS(f"✅ Виправлено лічильників: {fixed}"))
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.models import Hall, Movie
+from movies.schedule import cinema_now
+from movies.scheduling import parse_slots, schedule_showtimes
+
+
+class Command(BaseCommand):
+    help = "Створює сеанси на кілька тижнів за шаблоном, пропускаючи накладки в залах"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movie", type=int, action="append", dest="movies", required=True,
+                            help="ID фільму (можна вказати кілька разів)")
+        parser.add_argument("--hall", type=int, action="append", dest="halls",
+                            help="ID залу (можна вказати кілька разів; за замовчуванням — усі)")
+        parser.add_argument("--start", type=date.fromisoformat, default=None,
+                            help="Перший день, РРРР-ММ-ДД (за замовчуванням — завтра)")
+        parser.add_argument("--weeks", type=int, default=4, help="Кількість тижнів")
+        parser.add_argument("--slots", default="10:00, 13:30, 17:00, 20:30",
+                            help="Час сеансів через кому")
+        parser.add_argument("--buffer", type=int, default=15, help="Прибирання залу між сеансами, хв")
+        parser.add_argument("--price", type=Decimal, default=None, help="Ціна квитка")
+        parser.add_argument("--dry-run", action="store_true", help="Лише показати, що буде створено")
+
+    def handle(self, *args, **options):
+        try:
+            slots = parse_slots(options["slots"])
+        except ValueError:
+            raise CommandError("Вкажіть час у форматі ГГ:ХХ через кому.")
+        movies = list(Movie.objects.filter(id__in=options["movies"]).order_by("id"))
+        if len(movies) != len(set(options["movies"])):
+            raise CommandError("Деякі фільми не знайдено.")
+        halls = Hall.objects.order_by("id")
+        if options["halls"]:
+            halls = halls.filter(id__in=options["halls"])
+        first_day = options["start"] or cinema_now().date() + timedelta(days=1)
+
+        try:
+            plan = schedule_showtimes(
+                movies, halls, first_day, options["weeks"] * 7, slots,
+                buffer_minutes=options["buffer"], price=options["price"], dry_run=options["dry_run"],
+            )
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+        verb = "Буде створено" if options["dry_run"] else "Створено"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {verb} сеансів: {len(plan.showtimes)}, пропущено через накладки: {len(plan.conflicts)}"
+        ))
@@ -0,0 +1,45 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+def row_label(index):
+    label = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+
+def materialize_seats(apps, schema_editor):
+    Hall = apps.get_model("movies", "Hall")
+    Seat = apps.get_model("movies", "Seat")
+
+    for hall in Hall.objects.all().iterator():
+        existing = set(Seat.objects.filter(hall=hall).values_list("row", "number"))
+        Seat.objects.bulk_create(
+            [
+                Seat(hall=hall, row=row_label(i), number=number)
+                for i in range(hall.rows)
+                for number in range(1, hall.seats_per_row + 1)
+                if (row_label(i), number) not in existing
+            ],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_remove_booking_first_name_remove_booking_last_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hall',
+            name='rows',
+            field=models.PositiveIntegerField(default=10, validators=[django.core.validators.MaxValueValidator(702)]),
+        ),
+        migrations.RunPython(materialize_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:56
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_sold_seats(apps, schema_editor):
+    Booking = apps.get_model("movies", "Booking")
+    Showtime = apps.get_model("movies", "Showtime")
+    booked = Subquery(
+        Booking.objects.filter(showtime=OuterRef("pk"))
+        .order_by()
+        .values("showtime")
+        .annotate(n=Count("pk"))
+        .values("n"),
+        output_field=IntegerField(),
+    )
+    Showtime.objects.update(seats_sold=Coalesce(booked, 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_showtime_seat_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='seats_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_sold_seats, migrations.RunPython.noop),
+    ]
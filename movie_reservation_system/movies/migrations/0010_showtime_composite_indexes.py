@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_showtime_seats_sold'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='showtime',
+            name='movies_show_start_t_e420c7_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='showtime',
+            name='movies_show_movie_i_145a3f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['start_time', 'movie'], name='movies_show_start_t_5c72fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['movie', 'start_time'], name='movies_show_movie_i_69904b_idx'),
+        ),
+    ]
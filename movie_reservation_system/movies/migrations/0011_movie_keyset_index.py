@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_showtime_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-created_at', 'id'], name='movies_movi_created_7797ed_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def group_bookings_into_orders(apps, schema_editor):
+    """One order per user and showtime for the bookings made so far."""
+    Booking = apps.get_model("movies", "Booking")
+    Order = apps.get_model("movies", "Order")
+    Showtime = apps.get_model("movies", "Showtime")
+
+    groups = (
+        Booking.objects.order_by()
+        .values("user_id", "showtime_id")
+        .annotate(seats=Count("id"), created_at=Min("created_at"))
+    )
+    for group in groups.iterator():
+        showtime = Showtime.objects.get(pk=group["showtime_id"])
+        order = Order.objects.create(
+            user_id=group["user_id"], showtime=showtime, starts_at=showtime.start_time,
+            seat_count=group["seats"], total_price=showtime.price * group["seats"],
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=group["created_at"])
+        Booking.objects.filter(user_id=group["user_id"], showtime=showtime).update(order=order)
+
+
+# Left behind by a since-deleted 0014_booking_starts_at, whose column was
+# NOT NULL; a database that never had it is unaffected
+DROP_BOOKING_STARTS_AT = """
+DROP INDEX IF EXISTS movies_book_user_id_0597d6_idx;
+ALTER TABLE movies_booking DROP COLUMN IF EXISTS starts_at;
+"""
+
+
+class Migration(migrations.Migration):
+
+    # Numbered 0015 before the sequence was closed up
+    replaces = [('movies', '0015_order')]
+
+    dependencies = [
+        ('movies', '0013_movie_poster_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_BOOKING_STARTS_AT, migrations.RunSQL.noop),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat_count', models.PositiveIntegerField(default=0)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=9)),
+                ('starts_at', models.DateTimeField(editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='showtime',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='movies.showtime'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='order',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='movies.order'),
+        ),
+        migrations.RunPython(group_bookings_into_orders, migrations.RunPython.noop),
+    ]
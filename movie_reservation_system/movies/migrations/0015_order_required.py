@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0014: altering movies_booking in the transaction that
+    # filled Booking.order would trip over its pending FK trigger events.
+
+    # Numbered 0016 before the sequence was closed up
+    replaces = [('movies', '0016_order_required')]
+
+    dependencies = [
+        ('movies', '0014_order'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='movies.order'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='starts_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'starts_at'], name='movies_orde_user_id_6cb975_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+FILL_END_TIME = """
+UPDATE movies_showtime AS s
+SET end_time = s.start_time + make_interval(mins => COALESCE(m.duration_minutes, 120))
+FROM movies_movie AS m
+WHERE m.id = s.movie_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    # Numbered 0017 before the sequence was closed up
+    replaces = [('movies', '0017_showtime_end_time')]
+
+    dependencies = [
+        ('movies', '0015_order_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='showtime',
+            name='end_time',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunSQL(FILL_END_TIME, migrations.RunSQL.noop),
+    ]
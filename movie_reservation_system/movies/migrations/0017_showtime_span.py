@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:47
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import movies.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Numbered 0018 before the sequence was closed up
+    replaces = [('movies', '0018_showtime_span')]
+
+    dependencies = [
+        ('movies', '0016_showtime_end_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='showtime',
+            name='end_time',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=django.contrib.postgres.indexes.GistIndex(movies.models.TsTzRange('start_time', 'end_time', django.contrib.postgres.fields.ranges.RangeBoundary()), name='movies_showtime_span_gist'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+FIND_DUPLICATES = """
+SELECT hall_id, start_time, array_agg(id ORDER BY id)
+FROM movies_showtime
+GROUP BY hall_id, start_time
+HAVING count(*) > 1
+ORDER BY hall_id, start_time
+LIMIT 20;
+"""
+
+
+def check_no_duplicates(apps, schema_editor):
+    """Fail with the duplicated showtimes rather than a bare constraint error."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(FIND_DUPLICATES)
+        duplicates = cursor.fetchall()
+    if duplicates:
+        lines = "\n".join(
+            f"  hall {hall_id}, {start:%Y-%m-%d %H:%M}: showtimes {', '.join(map(str, ids))}"
+            for hall_id, start, ids in duplicates
+        )
+        raise RuntimeError(
+            "Several showtimes start at the same time in the same hall; keep one of each "
+            f"and migrate again (first {len(duplicates)} shown):\n{lines}"
+        )
+
+class Migration(migrations.Migration):
+
+    # Numbered 0019 before the sequence was closed up
+    replaces = [('movies', '0019_catalog_import')]
+
+    dependencies = [
+        ('movies', '0017_showtime_span'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(check_no_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='showtime',
+            constraint=models.UniqueConstraint(fields=('hall', 'start_time'), name='unique_showtime_hall_start'),
+        ),
+    ]
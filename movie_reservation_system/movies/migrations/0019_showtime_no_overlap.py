@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:21
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+import movies.models
+from django.db import migrations
+
+
+# Left behind by the opt-in btree_gist version of this constraint
+DROP_OPT_IN_CONSTRAINT = "ALTER TABLE movies_showtime DROP CONSTRAINT IF EXISTS movies_showtime_no_overlap;"
+
+FIND_OVERLAPS = """
+SELECT a.id, b.id, a.hall_id, a.start_time, b.start_time
+FROM movies_showtime AS a
+JOIN movies_showtime AS b
+  ON b.hall_id = a.hall_id AND b.id > a.id
+ AND tstzrange(b.start_time, b.end_time, '[)') && tstzrange(a.start_time, a.end_time, '[)')
+ORDER BY a.hall_id, a.start_time
+LIMIT 20;
+"""
+
+
+def check_no_overlaps(apps, schema_editor):
+    """Fail with the clashing showtimes rather than a bare constraint error."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(FIND_OVERLAPS)
+        clashes = cursor.fetchall()
+    if clashes:
+        lines = "\n".join(
+            f"  hall {hall_id}: showtime {a} ({a_start:%Y-%m-%d %H:%M}) and {b} ({b_start:%Y-%m-%d %H:%M})"
+            for a, b, hall_id, a_start, b_start in clashes
+        )
+        raise RuntimeError(
+            "Showtimes overlap in the same hall; move or delete one of each pair "
+            f"and migrate again (first {len(clashes)} shown):\n{lines}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    # Numbered 0020 before the sequence was closed up
+    replaces = [('movies', '0020_showtime_no_overlap')]
+
+    dependencies = [
+        ('movies', '0018_catalog_import'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_OPT_IN_CONSTRAINT, migrations.RunSQL.noop),
+        migrations.RunPython(check_no_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='showtime',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(expressions=[(movies.models.Int8Range('hall', 'hall', django.contrib.postgres.fields.ranges.RangeBoundary(inclusive_upper=True)), '&&'), (movies.models.TsTzRange('start_time', 'end_time', django.contrib.postgres.fields.ranges.RangeBoundary()), '&&')], name='movies_showtime_no_overlap', violation_error_message='У цей час зал зайнятий.'),
+        ),
+    ]
@@ -1,8 +1,43 @@
-from django.db import models
+from datetime import timedelta
+
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import BigIntegerRangeField, DateTimeRangeField, RangeBoundary, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.core.validators import MaxValueValidator
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
 
 
+# Seat.row holds up to two letters: A..Z, AA..ZZ
+MAX_HALL_ROWS = 26 + 26 * 26
+
+# Poster variant formats (movies.imaging), in order of preference
+POSTER_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+# A showtime with this many seats (or 10% of the hall) left gets a badge
+FEW_SEATS_LEFT = 10
+
+# Assumed running time of movies whose duration is unknown
+DEFAULT_DURATION_MINUTES = 120
+
+# Exclusion constraint keeping showtimes of a hall from overlapping
+SHOWTIME_OVERLAP_CONSTRAINT = "movies_showtime_no_overlap"
+
+
+def row_label(index):
+    """Spreadsheet-style row label: 0 -> A, 25 -> Z, 26 -> AA, 27 -> AB..."""
+    label = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+
 class MovieGenre(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
@@ -20,48 +55,236 @@ class Movie(models.Model):
     updated_at = models.DateTimeField(auto_now=True)    
     duration_minutes = models.PositiveIntegerField(null=True, blank=True)
     poster_url = models.URLField(blank=True) 
+    # Key of the movie in an imported catalogue (movies.imports)
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Resized copies of the poster in the default storage (movies.posters)
+    poster_variants = models.JSONField(default=dict, blank=True, editable=False)
     genres = models.ManyToManyField(MovieGenre, related_name='movies')
+    # Maintained by Postgres itself; searched by movies.search
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config="simple")
+            + SearchVector("description", weight="B", config="simple")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Movie"
         verbose_name_plural = "Movies"
+        indexes = [
+            # Keyset pagination of the catalogue (movies.pagination)
+            models.Index(fields=["-created_at", "id"]),
+            GinIndex(fields=["search_vector"]),
+        ]
 
 
     def __str__(self):
         return self.title
 
+    @property
+    def poster_sources(self):
+        """``[(mime type, srcset)]`` of the poster variants, best format first."""
+        storage = storages["default"]
+        return [
+            (POSTER_MIME_TYPES[fmt], ", ".join(f"{storage.url(name)} {width}w" for width, name in images))
+            for fmt, images in sorted(
+                self.poster_variants.get("images", {}).items(),
+                key=lambda item: list(POSTER_MIME_TYPES).index(item[0]),
+            )
+        ]
+
 class Hall(models.Model):
     name = models.CharField(max_length=100)
-    rows = models.PositiveIntegerField(default=10)  
+    rows = models.PositiveIntegerField(default=10, validators=[MaxValueValidator(MAX_HALL_ROWS)])
     seats_per_row = models.PositiveIntegerField(default=12)  
 
+    # ``(rows, seats_per_row)`` as last loaded or saved; ``None`` for a new
+    # hall or one loaded without its layout
+    _saved_layout = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        hall = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if "rows" in loaded and "seats_per_row" in loaded:
+            hall._saved_layout = (loaded["rows"], loaded["seats_per_row"])
+        return hall
+
+    def save(self, *args, **kwargs):
+        if {"rows", "seats_per_row"} <= self.get_deferred_fields():
+            # Neither was loaded nor set, so this save can't change the layout
+            return super().save(*args, **kwargs)
+        layout = (self.rows, self.seats_per_row)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if layout != self._saved_layout:
+                self.sync_seats()
+        self._saved_layout = layout
+
     def total_seats(self):
         return self.rows * self.seats_per_row
 
+    def row_labels(self):
+        return [row_label(i) for i in range(self.rows)]
+
+    def sync_seats(self):
+        """
+        Bring the hall's Seat rows in line with its layout.
+
+        Missing seats are created with one bulk insert; seats outside the
+        layout are pruned unless somebody has booked them.
+        """
+        wanted = [
+            (label, number)
+            for label in self.row_labels()
+            for number in range(1, self.seats_per_row + 1)
+        ]
+        with transaction.atomic():
+            existing = {
+                (row, number): seat_id
+                for seat_id, row, number in self.seats.order_by().values_list("id", "row", "number")
+            }
+            Seat.objects.bulk_create(
+                [Seat(hall=self, row=row, number=number)
+                 for row, number in wanted if (row, number) not in existing],
+                ignore_conflicts=True,
+            )
+            wanted = set(wanted)
+            stale = [seat_id for key, seat_id in existing.items() if key not in wanted]
+            if stale:
+                Seat.objects.filter(id__in=stale, bookings__isnull=True).delete()
+
     def __str__(self):
         return f"{self.name} (Рядів: {self.rows}, Місць у ряду: {self.seats_per_row})"
 
+class TsTzRange(models.Func):
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+class Int8Range(models.Func):
+    function = "INT8RANGE"
+    output_field = BigIntegerRangeField()
+
+
+def showtime_span():
+    """``[start_time, end_time)`` of a showtime, exactly as its GiST index stores it."""
+    return TsTzRange("start_time", "end_time", RangeBoundary())
+
+
+def hall_range():
+    """
+    ``[hall_id, hall_id]``: lets a plain GiST index compare halls with ``&&``
+    where ``hall_id WITH =`` would need the btree_gist extension.
+    """
+    return Int8Range("hall", "hall", RangeBoundary(inclusive_upper=True))
+
+
+def is_overlap_violation(error):
+    """Whether an IntegrityError comes from the showtime overlap constraint."""
+    return getattr(getattr(error.__cause__, "diag", None), "constraint_name", None) == SHOWTIME_OVERLAP_CONSTRAINT
+
+
+class ShowtimeQuerySet(models.QuerySet):
+    def overlapping(self, start, end):
+        """Showtimes sharing any moment with ``[start, end)``, found through the range index."""
+        return self.alias(span=showtime_span()).filter(span__overlap=(start, end))
+
+    def playing_at(self, moment):
+        """Showtimes running at ``moment``, found through the range index."""
+        return self.alias(span=showtime_span()).filter(span__contains=moment)
+
+
 class Showtime(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='showtimes')
     hall = models.ForeignKey(Hall, on_delete=models.PROTECT, related_name='showtimes')
     start_time = models.DateTimeField()
+    # start_time + the movie's running time; set on save, see movies.signals
+    end_time = models.DateTimeField(editable=False)
     price = models.DecimalField(max_digits=7, decimal_places=2, default=120.00)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever a seat of this showtime is booked, released or held
+    seat_version = models.PositiveIntegerField(default=0, editable=False)
+    # Kept in step with Booking rows by movies.booking; see reconcile_seat_counts
+    seats_sold = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['start_time']
+        constraints = [
+            # upsert key of movies.imports
+            models.UniqueConstraint(fields=['hall', 'start_time'], name='unique_showtime_hall_start'),
+            # the database-side twin of clean(), for concurrent writers
+            ExclusionConstraint(
+                name=SHOWTIME_OVERLAP_CONSTRAINT,
+                expressions=[(hall_range(), RangeOperators.OVERLAPS), (showtime_span(), RangeOperators.OVERLAPS)],
+                violation_error_message="У цей час зал зайнятий.",
+            ),
+        ]
         indexes = [
-            models.Index(fields=['start_time']),
-            models.Index(fields=['movie']),
+            # day listings: start_time range, movie read from the index
+            models.Index(fields=['start_time', 'movie']),
+            # movie_detail: one movie, start_time range
+            models.Index(fields=['movie', 'start_time']),
+            # overlaps and "what is on at T": showtime_span() && / @> ...
+            GistIndex(showtime_span(), name='movies_showtime_span_gist'),
         ]
 
+    objects = ShowtimeQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.movie.title} — {self.start_time.strftime('%Y-%m-%d %H:%M')} ({self.hall.name})"
 
+    # Kept by movies.booking with F() updates; a plain save must never write
+    # back the possibly stale values an instance was loaded with
+    COUNTER_FIELDS = frozenset({"seat_version", "seats_sold"})
+
+    def save(self, *args, **kwargs):
+        self.end_time = self.start_time + self.running_time()
+        if not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        """Reject a showtime overlapping another one in its hall."""
+        if self.start_time is None or self.movie_id is None or self.hall_id is None:
+            return
+        clash = (
+            Showtime.objects
+            .filter(hall_id=self.hall_id)
+            .exclude(pk=self.pk)
+            .overlapping(self.start_time, self.start_time + self.running_time())
+            .select_related('movie', 'hall')
+            .first()
+        )
+        if clash:
+            raise ValidationError(f"У цей час зал зайнятий: {clash}")
+
+    def running_time(self):
+        return timedelta(minutes=self.movie.duration_minutes or DEFAULT_DURATION_MINUTES)
+
     @property
     def is_upcoming(self):
         return self.start_time >= timezone.now()
+
+    @property
+    def seats_remaining(self):
+        return max(self.hall.total_seats() - self.seats_sold, 0)
+
+    @property
+    def availability(self):
+        """``"sold_out"``, ``"few_left"`` or ``None``, for listing badges."""
+        remaining = self.seats_remaining
+        if remaining == 0:
+            return "sold_out"
+        if remaining <= max(FEW_SEATS_LEFT, self.hall.total_seats() // 10):
+            return "few_left"
+        return None
     
 class Seat(models.Model):
     hall = models.ForeignKey(Hall, on_delete=models.CASCADE, related_name="seats")
@@ -76,10 +299,38 @@ class Seat(models.Model):
         return f"{self.row}{self.number} ({self.hall.name})"
 
 
+class Order(models.Model):
+    """All seats a user bought for one showtime in one checkout."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders")
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name="orders")
+    # Підсумки замовлення; оновлюються разом із його бронюваннями (movies.booking)
+    seat_count = models.PositiveIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    # Copy of showtime.start_time, so a user's orders are read in start
+    # order straight from the (user, starts_at) index; see movies.signals
+    starts_at = models.DateTimeField(editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # my_bookings: one user's upcoming / past orders in start order
+            models.Index(fields=['user', 'starts_at']),
+        ]
+
+    def __str__(self):
+        return f"Order {self.pk}: {self.seat_count} seat(s) for showtime {self.showtime_id}"
+
+    def save(self, *args, **kwargs):
+        if self.starts_at is None:
+            self.starts_at = self.showtime.start_time
+        super().save(*args, **kwargs)
+
+
 class Booking(models.Model):
     showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name="bookings")
     seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name="bookings")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)  # нове поле
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="bookings")
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -87,5 +338,36 @@ class Booking(models.Model):
         unique_together = ('showtime', 'seat')
 
     def __str__(self):
-        return f"{self.seat} for {self.showtime} ({self.first_name} {self.last_name})"
+        return f"{self.seat} for {self.showtime}"
+
+    def save(self, *args, **kwargs):
+        # A booking made outside checkout (e.g. in the admin) is an order of its own
+        if self.order_id is None:
+            self.order = Order.objects.create(
+                user=self.user, showtime=self.showtime, seat_count=1, total_price=self.showtime.price,
+            )
+        super().save(*args, **kwargs)
+
+
+class SeatHold(models.Model):
+    """Short-lived claim on a seat while its holder finishes checkout."""
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name="holds")
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name="holds")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="seat_holds")
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["showtime", "seat"], name="unique_seat_hold"),
+        ]
+        indexes = [
+            models.Index(fields=["expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.seat_id} held until {self.expires_at:%H:%M:%S}"
 
+    @property
+    def is_active(self):
+        return self.expires_at > timezone.now()
@@ -0,0 +1,211 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Below this many rows (by the planner's statistics) COUNT(*) is cheap enough
+EXACT_COUNT_LIMIT = 10_000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated listing ordered by ``(-created_at, id)``.
+
+    ``next_cursor`` / ``previous_cursor`` point past the last / before the
+    first row of the page and are ``None`` at either end of the listing.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _pack(*values):
+    raw = "|".join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _unpack(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|")
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def encode_cursor(obj):
+    return _pack(obj.created_at.isoformat(), obj.pk)
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, pk)`` a cursor points at."""
+    try:
+        created_at, pk = _unpack(cursor)
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if created_at.tzinfo is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def encode_rank_cursor(obj):
+    # str() of a float reads back as exactly the same float
+    return _pack(float(obj.rank), obj.created_at.isoformat(), obj.pk)
+
+
+def decode_rank_cursor(cursor):
+    """Return the ``(rank, created_at, pk)`` a search cursor points at."""
+    try:
+        rank, created_at, pk = _unpack(cursor)
+        rank = float(rank)
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if not math.isfinite(rank) or created_at.tzinfo is None:
+        raise InvalidCursor(cursor)
+    return rank, created_at, pk
+
+
+def keyset_page(queryset, per_page, after=None, before=None):
+    """
+    Return the page of ``queryset`` after (or before) a cursor.
+
+    Rows are filtered with ``created_at <=`` (``>=``) the cursor, which the
+    ``(-created_at, id)`` index turns into a range scan, and only rows tied
+    on ``created_at`` are compared by id. Every page therefore costs the
+    same, however deep it is, and rows inserted meanwhile never shift the
+    pages that follow.
+    """
+    if before:
+        created_at, pk = decode_cursor(before)
+        rows = list(
+            queryset.filter(created_at__gte=created_at)
+            .exclude(created_at=created_at, id__gte=pk)
+            .order_by("created_at", "-id")[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1]) if rows else None,
+            previous_cursor=encode_cursor(rows[0]) if has_previous else None,
+        )
+
+    queryset = queryset.order_by("-created_at", "id")
+    if after:
+        created_at, pk = decode_cursor(after)
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__lte=pk)
+    rows = list(queryset[:per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_next else None,
+        previous_cursor=encode_cursor(rows[0]) if after and rows else None,
+    )
+
+
+def ranked_page(queryset, per_page, after=None, before=None):
+    """
+    ``keyset_page`` for search results, annotated with a ``rank`` and
+    ordered by ``(-rank, -created_at, id)``.
+
+    The rank is computed per row, so every page still ranks the matches,
+    but none counts them or skips the ones before it with OFFSET.
+    """
+    if before:
+        rank, created_at, pk = decode_rank_cursor(before)
+        rows = list(
+            queryset.filter(
+                Q(rank__gt=rank)
+                | Q(rank=rank, created_at__gt=created_at)
+                | Q(rank=rank, created_at=created_at, id__lt=pk)
+            )
+            .order_by("rank", "created_at", "-id")[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_rank_cursor(rows[-1]) if rows else None,
+            previous_cursor=encode_rank_cursor(rows[0]) if has_previous else None,
+        )
+
+    queryset = queryset.order_by("-rank", "-created_at", "id")
+    if after:
+        rank, created_at, pk = decode_rank_cursor(after)
+        queryset = queryset.filter(
+            Q(rank__lt=rank)
+            | Q(rank=rank, created_at__lt=created_at)
+            | Q(rank=rank, created_at=created_at, id__gt=pk)
+        )
+    rows = list(queryset[:per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_rank_cursor(rows[-1]) if has_next else None,
+        previous_cursor=encode_rank_cursor(rows[0]) if after and rows else None,
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of big tables: past
+    ``EXACT_COUNT_LIMIT`` rows, the count comes from Postgres' planner
+    statistics instead of ``COUNT(*)``, which has to visit every row.
+
+    An unfiltered listing uses the table's ``pg_class.reltuples``, a
+    filtered one the row estimate of its EXPLAIN. Small or never analyzed
+    tables are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        table_rows = self.table_estimate(queryset)
+        if table_rows < EXACT_COUNT_LIMIT:
+            return super().count
+        if not queryset.query.has_filters():
+            return table_rows
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    def table_estimate(queryset):
+        """Rows in the queryset's table as of the last ANALYZE; -1 if never analyzed."""
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else -1
@@ -0,0 +1,140 @@
+import hashlib
+import logging
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+from .azure_sas import media_blob_name
+from .cache import bump_schedule_version
+from .imaging import POSTER_WIDTHS, available_formats, render_variants
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+MAX_POSTER_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = 10
+
+
+class PosterError(Exception):
+    pass
+
+
+def fetch_poster(url):
+    """Poster bytes: read from the default storage if it lives there, else downloaded."""
+    name = media_blob_name(url)
+    try:
+        if name:
+            with storages["default"].open(name) as f:
+                data = f.read(MAX_POSTER_BYTES + 1)
+        else:
+            request = Request(url, headers={"User-Agent": "movie-reservation-system poster fetcher"})
+            with urlopen(request, timeout=FETCH_TIMEOUT) as response:
+                data = response.read(MAX_POSTER_BYTES + 1)
+    except (OSError, URLError, ValueError) as e:
+        raise PosterError(f"{url}: {e}") from e
+    if len(data) > MAX_POSTER_BYTES:
+        raise PosterError(f"{url}: larger than {MAX_POSTER_BYTES} bytes")
+    return data
+
+
+def build_poster_variants(movies, workers=None, force=False):
+    """
+    Build resized variants of each movie's poster into the default storage.
+
+    Posters are fetched here and resized in a pool of ``workers`` processes
+    (``None``: one per CPU, ``0``: in this process). A poster whose content
+    hash matches the one its variants were built from is skipped unless
+    ``force`` is set. A poster that can't be fetched or resized is recorded
+    as ``poster_variants["failed"]`` so saving the movie doesn't try again.
+    Returns counts of ``built``, ``skipped`` and ``failed`` posters.
+    """
+    stats = Counter()
+    formats = available_formats()
+    with (_InlineExecutor() if workers == 0 else ProcessPoolExecutor(workers)) as pool:
+        pending = {}
+        for movie in movies:
+            if not movie.poster_url:
+                if movie.poster_variants:
+                    _save_variants(movie, {})
+                continue
+            try:
+                data = fetch_poster(movie.poster_url)
+            except PosterError:
+                logger.warning("Could not fetch the poster of movie %s", movie.pk, exc_info=True)
+                _mark_failed(movie)
+                stats["failed"] += 1
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            if not force and movie.poster_variants.get("hash") == digest:
+                stats["skipped"] += 1
+                continue
+            pending[pool.submit(render_variants, data, POSTER_WIDTHS, formats)] = (movie, digest)
+
+        for future in as_completed(pending):
+            movie, digest = pending[future]
+            try:
+                variants = future.result()
+            except Exception:
+                logger.warning("Could not resize the poster of movie %s", movie.pk, exc_info=True)
+                _mark_failed(movie)
+                stats["failed"] += 1
+                continue
+            _save_variants(movie, _store(movie, digest, variants))
+            stats["built"] += 1
+
+    if stats["built"]:
+        bump_schedule_version()
+    return stats
+
+
+def _store(movie, digest, variants):
+    """Write the variants under content-addressed names; return the new ``poster_variants``."""
+    storage = storages["default"]
+    images = {}
+    for fmt, width, extension, content in variants:
+        name = f"posters/{movie.pk}/{digest[:16]}-{width}.{extension}"
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(content))
+        images.setdefault(fmt, []).append([width, name])
+    return {"hash": digest, "source": movie.poster_url, "images": images}
+
+
+def _save_variants(movie, poster_variants):
+    storage = storages["default"]
+    kept = {name for images in poster_variants.get("images", {}).values() for _, name in images}
+    for images in movie.poster_variants.get("images", {}).values():
+        for _, name in images:
+            if name not in kept:
+                storage.delete(name)
+    # update() rather than save(): no post_save, so no rebuild loop
+    Movie.objects.filter(pk=movie.pk).update(poster_variants=poster_variants)
+    movie.poster_variants = poster_variants
+
+
+def _mark_failed(movie):
+    """Remember the poster URL that failed, keeping the variants built before."""
+    poster_variants = {**movie.poster_variants, "failed": movie.poster_url}
+    Movie.objects.filter(pk=movie.pk).update(poster_variants=poster_variants)
+    movie.poster_variants = poster_variants
+
+
+class _InlineExecutor:
+    """Executor running each task right away, for single posters and tests."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -0,0 +1,33 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def cinema_timezone():
+    return ZoneInfo(settings.CINEMA_TIME_ZONE)
+
+
+def cinema_now():
+    """Current time in the cinema's time zone."""
+    return timezone.localtime(timezone.now(), cinema_timezone())
+
+
+def day_bounds(day):
+    """
+    Half-open ``[local midnight, next local midnight)`` range of a cinema day.
+
+    Filtering with ``start_time__gte`` / ``start_time__lt`` on these bounds
+    keeps ``start_time`` bare, so its index can be used (``__date`` wraps the
+    column in a time zone cast). DST days are 23 or 25 hours long.
+    """
+    tz = cinema_timezone()
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+def showtimes_on(day, queryset):
+    start, end = day_bounds(day)
+    return queryset.filter(start_time__gte=start, start_time__lt=end)
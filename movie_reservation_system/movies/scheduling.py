@@ -0,0 +1,127 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .cache import bump_schedule_version
+from .models import Hall, Showtime, is_overlap_violation
+from .schedule import cinema_timezone
+
+
+def parse_slots(text):
+    """``"10:00, 13:30"`` -> ``[time(10, 0), time(13, 30)]``; ValueError on garbage."""
+    return sorted({time.fromisoformat(part.strip()) for part in text.split(",") if part.strip()})
+
+
+class SchedulePlan:
+    """
+    Outcome of ``schedule_showtimes``: the (unsaved or just created)
+    showtimes and the candidates dropped because they overlapped an
+    existing showtime or an earlier candidate in the same hall.
+    """
+
+    __slots__ = ("showtimes", "conflicts")
+
+    def __init__(self, showtimes, conflicts):
+        self.showtimes = showtimes
+        self.conflicts = conflicts
+
+
+def schedule_showtimes(movies, halls, first_day, days, slots, buffer_minutes=0, price=None, dry_run=False):
+    """
+    Generate showtimes for ``days`` days from ``first_day``: every hall
+    gets a showtime at each of ``slots`` (local ``time`` objects), the
+    movies taking turns across halls, slots and days.
+
+    Candidates overlapping anything in their hall (running time plus
+    ``buffer_minutes`` of cleaning) are dropped. The halls are row-locked,
+    their existing showtimes are read with a single query and the rest is
+    written with ``bulk_create``, so a month for dozens of halls takes a
+    handful of statements. Nothing is written with ``dry_run``. Raises
+    ValidationError if a showtime saved meanwhile without the hall lock
+    trips the overlap constraint; nothing is written then either.
+    """
+    movies, halls, slots = list(movies), list(halls), sorted(slots)
+    if not movies or not halls or not slots or days < 1:
+        return SchedulePlan([], [])
+    tz = cinema_timezone()
+    buffer = timedelta(minutes=buffer_minutes)
+
+    candidates = defaultdict(list)
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for h, hall in enumerate(halls):
+            for s, slot in enumerate(slots):
+                movie = movies[(offset + h + s) % len(movies)]
+                showtime = Showtime(movie=movie, hall=hall, start_time=datetime.combine(day, slot, tzinfo=tz))
+                # bulk_create skips Showtime.save
+                showtime.end_time = showtime.start_time + showtime.running_time()
+                if price is not None:
+                    showtime.price = price
+                candidates[hall.pk].append((showtime.start_time, showtime.end_time + buffer, showtime))
+    first_start = min(start for hall_candidates in candidates.values() for start, _, _ in hall_candidates)
+    last_end = max(end for hall_candidates in candidates.values() for _, end, _ in hall_candidates)
+
+    with transaction.atomic():
+        # Serializes concurrent schedulers of the same halls
+        list(Hall.objects.select_for_update().filter(pk__in=candidates).order_by("pk").values_list("pk"))
+        existing = defaultdict(list)
+        for hall_id, start, end in (
+            Showtime.objects
+            .filter(hall_id__in=candidates)
+            # their cleaning buffer may reach into the first candidate
+            .overlapping(first_start - buffer, last_end)
+            .order_by()
+            .values_list("hall_id", "start_time", "end_time")
+        ):
+            existing[hall_id].append((start, end + buffer))
+
+        showtimes, conflicts = [], []
+        for hall_id, hall_candidates in candidates.items():
+            accepted, rejected = sweep(hall_candidates, existing[hall_id])
+            showtimes += accepted
+            conflicts += rejected
+
+        if showtimes and not dry_run:
+            try:
+                with transaction.atomic():
+                    Showtime.objects.bulk_create(showtimes, batch_size=1000)
+            except IntegrityError as e:
+                # a showtime saved elsewhere (e.g. the admin) after the read above
+                if not is_overlap_violation(e):
+                    raise
+                raise ValidationError("У цей час зал зайнятий: розклад щойно змінився, спробуйте ще раз.")
+            # bulk_create sends no post_save
+            bump_schedule_version()
+    return SchedulePlan(showtimes, conflicts)
+
+
+def sweep(candidates, existing):
+    """
+    Split one hall's ``candidates`` (``(start, end, item)``) into those that
+    fit and those that overlap ``existing`` (``(start, end)``) intervals or
+    a candidate accepted before them.
+
+    Existing intervals are sorted once with running maxima of their ends,
+    so each candidate is checked with a binary search; candidates are swept
+    in start order against the end of the last one accepted.
+    O((n + m) log(n + m)).
+    """
+    existing = sorted(existing)
+    starts = [start for start, _ in existing]
+    max_ends = list(accumulate((end for _, end in existing), max))
+
+    accepted, rejected = [], []
+    free_from = None
+    for start, end, item in sorted(candidates, key=lambda candidate: candidate[:2]):
+        # existing intervals starting before this one ends; the latest end among them
+        before_end = bisect_left(starts, end)
+        if (before_end and max_ends[before_end - 1] > start) or (free_from and start < free_from):
+            rejected.append(item)
+            continue
+        accepted.append(item)
+        free_from = end
+    return accepted, rejected
@@ -0,0 +1,125 @@
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+# Text search configuration of Movie.search_vector: no stemming, since
+# titles and descriptions come in several languages.
+SEARCH_CONFIG = "simple"
+
+_WORD = re.compile(r"\w+")
+
+
+def search_terms(query):
+    return [word.lower() for word in _WORD.findall(query)]
+
+
+class PostgresSearchBackend:
+    """
+    Ranked movie search on Postgres.
+
+    Every word of the query must prefix-match a word of the title or the
+    description (``Movie.search_vector``, GIN-indexed). When the ``pg_trgm``
+    extension is installed, titles that are merely similar to the query
+    (typos) match too and the similarity adds to the rank.
+    """
+
+    def __init__(self):
+        self._trigram = None
+
+    @property
+    def trigram(self):
+        if self._trigram is None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+                self._trigram = cursor.fetchone()[0]
+        return self._trigram
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+
+        # Prefix query built from sanitized words only, so user input can
+        # never break the tsquery syntax.
+        ts_query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms), config=SEARCH_CONFIG, search_type="raw"
+        )
+        matches = Q(search_vector=ts_query)
+        rank = SearchRank(F("search_vector"), ts_query)
+        if self.trigram:
+            matches |= Q(title__trigram_word_similar=query)
+            rank = rank + TrigramWordSimilarity(query, "title")
+        # double precision, so a rank read back from a page cursor compares
+        # equal to the one computed by Postgres (movies.pagination)
+        return (
+            queryset.filter(matches)
+            .annotate(rank=Cast(rank, FloatField()))
+            .order_by("-rank", "-created_at", "id")
+        )
+
+
+class SimpleSearchBackend:
+    """
+    Pure-Python stand-in for ``PostgresSearchBackend``, for databases
+    without text search. Scans the candidate titles and descriptions in
+    memory, so only suitable for small catalogues and tests.
+    """
+
+    # Words this similar to a title word count as a (misspelt) match
+    fuzzy_ratio = 0.75
+    limit = 500
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+
+        scored = []
+        rows = queryset.prefetch_related(None).order_by("-created_at", "id").values_list("pk", "title", "description")
+        for pk, title, description in rows.iterator():
+            score = self.score(terms, search_terms(title), search_terms(description))
+            if score:
+                scored.append((score, pk))
+        scored.sort(key=lambda item: -item[0])  # stable: ties stay newest first
+        ids = [pk for _, pk in scored[:self.limit]]
+        if not ids:
+            return queryset.none()
+        position = Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ids)])
+        return queryset.filter(pk__in=ids).annotate(rank=-position).order_by("-rank", "-created_at", "id")
+
+    def score(self, terms, title_words, description_words):
+        """Like the Postgres ranking: all terms must match, title words weigh more."""
+        total = 0.0
+        for term in terms:
+            if any(word.startswith(term) for word in title_words):
+                total += 2
+            elif any(word.startswith(term) for word in description_words):
+                total += 1
+            else:
+                similarity = max(
+                    (SequenceMatcher(None, term, word).ratio() for word in title_words), default=0
+                )
+                if similarity < self.fuzzy_ratio:
+                    return 0
+                total += similarity
+        return total
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    return import_string(settings.MOVIE_SEARCH_BACKEND)()
+
+
+@receiver(setting_changed)
+def _reset_search_backend(setting, **kwargs):
+    if setting == "MOVIE_SEARCH_BACKEND":
+        get_search_backend.cache_clear()
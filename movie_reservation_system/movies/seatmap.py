@@ -0,0 +1,137 @@
+from django.db.models import BigIntegerField, Value
+from django.utils import timezone
+
+from .models import Booking, Seat, SeatHold
+
+
+class SeatCell:
+    """
+    A single seat on the map. Slotted to keep big halls cheap in memory.
+
+    ``occupied`` covers booked seats and seats held by other users;
+    ``held`` marks the viewer's own holds.
+    """
+
+    __slots__ = ("id", "number", "occupied", "held")
+
+    def __init__(self, id, number, occupied=False, held=False):
+        self.id = id
+        self.number = number
+        self.occupied = occupied
+        self.held = held
+
+
+class SeatRow:
+    __slots__ = ("row", "seats")
+
+    def __init__(self, row, seats):
+        self.row = row
+        self.seats = seats
+
+
+class SeatMap:
+    """
+    Row/seat grid of a hall for one showtime.
+
+    Built from exactly two queries: the hall's seats and the showtime's
+    booked and held seat ids. Everything else happens in memory.
+    """
+
+    __slots__ = ("hall", "rows", "_by_id")
+
+    def __init__(self, hall, rows):
+        self.hall = hall
+        self.rows = rows
+        self._by_id = {seat.id: seat for row in rows for seat in row.seats}
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, seat_id):
+        return seat_id in self._by_id
+
+    def seat(self, seat_id):
+        return self._by_id[seat_id]
+
+    @property
+    def occupied_ids(self):
+        return {seat_id for seat_id, seat in self._by_id.items() if seat.occupied}
+
+    def encode(self):
+        """
+        Compact availability: one string per row, ``"1"`` for an unavailable
+        (or missing) seat and ``"0"`` for a free one, indexed by seat number.
+        """
+        encoded = {}
+        for row in self.rows:
+            bits = bytearray(b"1" * self.hall.seats_per_row)
+            for seat in row.seats:
+                if not seat.occupied:
+                    bits[seat.number - 1] = 48  # "0"
+            encoded[row.row] = bits.decode()
+        return encoded
+
+    @property
+    def held_ids(self):
+        return {seat_id for seat_id, seat in self._by_id.items() if seat.held}
+
+    @classmethod
+    def for_showtime(cls, showtime, user=None):
+        occupied, held = load_unavailable_seats(showtime, user)
+        return cls.build(showtime.hall, load_hall_seats(showtime.hall), occupied, held)
+
+    @classmethod
+    def build(cls, hall, seats, occupied=(), held=()):
+        """
+        Build the grid from ``(id, row, number)`` tuples.
+
+        Seats that fall outside the hall's current layout are ignored.
+        """
+        labels = hall.row_labels()
+        grid = {label: [None] * hall.seats_per_row for label in labels}
+        for seat_id, row, number in seats:
+            cells = grid.get(row)
+            if cells is None or not 1 <= number <= hall.seats_per_row:
+                continue
+            cells[number - 1] = SeatCell(seat_id, number, seat_id in occupied, seat_id in held)
+
+        rows = [
+            SeatRow(label, [cell for cell in grid[label] if cell is not None])
+            for label in labels
+        ]
+        return cls(hall, rows)
+
+
+def load_hall_seats(hall):
+    """Return ``(id, row, number)`` for every seat of the hall in one query."""
+    return list(Seat.objects.filter(hall=hall).values_list("id", "row", "number"))
+
+
+def load_unavailable_seats(showtime, user=None):
+    """
+    Return ``(occupied, held)`` seat id sets for the showtime in one query.
+
+    ``occupied`` are booked seats plus seats actively held by anyone but
+    ``user``; ``held`` are the seats ``user`` is currently holding.
+    """
+    no_holder = Value(None, output_field=BigIntegerField())
+    booked = (
+        Booking.objects.filter(showtime=showtime)
+        .annotate(holder=no_holder)
+        .values_list("seat_id", "holder")
+    )
+    holds = (
+        SeatHold.objects.filter(showtime=showtime, expires_at__gt=timezone.now())
+        .values_list("seat_id", "user_id")
+    )
+    user_id = user.pk if user is not None else None
+    occupied, held = set(), set()
+    for seat_id, holder in booked.union(holds, all=True):
+        if holder is not None and holder == user_id:
+            held.add(seat_id)
+        else:
+            occupied.add(seat_id)
+    return occupied, held - occupied
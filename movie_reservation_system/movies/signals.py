@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_schedule_version
+from .models import DEFAULT_DURATION_MINUTES, Hall, Movie, MovieGenre, Order, Showtime
+from .posters import build_poster_variants
+
+SCHEDULE_MODELS = (Showtime, Movie, Hall, MovieGenre)
+
+
+def invalidate_schedule(sender, **kwargs):
+    # Bulk writes (QuerySet.update, bulk_create) send no signals and must
+    # call bump_schedule_version themselves.
+    bump_schedule_version()
+
+
+for model in SCHEDULE_MODELS:
+    post_save.connect(invalidate_schedule, sender=model, dispatch_uid=f"schedule_save_{model.__name__}")
+    post_delete.connect(invalidate_schedule, sender=model, dispatch_uid=f"schedule_delete_{model.__name__}")
+
+
+@receiver(m2m_changed, sender=Movie.genres.through, dispatch_uid="schedule_movie_genres")
+def invalidate_schedule_genres(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_schedule_version()
+
+
+@receiver(post_save, sender=Movie, dispatch_uid="poster_variants")
+def build_poster_variants_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Rebuild the poster variants after commit when the poster URL changed,
+    unless building from this URL already failed (the command retries it).
+    """
+    if raw or not settings.POSTER_VARIANTS_ON_SAVE:
+        return
+    variants = instance.poster_variants
+    if instance.poster_url not in (variants.get("source", ""), variants.get("failed")):
+        transaction.on_commit(lambda: build_poster_variants([instance], workers=0), robust=True)
+
+
+@receiver(post_save, sender=Showtime, dispatch_uid="order_starts_at")
+def sync_order_starts_at(sender, instance, created, raw=False, **kwargs):
+    """Keep ``Order.starts_at`` in step when a showtime is moved."""
+    if created or raw:
+        return
+    Order.objects.filter(showtime=instance).exclude(starts_at=instance.start_time).update(
+        starts_at=instance.start_time
+    )
+
+
+@receiver(post_save, sender=Movie, dispatch_uid="showtime_end_time")
+def sync_showtime_end_time(sender, instance, created, raw=False, **kwargs):
+    """Keep ``Showtime.end_time`` in step with the movie's duration, in one UPDATE."""
+    if created or raw:
+        return
+    end_time = F("start_time") + timedelta(minutes=instance.duration_minutes or DEFAULT_DURATION_MINUTES)
+    Showtime.objects.filter(movie=instance).exclude(end_time=end_time).update(end_time=end_time)
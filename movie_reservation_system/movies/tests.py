@@ -1,14 +1,57 @@
+import asyncio
+import base64
+import csv
+import gzip
+import json
+import os
+import importlib
+import sys
+import tempfile
+import threading
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import UTC, date, datetime
+from io import BytesIO, StringIO
 from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test.utils import CaptureQueriesContext
-from django.db import connection
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 from django.urls import reverse
 from unittest.mock import patch
 
 from movies.models import Movie
 from movies.models import MovieGenre
+from movies.models import Booking, Hall, Order, Seat, SeatHold, Showtime, row_label
+from movies import azure_sas
+from movies.booking import (
+    InvalidSeatsError, SeatsTakenError, book_seats, cancel_bookings, cancel_order, delete_booking,
+    hold_seats, reap_expired_holds,
+)
+from movies.best_available import NoContiguousSeatsError, book_best_available, find_best_block
+from movies.cache import VERSION_KEY, bump_schedule_version, schedule_version
+from movies.events import InProcessBroker, get_broker
+from movies.exports import BOOKING_COLUMNS, aexport_lines, export_lines
+from movies.facets import genre_facets
+from movies.imports import import_file
+from movies.imaging import POSTER_WIDTHS, available_formats, render_variants
+from movies.pagination import EstimatedCountPaginator, decode_cursor, encode_cursor
+from movies.posters import build_poster_variants
+from movies.search import PostgresSearchBackend, SimpleSearchBackend, get_search_backend
+from movies.schedule import cinema_now, cinema_timezone, day_bounds, showtimes_on
+from movies.scheduling import parse_slots, schedule_showtimes, sweep
+from movies.seatmap import SeatMap
 
 
 class MoviesTest(TestCase):
@@ -156,3 +199,2075 @@ class MovieListViewTests(TestCase):
         # Expected: ~2-3 queries (movies + genres + maybe session)
         with self.assertNumQueriesLessThan(5):
             self.client.get(self.url, follow=True)
+
+
+class BookingDetailViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="viewer@example.com", password="Pass123!"
+        )
+        self.client.login(email="viewer@example.com", password="Pass123!")
+        self.movie = Movie.objects.create(title="Seat Map Movie")
+
+    def make_showtime(self, rows, seats_per_row):
+        hall = Hall.objects.create(name=f"Hall {rows}x{seats_per_row}",
+                                   rows=rows, seats_per_row=seats_per_row)
+        return Showtime.objects.create(movie=self.movie, hall=hall,
+                                       start_time=timezone.now() + timedelta(days=1))
+
+    def count_queries(self, showtime):
+        url = reverse("movies:booking_detail", args=[showtime.id])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_seat_map_query_count_does_not_depend_on_hall_size(self):
+        small = self.make_showtime(3, 4)
+        big = self.make_showtime(20, 30)
+        seat_id = SeatMap.for_showtime(big).rows[5].seats[7].id
+        Booking.objects.create(showtime=big, user=self.user, seat_id=seat_id)
+
+        self.assertEqual(self.count_queries(small), self.count_queries(big))
+
+    def test_seat_map_marks_occupied_seats(self):
+        showtime = self.make_showtime(2, 3)
+        seat_map = SeatMap.for_showtime(showtime)
+        taken = seat_map.rows[1].seats[2]
+        Booking.objects.create(showtime=showtime, user=self.user, seat_id=taken.id)
+
+        seat_map = SeatMap.for_showtime(showtime)
+
+        self.assertEqual([row.row for row in seat_map], ["A", "B"])
+        self.assertEqual([s.number for s in seat_map.rows[0].seats], [1, 2, 3])
+        self.assertEqual(seat_map.occupied_ids, {taken.id})
+
+    def test_seat_map_builds_in_two_queries(self):
+        showtime = self.make_showtime(10, 12)
+
+        with self.assertNumQueries(2):
+            seat_map = SeatMap.for_showtime(showtime)
+        self.assertEqual(sum(len(row.seats) for row in seat_map), 120)
+
+
+class HallSeatsTests(TestCase):
+    def seat_keys(self, hall):
+        return set(Seat.objects.filter(hall=hall).values_list("row", "number"))
+
+    def test_row_labels_go_past_z(self):
+        self.assertEqual([row_label(i) for i in (0, 25, 26, 27, 51, 52, 701)],
+                         ["A", "Z", "AA", "AB", "AZ", "BA", "ZZ"])
+
+    def test_creating_hall_materializes_seats_in_bulk(self):
+        # savepoints + hall insert + one seat select + one bulk seat insert
+        with self.assertNumQueries(7):
+            hall = Hall.objects.create(name="Big", rows=30, seats_per_row=40)
+
+        self.assertEqual(Seat.objects.filter(hall=hall).count(), 1200)
+        self.assertIn(("AD", 40), self.seat_keys(hall))
+
+    def test_resize_prunes_unbooked_seats_only(self):
+        user = get_user_model().objects.create_user(email="resize@example.com", password="Pass123!")
+        hall = Hall.objects.create(name="Resize", rows=3, seats_per_row=3)
+        showtime = Showtime.objects.create(movie=Movie.objects.create(title="M"), hall=hall,
+                                           start_time=timezone.now())
+        booked = Seat.objects.get(hall=hall, row="C", number=3)
+        Booking.objects.create(showtime=showtime, seat=booked, user=user)
+
+        hall.rows, hall.seats_per_row = 2, 4
+        hall.save()
+
+        expected = {(r, n) for r in "AB" for n in range(1, 5)} | {("C", 3)}
+        self.assertEqual(self.seat_keys(hall), expected)
+        # the booked seat survives but is not part of the map any more
+        self.assertNotIn(booked.id, SeatMap.for_showtime(showtime))
+
+    def test_saving_without_resize_does_not_touch_seats(self):
+        hall = Hall.objects.create(name="Same", rows=2, seats_per_row=2)
+        hall.name = "Renamed"
+        with self.assertNumQueries(3):
+            hall.save()
+
+    def test_loaded_halls_compare_their_layout_without_extra_queries(self):
+        Hall.objects.create(name="Loaded", rows=2, seats_per_row=2)
+
+        hall = Hall.objects.get(name="Loaded")
+        hall.name = "Renamed"
+        with self.assertNumQueries(3):
+            hall.save()
+
+        partial = Hall.objects.only("name").get(name="Renamed")
+        partial.name = "Partial"
+        with self.assertNumQueries(1):  # just the UPDATE of the name
+            partial.save()
+
+        resized = Hall.objects.defer("name").get(name="Partial")
+        resized.rows = 3
+        resized.save()
+        self.assertEqual(len(self.seat_keys(resized)), 6)
+
+    def test_materialize_seats_command_backfills_halls(self):
+        hall = Hall.objects.create(name="Legacy", rows=2, seats_per_row=2)
+        Seat.objects.filter(hall=hall).delete()
+
+        call_command("materialize_seats", stdout=StringIO())
+
+        self.assertEqual(len(self.seat_keys(hall)), 4)
+
+
+class BookSeatsTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="buyer@example.com", password="Pass123!")
+        self.other = User.objects.create_user(email="rival@example.com", password="Pass123!")
+        self.hall = Hall.objects.create(name="Main", rows=3, seats_per_row=4)
+        self.showtime = Showtime.objects.create(movie=Movie.objects.create(title="Booked"),
+                                                hall=self.hall, start_time=timezone.now() + timedelta(days=1))
+        self.seats = {f"{s.row}{s.number}": s.id for s in Seat.objects.filter(hall=self.hall)}
+
+    def test_books_all_seats_with_one_insert(self):
+        ids = [self.seats["A1"], self.seats["A2"], self.seats["B3"]]
+        # savepoint, lock, validate, conflicts, order, bulk insert, drop holds, release
+        with self.assertNumQueries(8):
+            bookings = book_seats(self.showtime, self.user, ids)
+
+        self.assertEqual(len(bookings), 3)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 3)
+
+    def test_conflict_books_nothing_and_reports_taken_seats(self):
+        Booking.objects.create(showtime=self.showtime, seat_id=self.seats["A2"], user=self.other)
+
+        with self.assertRaises(SeatsTakenError) as ctx:
+            book_seats(self.showtime, self.user, [self.seats["A1"], self.seats["A2"]])
+
+        self.assertEqual(ctx.exception.seat_ids, [self.seats["A2"]])
+        self.assertEqual(ctx.exception.labels, ["A2"])
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+    def test_conflict_gone_by_the_fallback_is_retried_once(self):
+        bulk_create = Booking.objects.bulk_create
+        attempts = []
+
+        def conflict_once(objs, *args, **kwargs):
+            attempts.append(objs)
+            if len(attempts) == 1:
+                raise IntegrityError("duplicate key value violates unique constraint")
+            return bulk_create(objs, *args, **kwargs)
+
+        with patch.object(Booking.objects, "bulk_create", side_effect=conflict_once):
+            bookings = book_seats(self.showtime, self.user, [self.seats["A1"]])
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual([b.seat_id for b in bookings], [self.seats["A1"]])
+        self.assertEqual(Order.objects.get(user=self.user).seat_count, 1)
+
+        with patch.object(Booking.objects, "bulk_create", side_effect=IntegrityError("still failing")):
+            with self.assertRaises(IntegrityError):
+                book_seats(self.showtime, self.user, [self.seats["A2"]])
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 1)
+
+    def test_rejects_seats_from_another_hall(self):
+        foreign = Seat.objects.filter(hall=Hall.objects.create(name="Other", rows=1, seats_per_row=1)).get()
+
+        with self.assertRaises(InvalidSeatsError) as ctx:
+            book_seats(self.showtime, self.user, [self.seats["A1"], foreign.id])
+
+        self.assertEqual(ctx.exception.seat_ids, [foreign.id])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_view_reports_conflict_instead_of_500(self):
+        Booking.objects.create(showtime=self.showtime, seat_id=self.seats["C4"], user=self.other)
+        self.client.login(email="buyer@example.com", password="Pass123!")
+        url = reverse("movies:booking_detail", args=[self.showtime.id])
+
+        response = self.client.post(url, {"selected_seats": [self.seats["C3"], self.seats["C4"]]}, follow=True)
+
+        self.assertRedirects(response, url)
+        self.assertContains(response, "C4")
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+    def test_view_rejects_garbage_seat_ids(self):
+        self.client.login(email="buyer@example.com", password="Pass123!")
+        url = reverse("movies:booking_detail", args=[self.showtime.id])
+
+        response = self.client.post(url, {"selected_seats": ["abc"]})
+
+        self.assertRedirects(response, url)
+        self.assertFalse(Booking.objects.exists())
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_only_one_of_many_competing_checkouts_wins(self):
+        User = get_user_model()
+        users = [User.objects.create_user(email=f"u{i}@example.com", password="Pass123!") for i in range(8)]
+        hall = Hall.objects.create(name="Rush", rows=1, seats_per_row=4)
+        showtime = Showtime.objects.create(movie=Movie.objects.create(title="Premiere"),
+                                           hall=hall, start_time=timezone.now() + timedelta(days=1))
+        seat_ids = list(Seat.objects.filter(hall=hall).values_list("id", flat=True)[:2])
+
+        def attempt(user):
+            try:
+                book_seats(showtime, user, seat_ids)
+                return "booked"
+            except SeatsTakenError as e:
+                return tuple(e.seat_ids)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(attempt, users))
+
+        self.assertEqual(results.count("booked"), 1)
+        self.assertEqual(results.count(tuple(sorted(seat_ids))), 7)
+        self.assertEqual(Booking.objects.filter(showtime=showtime).count(), 2)
+
+
+class SeatHoldTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="holder@example.com", password="Pass123!")
+        self.other = User.objects.create_user(email="late@example.com", password="Pass123!")
+        hall = Hall.objects.create(name="Holds", rows=2, seats_per_row=3)
+        self.showtime = Showtime.objects.create(movie=Movie.objects.create(title="Held"),
+                                                hall=hall, start_time=timezone.now() + timedelta(days=1))
+        self.seats = {f"{s.row}{s.number}": s.id for s in Seat.objects.filter(hall=hall)}
+
+    def test_held_seats_are_unavailable_to_others(self):
+        hold_seats(self.showtime, self.user, {self.seats["A1"], self.seats["A2"]})
+
+        self.assertEqual(SeatMap.for_showtime(self.showtime, self.other).occupied_ids,
+                         {self.seats["A1"], self.seats["A2"]})
+        own = SeatMap.for_showtime(self.showtime, self.user)
+        self.assertEqual(own.occupied_ids, set())
+        self.assertEqual(own.held_ids, {self.seats["A1"], self.seats["A2"]})
+        with self.assertRaises(SeatsTakenError) as ctx:
+            book_seats(self.showtime, self.other, [self.seats["A2"], self.seats["B1"]])
+        self.assertEqual(ctx.exception.labels, ["A2"])
+
+    def test_holding_replaces_previous_selection(self):
+        hold_seats(self.showtime, self.user, {self.seats["A1"], self.seats["A2"]})
+        hold_seats(self.showtime, self.user, {self.seats["A2"], self.seats["A3"]})
+
+        self.assertEqual(set(SeatHold.objects.values_list("seat_id", flat=True)),
+                         {self.seats["A2"], self.seats["A3"]})
+
+    def test_booking_converts_own_holds(self):
+        hold_seats(self.showtime, self.user, {self.seats["B2"]})
+
+        book_seats(self.showtime, self.user, [self.seats["B2"]])
+
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertTrue(Booking.objects.filter(user=self.user, seat_id=self.seats["B2"]).exists())
+
+    def test_expired_holds_are_ignored_and_taken_over(self):
+        hold_seats(self.showtime, self.user, {self.seats["A1"]}, seconds=-1)
+
+        self.assertEqual(SeatMap.for_showtime(self.showtime, self.other).occupied_ids, set())
+        hold_seats(self.showtime, self.other, {self.seats["A1"]})
+        self.assertEqual(SeatHold.objects.get().user, self.other)
+
+    def test_reaper_deletes_expired_holds_in_batches(self):
+        hold_seats(self.showtime, self.user, set(list(self.seats.values())[:5]), seconds=-10)
+        hold_seats(self.showtime, self.other, {self.seats["B3"]})
+
+        self.assertEqual(reap_expired_holds(batch_size=2), 2)
+        call_command("reap_seat_holds", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(list(SeatHold.objects.values_list("seat_id", flat=True)), [self.seats["B3"]])
+
+    def test_reaper_spares_a_hold_taken_over_after_expiry(self):
+        hold_seats(self.showtime, self.user, {self.seats["A1"]}, seconds=-10)
+        expired_at = timezone.now()
+        hold = SeatHold.objects.get()
+        hold_seats(self.showtime, self.other, {self.seats["A1"]})
+
+        self.assertEqual(reap_expired_holds(now=expired_at), 0)
+        self.assertEqual(SeatHold.objects.get().pk, hold.pk)  # the upsert kept the row
+
+    def test_hold_endpoint_reports_conflicts(self):
+        hold_seats(self.showtime, self.other, {self.seats["A3"]})
+        self.client.login(email="holder@example.com", password="Pass123!")
+        url = reverse("movies:seat_hold", args=[self.showtime.id])
+
+        ok = self.client.post(url, {"selected_seats": [self.seats["A1"]]})
+        conflict = self.client.post(url, {"selected_seats": [self.seats["A1"], self.seats["A3"]]})
+
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual(ok.json()["held"], [self.seats["A1"]])
+        self.assertEqual(conflict.status_code, 409)
+        self.assertEqual(conflict.json()["labels"], ["A3"])
+
+
+class SeatAvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="poll@example.com", password="Pass123!")
+        hall = Hall.objects.create(name="Poll", rows=2, seats_per_row=4)
+        self.showtime = Showtime.objects.create(movie=Movie.objects.create(title="Polled"),
+                                                hall=hall, start_time=timezone.now() + timedelta(days=1))
+        self.seats = {f"{s.row}{s.number}": s.id for s in Seat.objects.filter(hall=hall)}
+        self.url = reverse("movies:seat_availability", args=[self.showtime.id])
+
+    def test_returns_bitstring_per_row(self):
+        book_seats(self.showtime, self.user, [self.seats["A2"]])
+        hold_seats(self.showtime, self.user, {self.seats["B4"]})
+
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data["rows"], {"A": "0100", "B": "0001"})
+        self.assertEqual(data["seats_per_row"], 4)
+
+    def test_stale_save_never_lowers_the_version(self):
+        stale = Showtime.objects.get(pk=self.showtime.pk)
+        etag = self.client.get(self.url)["ETag"]
+        book_seats(self.showtime, self.user, [self.seats["A1"]])
+
+        stale.price = 200
+        stale.save()
+
+        self.assertEqual(Showtime.objects.get(pk=self.showtime.pk).seat_version, 1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unchanged_showtime_answers_304_with_one_query(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_booking_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        book_seats(self.showtime, self.user, [self.seats["A1"]])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["rows"]["A"], "1000")
+
+    def test_failed_booking_keeps_etag(self):
+        book_seats(self.showtime, self.user, [self.seats["A1"]])
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertRaises(SeatsTakenError):
+            book_seats(self.showtime, self.user, [self.seats["A1"]])
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_expired_hold_changes_etag_before_it_is_reaped(self):
+        hold_seats(self.showtime, self.user, {self.seats["B4"]})
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["rows"]["B"], "0000")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_unknown_showtime_is_404(self):
+        self.assertEqual(self.client.get(reverse("movies:seat_availability", args=[999])).status_code, 404)
+
+
+class RecordingBroker(InProcessBroker):
+    """Local stand-in that also remembers everything published."""
+
+    def __init__(self):
+        super().__init__(queue_size=2)
+        self.published = []
+
+    def publish(self, showtime_id, event):
+        self.published.append((showtime_id, event))
+        super().publish(showtime_id, event)
+
+
+@override_settings(SEAT_EVENTS_BROKER="movies.tests.RecordingBroker", SEAT_EVENTS_HEARTBEAT_SECONDS=0.05)
+class SeatEventsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="live@example.com", password="Pass123!")
+        hall = Hall.objects.create(name="Live", rows=1, seats_per_row=3)
+        self.showtime = Showtime.objects.create(movie=Movie.objects.create(title="Live"),
+                                                hall=hall, start_time=timezone.now() + timedelta(days=1))
+        self.seat_ids = list(Seat.objects.filter(hall=hall).order_by("number").values_list("id", flat=True))
+
+    def test_booking_flow_publishes_deltas_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hold_seats(self.showtime, self.user, {self.seat_ids[0], self.seat_ids[1]})
+        self.assertEqual(get_broker().published, [
+            (self.showtime.id, {"type": "held", "seats": self.seat_ids[:2]}),
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seats(self.showtime, self.user, [self.seat_ids[0]])
+
+        self.assertEqual(get_broker().published[1:], [
+            (self.showtime.id, {"type": "booked", "seats": [self.seat_ids[0]]}),
+            (self.showtime.id, {"type": "released", "seats": [self.seat_ids[1]]}),
+        ])
+
+    def test_failed_booking_publishes_nothing(self):
+        book_seats(self.showtime, self.user, [self.seat_ids[2]])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(SeatsTakenError):
+                book_seats(self.showtime, self.user, [self.seat_ids[2]])
+        self.assertEqual(callbacks, [])
+
+    async def test_broker_delivers_events_published_from_other_threads(self):
+        broker = get_broker()
+        with broker.subscribe(7) as subscription:
+            thread = threading.Thread(target=broker.publish, args=(7, {"type": "booked", "seats": [1]}))
+            thread.start()
+            event = await asyncio.wait_for(subscription.get(), timeout=1)
+            thread.join()
+        self.assertEqual(event, {"type": "booked", "seats": [1]})
+        self.assertEqual(broker.subscriber_count(7), 0)
+
+    async def test_slow_subscriber_gets_a_single_sync_event(self):
+        broker = get_broker()
+        with broker.subscribe(7) as subscription:
+            for i in range(5):
+                broker.publish(7, {"type": "held", "seats": [i]})
+            await asyncio.sleep(0)
+            events = [await subscription.get() for _ in range(3)]
+        self.assertEqual([e["type"] for e in events], ["held", "held", "sync"])
+
+    async def test_stream_sends_published_events(self):
+        response = await self.async_client.get(reverse("movies:seat_events", args=[self.showtime.id]))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+
+        get_broker().publish(self.showtime.id, {"type": "booked", "seats": [5]})
+        chunk = await asyncio.wait_for(anext(chunks), timeout=1)
+
+        self.assertEqual(chunk, b'event: booked\ndata: {"type": "booked", "seats": [5]}\n\n')
+        await chunks.aclose()
+
+    async def test_stream_emits_sync_when_version_changes_elsewhere(self):
+        response = await self.async_client.get(reverse("movies:seat_events", args=[self.showtime.id]))
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)
+        self.assertEqual(await anext(chunks), b": keep-alive\n\n")
+
+        await Showtime.objects.filter(id=self.showtime.id).aupdate(seat_version=99)
+
+        self.assertEqual(await anext(chunks), b'event: sync\ndata: {"type": "sync"}\n\n')
+        await chunks.aclose()
+
+    async def test_unknown_showtime_is_404(self):
+        response = await self.async_client.get(reverse("movies:seat_events", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class SeatsSoldCounterTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="count@example.com", password="Pass123!")
+        self.password = "Pass123!"
+        self.hall = Hall.objects.create(name="Counted", rows=2, seats_per_row=10)
+        self.movie = Movie.objects.create(title="Counted")
+        self.showtime = Showtime.objects.create(movie=self.movie, hall=self.hall,
+                                                start_time=timezone.now() + timedelta(days=1))
+        self.seat_ids = list(Seat.objects.filter(hall=self.hall).values_list("id", flat=True))
+
+    def sold(self):
+        self.showtime.refresh_from_db()
+        return self.showtime.seats_sold
+
+    def test_saving_a_stale_showtime_keeps_the_counter(self):
+        stale = Showtime.objects.get(pk=self.showtime.pk)
+        book_seats(self.showtime, self.user, self.seat_ids[:3])
+
+        stale.price = 200
+        stale.save()
+
+        self.assertEqual(self.sold(), 3)
+        self.assertEqual(self.showtime.price, 200)
+
+    def test_booking_and_cancelling_keep_counter_in_step(self):
+        bookings = book_seats(self.showtime, self.user, self.seat_ids[:3])
+        self.assertEqual(self.sold(), 3)
+
+        delete_booking(bookings[0])
+        self.assertEqual(self.sold(), 2)
+
+    def test_failed_booking_does_not_change_counter(self):
+        book_seats(self.showtime, self.user, self.seat_ids[:1])
+        with self.assertRaises(SeatsTakenError):
+            book_seats(self.showtime, self.user, self.seat_ids[:2])
+        self.assertEqual(self.sold(), 1)
+
+    def test_availability_badges(self):
+        self.assertIsNone(self.showtime.availability)
+        self.showtime.seats_sold = 10
+        self.assertEqual(self.showtime.availability, "few_left")
+        self.assertEqual(self.showtime.seats_remaining, 10)
+        self.showtime.seats_sold = 20
+        self.assertEqual(self.showtime.availability, "sold_out")
+
+    def test_reconcile_command_rebuilds_counters(self):
+        book_seats(self.showtime, self.user, self.seat_ids[:4])
+        other = Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=timezone.now())
+        Showtime.objects.filter(id=self.showtime.id).update(seats_sold=17)
+        Showtime.objects.filter(id=other.id).update(seats_sold=5)
+
+        call_command("reconcile_seat_counts", stdout=StringIO())
+
+        self.assertEqual(self.sold(), 4)
+        other.refresh_from_db()
+        self.assertEqual(other.seats_sold, 0)
+
+    def test_listing_badges_cost_no_extra_queries(self):
+        book_seats(self.showtime, self.user, self.seat_ids)
+        day = timezone.localtime(self.showtime.start_time).date()
+        url = reverse("movies:showtimes_by_date", args=[day.isoformat()])
+        self.client.get(url)
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(url)
+        for i in range(5):
+            hall = Hall.objects.create(name=f"Extra {i}", rows=1, seats_per_row=1)
+            Showtime.objects.create(movie=self.movie, hall=hall, start_time=self.showtime.start_time)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(len(one), len(many))
+        self.assertContains(response, "Квитків немає")
+
+    def test_movie_detail_shows_badges_without_n_plus_one(self):
+        cache.clear()
+        for i in range(5):
+            hall = Hall.objects.create(name=f"Extra {i}", rows=1, seats_per_row=1)
+            Showtime.objects.create(movie=self.movie, hall=hall, start_time=self.showtime.start_time)
+        day = timezone.localtime(self.showtime.start_time).date()
+        url = reverse("movies:movie_detail", args=[self.movie.id]) + f"?date={day.isoformat()}"
+
+        with self.assertNumQueries(3):  # movie, showtimes with halls, genres
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+class BestAvailableTests(TestCase):
+    def test_empty_hall_gets_centre_of_ideal_row(self):
+        rows = ["0" * 12] * 10
+        self.assertEqual(find_best_block(rows, 4), (5, 4))
+
+    def test_avoids_leaving_single_orphan_seats(self):
+        # centring the pair in "1000001" would leave a lone seat on one side
+        self.assertEqual(find_best_block(["1000001"], 2), (0, 1))
+
+    def test_skips_rows_without_long_enough_run(self):
+        rows = ["1010101010", "1111000111", "0101010101"]
+        self.assertEqual(find_best_block(rows, 3), (1, 4))
+        self.assertIsNone(find_best_block(rows, 4))
+
+    def test_large_crowded_hall(self):
+        rows = ["1" * 120] * 60
+        rows[7] = "1" * 100 + "00000" + "1" * 15
+        self.assertEqual(find_best_block(rows, 5), (7, 100))
+
+    def test_books_best_block_atomically(self):
+        user = get_user_model().objects.create_user(email="group@example.com", password="Pass123!")
+        hall = Hall.objects.create(name="Group", rows=3, seats_per_row=6)
+        showtime = Showtime.objects.create(movie=Movie.objects.create(title="Group"),
+                                           hall=hall, start_time=timezone.now() + timedelta(days=1))
+
+        bookings = book_best_available(showtime, user, 4)
+
+        # centring 4 of 6 seats would strand one seat on each side
+        self.assertEqual(sorted((b.seat.row, b.seat.number) for b in bookings),
+                         [("B", 1), ("B", 2), ("B", 3), ("B", 4)])
+        with self.assertRaises(NoContiguousSeatsError):
+            book_best_available(showtime, user, 7)
+
+    def test_view_books_requested_quantity(self):
+        get_user_model().objects.create_user(email="group@example.com", password="Pass123!")
+        self.client.login(email="group@example.com", password="Pass123!")
+        hall = Hall.objects.create(name="Group", rows=2, seats_per_row=5)
+        showtime = Showtime.objects.create(movie=Movie.objects.create(title="Group"),
+                                           hall=hall, start_time=timezone.now() + timedelta(days=1))
+
+        response = self.client.post(reverse("movies:booking_detail", args=[showtime.id]), {"quantity": "3"})
+
+        self.assertRedirects(response, reverse("movies:booking_success", args=[showtime.id]))
+        self.assertEqual(Booking.objects.filter(showtime=showtime).count(), 3)
+
+
+@override_settings(CINEMA_TIME_ZONE="Europe/Kyiv")
+class DayFilteringTests(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(title="Late Show", duration_minutes=20)
+        self.hall = Hall.objects.create(name="Night", rows=1, seats_per_row=1)
+
+    def at(self, *args):
+        return datetime(*args, tzinfo=cinema_timezone())
+
+    def test_day_bounds_are_local_midnights(self):
+        start, end = day_bounds(date(2025, 10, 26))  # DST ends: a 25 hour day
+        self.assertEqual(start, self.at(2025, 10, 26))
+        self.assertEqual(end, self.at(2025, 10, 27))
+        # Same-zone datetimes subtract as wall time; compare in UTC instead.
+        self.assertEqual(end.astimezone(UTC) - start.astimezone(UTC), timedelta(hours=25))
+
+    def test_late_showtimes_stay_on_their_local_day(self):
+        late = Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.at(2025, 6, 1, 23, 30))
+        Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.at(2025, 6, 2, 0, 0))
+        Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.at(2025, 5, 31, 23, 59))
+
+        response = self.client.get(reverse("movies:showtimes_by_date", args=["2025-06-01"]))
+        self.assertEqual(list(response.context["movies_dict"][self.movie]), [late])
+
+        response = self.client.get(reverse("movies:movie_detail", args=[self.movie.id]) + "?date=2025-06-01")
+        self.assertEqual(list(response.context["showtimes"]), [late])
+
+    def test_day_query_uses_composite_indexes(self):
+        """Seed 200k showtimes and check the planner picks an index for both views."""
+        other = Movie.objects.create(title="Other")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO movies_showtime
+                    (movie_id, hall_id, start_time, end_time, price, created_at, seat_version, seats_sold)
+                SELECT CASE WHEN i %% 50 = 0 THEN %s ELSE %s END, %s,
+                       TIMESTAMPTZ '2024-01-01 10:00+00' + i * INTERVAL '7 minutes',
+                       TIMESTAMPTZ '2024-01-01 10:05+00' + i * INTERVAL '7 minutes',
+                       150, now(), 0, 0
+                FROM generate_series(1, 200000) AS i
+                """,
+                [self.movie.id, other.id, self.hall.id],
+            )
+            cursor.execute("ANALYZE movies_showtime")
+
+        day = date(2025, 6, 1)
+        listing = showtimes_on(day, Showtime.objects.select_related("movie", "hall")).order_by("start_time")
+        per_movie = showtimes_on(day, self.movie.showtimes.all()).order_by("start_time")
+
+        for queryset in (listing, per_movie):
+            plan = queryset.explain()
+            self.assertIn("Index", plan)
+            self.assertNotIn("Seq Scan on movies_showtime", plan)
+        self.assertIn("start_t", listing.explain())
+        self.assertIn("movie_i", per_movie.explain())
+
+
+class ScheduleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.genre = MovieGenre.objects.create(name="Драма")
+        self.movie = Movie.objects.create(title="Cached", duration_minutes=100)
+        self.hall = Hall.objects.create(name="Blue", rows=1, seats_per_row=5)
+        self.showtime = Showtime.objects.create(movie=self.movie, hall=self.hall,
+                                                start_time=timezone.now() + timedelta(days=1))
+        day = timezone.localtime(self.showtime.start_time).date().isoformat()
+        self.day_url = reverse("movies:showtimes_by_date", args=[day])
+        self.detail_url = reverse("movies:movie_detail", args=[self.movie.id]) + f"?date={day}"
+
+    def test_repeated_pages_are_served_from_cache(self):
+        for url in (self.day_url, self.detail_url):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertContains(response, "Blue")
+
+    def test_day_listing_prefetches_genres(self):
+        self.movie.genres.add(self.genre)
+        other = Movie.objects.create(title="Other")
+        other.genres.add(self.genre)
+        Showtime.objects.create(movie=other, hall=Hall.objects.create(name="Other", rows=1, seats_per_row=1),
+                                start_time=self.showtime.start_time)
+
+        with self.assertNumQueries(2):  # showtimes with movies and halls, genres
+            response = self.client.get(self.day_url)
+        self.assertContains(response, "Драма", count=2)
+
+    def warm(self):
+        for url in (self.day_url, self.detail_url):
+            self.client.get(url)
+
+    def assertPagesContain(self, text):
+        for url in (self.day_url, self.detail_url):
+            self.assertContains(self.client.get(url), text)
+
+    def test_movie_and_hall_edits_invalidate(self):
+        self.warm()
+        self.movie.title = "Renamed"
+        self.movie.save()
+        self.assertPagesContain("Renamed")
+
+        self.hall.name = "Green"
+        self.hall.save()
+        self.assertPagesContain("Green")
+
+    def test_genre_changes_invalidate(self):
+        self.warm()
+        self.movie.genres.add(self.genre)
+        self.assertPagesContain("Драма")
+
+        self.genre.name = "Комедія"
+        self.genre.save()
+        self.assertPagesContain("Комедія")
+
+    def test_bookings_refresh_seat_badges(self):
+        user = get_user_model().objects.create_user(email="badge@example.com", password="Pass123!")
+        seat_ids = list(self.hall.seats.values_list("id", flat=True))
+        self.warm()
+
+        bookings = book_seats(self.showtime, user, seat_ids[:2])
+        self.assertPagesContain("Залишилось 3")
+
+        delete_booking(bookings[0])
+        self.assertPagesContain("Залишилось 4")
+
+        hold_seats(self.showtime, user, {seat_ids[4]})
+        with self.assertNumQueries(0):
+            self.client.get(self.day_url)
+
+    def test_showtime_changes_invalidate(self):
+        self.warm()
+        self.showtime.delete()
+        self.assertNotContains(self.client.get(self.day_url), "Cached")
+        self.assertNotContains(self.client.get(self.detail_url), "Blue")
+
+    def test_lost_version_key_never_reuses_old_entries(self):
+        version = schedule_version()
+        bump_schedule_version()
+        self.assertGreater(schedule_version(), version)
+
+        cache.delete(VERSION_KEY)
+        self.assertGreater(schedule_version(), version + 1)
+
+
+@override_settings(USE_AZURE_STORAGE=False)
+class MovieListPaginationTests(TestCase):
+    def setUp(self):
+        self.url = reverse("movies:movie_list")
+        self.created_at = timezone.now()
+        # Groups of three share a timestamp, so page edges fall on ties
+        self.movies = [self.create_movie(f"Movie {i}", minutes_ago=i // 3) for i in range(30)]
+        # Newest first; ties on created_at are broken by ascending id
+        self.movies.sort(key=lambda m: (-m.created_at.timestamp(), m.id))
+
+    def create_movie(self, title, minutes_ago):
+        with patch("django.utils.timezone.now") as mock_now:
+            mock_now.return_value = self.created_at - timedelta(minutes=minutes_ago)
+            return Movie.objects.create(title=title)
+
+    def walk(self, params=""):
+        seen, url = [], self.url + params
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.context["movies"])
+            next_url = response.context.get("next_page_url")
+            url = self.url + next_url if next_url else None
+        return seen
+
+    def test_walks_whole_catalogue_in_order(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context["movies"]), 24)
+        self.assertTrue(response.context["is_paginated"])
+        self.assertNotIn("previous_page_url", response.context)
+
+        self.assertEqual(self.walk(), self.movies)
+
+    def test_previous_page_returns_to_first_page(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url + first.context["next_page_url"])
+        back = self.client.get(self.url + second.context["previous_page_url"])
+
+        self.assertEqual(list(back.context["movies"]), list(first.context["movies"]))
+        self.assertNotIn("previous_page_url", back.context)
+        self.assertEqual(back.context["next_page_url"], first.context["next_page_url"])
+
+    def test_inserts_do_not_shift_following_pages(self):
+        first = self.client.get(self.url)
+        self.create_movie("Brand new", minutes_ago=-1)
+        second = self.client.get(self.url + first.context["next_page_url"])
+
+        self.assertEqual(list(second.context["movies"]), self.movies[24:])
+
+    def test_filters_survive_paging(self):
+        genre = MovieGenre.objects.create(name="Horror")
+        for movie in self.movies:
+            movie.genres.add(genre)
+        self.create_movie("Movie without genre", minutes_ago=-1)
+
+        walked = self.walk(f"?genre={genre.id}&q=Movie")
+        self.assertEqual(walked, self.movies)
+
+    def test_deep_page_costs_the_same_as_first(self):
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(self.url + response.context["next_page_url"])
+        self.assertEqual(len(first), len(deep))
+
+    def test_bad_cursor_is_404(self):
+        for cursor in ("garbage", "bm90IGEgY3Vyc29y", "MjAyNS0wMS0wMXwx"):
+            self.assertEqual(self.client.get(self.url, {"after": cursor}).status_code, 404)
+
+    def test_deep_page_uses_keyset_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO movies_movie (title, description, poster_url, poster_variants, created_at, updated_at)
+                SELECT 'Bulk ' || i, '', '', '{}', TIMESTAMPTZ '2020-01-01' + i * INTERVAL '1 minute', now()
+                FROM generate_series(1, 100000) AS i
+                """
+            )
+            cursor.execute("ANALYZE movies_movie")
+        deep = Movie.objects.get(title="Bulk 1000")
+        self.assertEqual(decode_cursor(encode_cursor(deep)), (deep.created_at, deep.id))
+
+        queryset = (
+            Movie.objects.order_by("-created_at", "id")
+            .filter(created_at__lte=deep.created_at)
+            .exclude(created_at=deep.created_at, id__lte=deep.id)[:25]
+        )
+        plan = queryset.explain()
+        self.assertIn("movies_movi_created_7797ed_idx", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+
+class MovieSearchTests(TestCase):
+    def setUp(self):
+        self.interstellar = Movie.objects.create(title="Interstellar", description="Journey through a wormhole")
+        self.inception = Movie.objects.create(title="Inception", description="A dream within a dream")
+        self.dreams = Movie.objects.create(title="Dreams", description="Akira Kurosawa")
+        self.space = Movie.objects.create(title="Moon", description="Lonely interstellar miner")
+
+    def search(self, query, backend=None):
+        backend = backend or get_search_backend()
+        return list(backend.search(Movie.objects.all(), query))
+
+    def test_words_prefix_match_title_and_description(self):
+        self.assertEqual(self.search("incep"), [self.inception])
+        self.assertEqual(self.search("wormho"), [self.interstellar])
+        self.assertEqual(self.search("dream inception"), [self.inception])
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search("interstellar"), [self.interstellar, self.space])
+        self.assertEqual(self.search("dream"), [self.dreams, self.inception])
+
+    def test_query_syntax_is_not_interpreted(self):
+        for query in ("(moon", "moon & | !", "moon:*", "'moon'"):
+            self.assertEqual(self.search(query), [self.space], query)
+        self.assertEqual(self.search("!!! ---"), [])
+
+    def test_typos_match_titles_with_trigrams(self):
+        backend = PostgresSearchBackend()
+        if not backend.trigram:
+            self.skipTest("pg_trgm is not installed")
+        self.assertEqual(self.search("intersteller", backend)[0], self.interstellar)
+
+    def test_simple_backend_ranks_like_postgres(self):
+        backend = SimpleSearchBackend()
+        for query in ("incep", "wormho", "dream inception", "interstellar", "dream", "!!! ---"):
+            self.assertEqual(self.search(query, backend), self.search(query), query)
+        self.assertEqual(self.search("intersteller", backend), [self.interstellar])
+
+    @override_settings(MOVIE_SEARCH_BACKEND="movies.search.SimpleSearchBackend")
+    def test_backend_comes_from_settings(self):
+        self.assertIsInstance(get_search_backend(), SimpleSearchBackend)
+
+    def test_list_view_pages_ranked_results(self):
+        genre = MovieGenre.objects.create(name="Sci-Fi")
+        for i in range(30):
+            Movie.objects.create(title=f"Star {i}").genres.add(genre)
+        Movie.objects.create(title="Star without genre")
+        url = reverse("movies:movie_list")
+
+        first = self.client.get(url, {"q": "star", "genre": genre.id})
+        self.assertEqual(len(first.context["movies"]), 24)
+        next_url = first.context["next_page_url"]
+        self.assertIn("after=", next_url)
+        self.assertIn(f"genre={genre.id}", next_url)
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get(url + next_url)
+        self.assertEqual(len(second.context["movies"]), 6)
+        self.assertNotIn("next_page_url", second.context)
+        for query in ctx.captured_queries:
+            self.assertNotIn("COUNT(*)", query["sql"])
+            self.assertNotIn("OFFSET", query["sql"])
+
+        back = self.client.get(url + second.context["previous_page_url"])
+        self.assertEqual(list(back.context["movies"]), list(first.context["movies"]))
+
+    def test_search_pages_follow_the_ranking(self):
+        for i in range(30):
+            Movie.objects.create(title=f"Star {i}", description="star" if i % 4 else "")
+        url = reverse("movies:movie_list")
+
+        for backend in ("movies.search.PostgresSearchBackend", "movies.search.SimpleSearchBackend"):
+            with self.subTest(backend), override_settings(MOVIE_SEARCH_BACKEND=backend):
+                walked, next_url = [], "?q=star"
+                while next_url:
+                    response = self.client.get(url + next_url)
+                    walked += response.context["movies"]
+                    next_url = response.context.get("next_page_url")
+                self.assertEqual(walked, self.search("star", get_search_backend()))
+
+    def test_admin_search_uses_backend(self):
+        admin = get_user_model().objects.create_superuser(email="admin@example.com", password="Pass123!")
+        self.client.force_login(admin)
+        hall = Hall.objects.create(name="Admin", rows=1, seats_per_row=1)
+        Showtime.objects.create(movie=self.inception, hall=hall, start_time=timezone.now())
+        Showtime.objects.create(movie=self.dreams, hall=hall, start_time=timezone.now() + timedelta(hours=3))
+
+        response = self.client.get(reverse("admin:movies_movie_changelist"), {"q": "incep"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.inception])
+        response = self.client.get(reverse("admin:movies_showtime_changelist"), {"q": "incep"})
+        self.assertEqual([s.movie for s in response.context["cl"].result_list], [self.inception])
+
+    def test_search_uses_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO movies_movie (title, description, poster_url, poster_variants, created_at, updated_at)
+                SELECT 'Bulk ' || i, 'Generated movie number ' || i, '', '{}', now(), now()
+                FROM generate_series(1, 100000) AS i
+                """
+            )
+            # Autovacuum would normally merge the GIN pending list
+            cursor.execute("SELECT gin_clean_pending_list('movies_movi_search__eaebc6_gin')")
+            cursor.execute("ANALYZE movies_movie")
+        plan = PostgresSearchBackend().search(Movie.objects.all(), "interstellar").explain()
+        self.assertIn("movies_movi_search__eaebc6_gin", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+
+class GenreFilterTests(TestCase):
+    def setUp(self):
+        self.url = reverse("movies:movie_list")
+        self.drama = MovieGenre.objects.create(name="Drama")
+        self.comedy = MovieGenre.objects.create(name="Comedy")
+        self.horror = MovieGenre.objects.create(name="Horror")
+        self.both = Movie.objects.create(title="Dramedy night")
+        self.both.genres.add(self.drama, self.comedy)
+        self.drama_only = Movie.objects.create(title="Tears")
+        self.drama_only.genres.add(self.drama)
+        self.comedy_only = Movie.objects.create(title="Laughs night")
+        self.comedy_only.genres.add(self.comedy)
+
+    def listed(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return set(response.context["movies"])
+
+    def test_any_of_several_genres(self):
+        self.assertEqual(self.listed(genre=[self.drama.id]), {self.both, self.drama_only})
+        self.assertEqual(
+            self.listed(genre=[self.drama.id, self.comedy.id]),
+            {self.both, self.drama_only, self.comedy_only},
+        )
+
+    def test_all_selected_genres(self):
+        self.assertEqual(self.listed(genre=[self.drama.id, self.comedy.id], genre_match="all"), {self.both})
+        self.assertEqual(self.listed(genre=[self.drama.id, self.horror.id], genre_match="all"), set())
+
+    def test_filter_uses_exists_without_distinct(self):
+        response = self.client.get(self.url, {"genre": [self.drama.id, self.comedy.id]})
+        movies = list(response.context["movies"])
+        self.assertEqual(len(movies), len(set(movies)))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, {"genre": [self.drama.id, self.comedy.id]})
+        movie_query = next(q["sql"] for q in ctx if 'FROM "movies_movie"' in q["sql"].split("WHERE")[0])
+        self.assertIn("EXISTS", movie_query)
+        self.assertNotIn("DISTINCT", movie_query)
+
+    def test_garbage_genres_are_ignored(self):
+        self.assertEqual(len(self.listed(genre=["", "abc"])), 3)
+
+    def test_facet_counts_follow_the_search(self):
+        counts = {g.name: g.movie_count for g in self.client.get(self.url).context["genres"]}
+        self.assertEqual(counts, {"Drama": 2, "Comedy": 2, "Horror": 0})
+
+        response = self.client.get(self.url, {"q": "night", "genre": [self.drama.id]})
+        counts = {g.name: g.movie_count for g in response.context["genres"]}
+        self.assertEqual(counts, {"Drama": 1, "Comedy": 2, "Horror": 0})
+        self.assertContains(response, "Comedy (2)")
+
+    def test_facets_take_one_query(self):
+        for i in range(10):
+            MovieGenre.objects.create(name=f"Genre {i}")
+        with self.assertNumQueries(1):
+            list(genre_facets(Movie.objects.filter(title__startswith="T")))
+
+
+AZURE_MEDIA_URL = "https://acct.blob.core.windows.net/media/"
+
+
+@override_settings(
+    USE_AZURE_STORAGE=True,
+    AZURE_ACCOUNT_NAME="acct",
+    AZURE_ACCOUNT_KEY=base64.b64encode(b"not a real key").decode(),
+    AZURE_MEDIA_CONTAINER="media",
+    MEDIA_URL=AZURE_MEDIA_URL,
+)
+class AzureSasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_tokens_in_one_window_share_validity(self):
+        first = azure_sas.sas_validity(datetime(2025, 6, 1, 10, 0, 1, tzinfo=UTC))
+        last = azure_sas.sas_validity(datetime(2025, 6, 1, 10, 59, 59, tzinfo=UTC))
+        self.assertEqual(first, last)
+        self.assertEqual(first, (datetime(2025, 6, 1, 9, 55, tzinfo=UTC), datetime(2025, 6, 1, 12, 0, tzinfo=UTC)))
+
+        start, expiry = first
+        self.assertEqual(
+            azure_sas._sign("posters/a.jpg", start, expiry),
+            azure_sas._sign("posters/a.jpg", start, expiry),
+        )
+
+    def test_urls_are_cached_and_signed_in_one_batch(self):
+        names = ["posters/a.jpg", "posters/b.jpg", "posters/a.jpg"]
+        with patch("azure.storage.blob.generate_blob_sas", return_value="sig=x") as sign:
+            urls = azure_sas.generate_azure_read_sas_urls(names)
+            self.assertEqual(sign.call_count, 2)
+            self.assertEqual(urls["posters/b.jpg"], AZURE_MEDIA_URL + "posters%2Fb.jpg?sig=x")
+
+            again = azure_sas.generate_azure_read_sas_urls(names + ["posters/c.jpg"])
+            self.assertEqual(sign.call_count, 3)
+        self.assertEqual(again["posters/a.jpg"], urls["posters/a.jpg"])
+
+    def test_movie_list_signs_only_media_posters(self):
+        Movie.objects.create(title="Hosted", poster_url=AZURE_MEDIA_URL + "posters/hosted.jpg")
+        Movie.objects.create(title="External", poster_url="https://example.com/poster.jpg")
+        Movie.objects.create(title="No poster")
+
+        response = self.client.get(reverse("movies:movie_list"))
+        posters = {movie.title: movie.poster_url for movie in response.context["movies"]}
+        self.assertTrue(posters["Hosted"].startswith(AZURE_MEDIA_URL + "posters%2Fhosted.jpg?"))
+        self.assertIn("sig=", posters["Hosted"])
+        self.assertEqual(posters["External"], "https://example.com/poster.jpg")
+        self.assertEqual(posters["No poster"], "")
+
+    def test_sdk_is_not_needed_without_azure_storage(self):
+        Movie.objects.create(title="Local")
+        try:
+            with patch.dict(sys.modules, {"azure.storage.blob": None}), self.settings(USE_AZURE_STORAGE=False):
+                importlib.reload(azure_sas)
+                self.assertEqual(self.client.get(reverse("movies:movie_list")).status_code, 200)
+        finally:
+            importlib.reload(azure_sas)
+
+
+POSTER_MEDIA_URL = "https://cdn.example.com/media/"
+
+
+def make_image(width=800, height=1200, color="navy", fmt="PNG"):
+    from PIL import Image
+
+    out = BytesIO()
+    Image.new("RGB", (width, height), color).save(out, fmt)
+    return out.getvalue()
+
+
+class PosterVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = self.settings(
+            MEDIA_URL=POSTER_MEDIA_URL,
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": media_root.name},
+                },
+                "staticfiles": settings.STORAGES["staticfiles"],
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = storages["default"]
+        self.storage.save("uploads/poster.png", ContentFile(make_image()))
+        self.movie = Movie.objects.create(title="Poster", poster_url=POSTER_MEDIA_URL + "uploads/poster.png")
+
+    def variant_names(self):
+        self.movie.refresh_from_db()
+        return {name for images in self.movie.poster_variants["images"].values() for _, name in images}
+
+    def test_render_variants_never_upscales(self):
+        variants = render_variants(make_image(width=300, height=450), formats=["webp", "jpeg"])
+        self.assertEqual({(fmt, width) for fmt, width, _, _ in variants},
+                         {(fmt, width) for fmt in ("webp", "jpeg") for width in (160, 300)})
+        from PIL import Image
+        for fmt, width, _, data in variants:
+            with Image.open(BytesIO(data)) as image:
+                self.assertEqual(image.size, (width, round(450 * width / 300)))
+                self.assertEqual(image.format, {"webp": "WEBP", "jpeg": "JPEG"}[fmt])
+
+    def test_variants_are_stored_and_exposed_as_srcset(self):
+        stats = build_poster_variants([self.movie], workers=0)
+        self.assertEqual(stats["built"], 1)
+
+        names = self.variant_names()
+        self.assertEqual(len(names), len(POSTER_WIDTHS) * len(available_formats()))
+        self.assertTrue(all(self.storage.exists(name) for name in names))
+
+        sources = dict(self.movie.poster_sources)
+        self.assertEqual(list(sources)[-1], "image/jpeg")
+        self.assertIn(f"{POSTER_MEDIA_URL}posters/{self.movie.pk}/", sources["image/webp"])
+        self.assertTrue(sources["image/webp"].endswith(" 640w"))
+
+        response = self.client.get(reverse("movies:movie_list"))
+        self.assertContains(response, 'type="image/webp"')
+
+    def test_unchanged_posters_are_skipped(self):
+        build_poster_variants([self.movie], workers=0)
+        self.movie.refresh_from_db()
+        with patch("movies.posters.render_variants") as render:
+            stats = build_poster_variants([self.movie], workers=0)
+        render.assert_not_called()
+        self.assertEqual(stats["skipped"], 1)
+
+    def test_changed_poster_replaces_old_variants(self):
+        build_poster_variants([self.movie], workers=0)
+        old = self.variant_names()
+
+        self.storage.delete("uploads/poster.png")
+        self.storage.save("uploads/poster.png", ContentFile(make_image(color="red")))
+        build_poster_variants([self.movie], workers=0)
+
+        new = self.variant_names()
+        self.assertFalse(old & new)
+        self.assertFalse(any(self.storage.exists(name) for name in old))
+
+    def test_unreadable_posters_are_counted_as_failures(self):
+        broken = Movie.objects.create(title="Broken", poster_url=POSTER_MEDIA_URL + "uploads/missing.png")
+        self.storage.save("uploads/text.png", ContentFile(b"not an image"))
+        garbage = Movie.objects.create(title="Garbage", poster_url=POSTER_MEDIA_URL + "uploads/text.png")
+
+        with self.assertLogs("movies.posters", "WARNING") as logs:
+            stats = build_poster_variants([broken, garbage, self.movie], workers=0)
+        self.assertEqual((stats["failed"], stats["built"]), (2, 1))
+        self.assertEqual(len(logs.records), 2)
+
+    def test_command_uses_process_pool(self):
+        out = StringIO()
+        call_command("build_poster_variants", "--workers", "2", stdout=out)
+        self.assertIn("Створено: 1", out.getvalue())
+        self.assertTrue(self.variant_names())
+
+        call_command("build_poster_variants", "--workers", "2", stdout=out)
+        self.assertIn("без змін: 1", out.getvalue())
+
+    @override_settings(POSTER_VARIANTS_ON_SAVE=True)
+    def test_changing_poster_url_rebuilds_after_commit(self):
+        self.storage.save("uploads/other.png", ContentFile(make_image(color="green")))
+        self.movie.poster_url = POSTER_MEDIA_URL + "uploads/other.png"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.save()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.poster_variants["source"], self.movie.poster_url)
+
+        with patch("movies.signals.build_poster_variants") as build, self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = "Renamed"
+            self.movie.save()
+        build.assert_not_called()
+
+    @override_settings(POSTER_VARIANTS_ON_SAVE=True)
+    def test_failed_poster_is_not_fetched_again_on_save(self):
+        self.movie.poster_url = POSTER_MEDIA_URL + "uploads/missing.png"
+        with self.assertLogs("movies.posters", "WARNING"), self.captureOnCommitCallbacks(execute=True):
+            self.movie.save()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.poster_variants["failed"], self.movie.poster_url)
+
+        with patch("movies.posters.fetch_poster") as fetch, self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = "Renamed"
+            self.movie.save()
+        fetch.assert_not_called()
+
+        self.storage.save("uploads/missing.png", ContentFile(make_image()))
+        self.assertEqual(build_poster_variants([self.movie], workers=0)["built"], 1)
+        self.movie.refresh_from_db()
+        self.assertNotIn("failed", self.movie.poster_variants)
+
+    def test_saving_a_movie_builds_nothing_by_default(self):
+        self.movie.poster_url = POSTER_MEDIA_URL + "uploads/other.png"
+        with patch("movies.signals.build_poster_variants") as build, self.captureOnCommitCallbacks(execute=True):
+            self.movie.save()
+        build.assert_not_called()
+
+
+class CompressedStaticFilesTests(TestCase):
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        self.files = {
+            "css/site.css": (".seat { color: red; }\n" * 50 + 'body { background: url("../img/logo.png"); }\n').encode(),
+            "css/tiny.css": b"a{}",
+            "img/logo.png": make_image(width=40, height=40),
+        }
+        for name, content in self.files.items():
+            os.makedirs(os.path.join(source.name, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(source.name, name), "wb") as f:
+                f.write(content)
+        settings_override = self.settings(
+            STATICFILES_DIRS=[source.name],
+            STATIC_ROOT=self.root,
+            STORAGES={
+                "default": settings.STORAGES["default"],
+                "staticfiles": {"BACKEND": "movie_reservation_system.storage.CompressedManifestStaticFilesStorage"},
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def collectstatic(self):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        with open(os.path.join(self.root, "staticfiles.json")) as f:
+            return json.load(f)["paths"]
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read()
+
+    def test_hashed_files_get_gzip_siblings(self):
+        manifest = self.collectstatic()
+        hashed = manifest["css/site.css"]
+        self.assertRegex(hashed, r"^css/site\.[0-9a-f]{12}\.css$")
+        self.assertIn(manifest["img/logo.png"].split("/")[-1].encode(), self.read(hashed))
+
+        for name in (hashed, "css/site.css"):
+            self.assertEqual(gzip.decompress(self.read(name + ".gz")), self.read(name))
+        self.assertLess(len(self.read(hashed + ".gz")), len(self.read(hashed)) / 5)
+
+    def test_tiny_and_binary_files_are_left_alone(self):
+        os.makedirs(os.path.join(self.root, "css"))
+        with open(os.path.join(self.root, "css/tiny.css.gz"), "wb") as f:
+            f.write(b"stale")
+
+        manifest = self.collectstatic()
+        for name in ("css/tiny.css", manifest["css/tiny.css"], "img/logo.png", manifest["img/logo.png"]):
+            self.assertFalse(os.path.exists(os.path.join(self.root, name + ".gz")), name)
+
+    def test_unhashed_names_before_collectstatic(self):
+        self.assertEqual(staticfiles_storage.url("css/site.css"), "/static/css/site.css")
+
+        self.collectstatic()
+        storage = storages.create_storage(settings.STORAGES["staticfiles"])
+        self.assertRegex(storage.url("css/site.css"), r"^/static/css/site\.[0-9a-f]{12}\.css$")
+
+
+class CatalogConditionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.movie = Movie.objects.create(title="Conditional")
+        self.hall = Hall.objects.create(name="Cond", rows=1, seats_per_row=2)
+        self.showtime = Showtime.objects.create(movie=self.movie, hall=self.hall,
+                                                start_time=timezone.now() + timedelta(days=1))
+        day = timezone.localtime(self.showtime.start_time).date().isoformat()
+        self.urls = [
+            reverse("movies:showtimes_by_date", args=[day]),
+            reverse("movies:movie_detail", args=[self.movie.id]) + f"?date={day}",
+            reverse("movies:movie_list"),
+        ]
+
+    @patch("movies.conditional._freshness_bucket", return_value=(1, 30))
+    def test_anonymous_pages_are_public_and_validated(self, bucket):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertTrue(response["ETag"].startswith('W/"'), url)
+            self.assertIn("public", response["Cache-Control"])
+            self.assertIn("max-age=0", response["Cache-Control"])
+            self.assertIn("Cookie", response["Vary"])
+            self.assertEqual(response["X-Accel-Expires"], "30")
+
+            with self.assertNumQueries(0):
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(revalidated.status_code, 304)
+
+    @patch("movies.conditional._freshness_bucket", return_value=(1, 30))
+    def test_schedule_changes_change_the_etag(self, bucket):
+        etags = [self.client.get(url)["ETag"] for url in self.urls]
+        self.showtime.delete()
+        for url, etag in zip(self.urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(SCHEDULE_CACHE_SECONDS=0)
+    def test_no_validators_reuse_without_caching(self):
+        etag = self.client.get(self.urls[0])["ETag"]
+        self.assertEqual(self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_logged_in_pages_are_private(self):
+        anonymous_etag = self.client.get(self.urls[0])["ETag"]
+        user = get_user_model().objects.create_user(email="private@example.com", password="Pass123!")
+        self.client.force_login(user)
+
+        for url in self.urls:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("ETag", response)
+            self.assertNotIn("X-Accel-Expires", response)
+            self.assertIn("private", response["Cache-Control"])
+            self.assertIn("no-cache", response["Cache-Control"])
+            self.assertIn("Cookie", response["Vary"])
+            self.assertContains(response, "Мої бронювання")
+
+
+class MyBookingsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="history@example.com", password="Pass123!")
+        self.client.force_login(self.user)
+        self.hall = Hall.objects.create(name="History", rows=10, seats_per_row=10)
+        self.seat_ids = list(Seat.objects.filter(hall=self.hall).values_list("id", flat=True))
+        self.url = reverse("movies:my_bookings")
+
+    def book(self, title, hours, seats=1):
+        movie = Movie.objects.create(title=title, duration_minutes=50)
+        showtime = Showtime.objects.create(movie=movie, hall=self.hall,
+                                           start_time=timezone.now() + timedelta(hours=hours))
+        return book_seats(showtime, self.user, self.seat_ids[:seats])
+
+    def test_upcoming_and_past_are_split_and_ordered(self):
+        self.book("Later", 48)
+        self.book("Sooner", 2)
+        self.book("Yesterday", -24)
+        self.book("Last week", -24 * 7)
+        other = get_user_model().objects.create_user(email="other@example.com", password="Pass123!")
+        showtime = Showtime.objects.create(movie=Movie.objects.create(title="Not mine"), hall=self.hall,
+                                           start_time=timezone.now() + timedelta(hours=5))
+        book_seats(showtime, other, self.seat_ids[:1])
+
+        response = self.client.get(self.url)
+
+        upcoming = [b.showtime.movie.title for b in response.context["upcoming_page"]]
+        past = [b.showtime.movie.title for b in response.context["past_page"]]
+        self.assertEqual(upcoming, ["Sooner", "Later"])
+        self.assertEqual(past, ["Yesterday", "Last week"])
+        self.assertContains(response, "History")
+
+    def test_order_lists_its_seats_and_total(self):
+        self.book("Group", -24, seats=3)
+        upcoming = self.book("Upcoming", 24, seats=2)
+
+        response = self.client.get(self.url)
+
+        self.assertContains(response, "A1, A2, A3")
+        self.assertContains(response, "360.00 грн")
+        self.assertContains(response, f'name="booking" value="{upcoming[1].id}"')
+
+    def test_query_count_does_not_depend_on_history_size(self):
+        self.book("Few", 12)
+        self.book("Gone", -12)
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(self.url).status_code, 200)
+            return len(ctx)
+
+        few = count_queries()
+        for hours in range(1, 6):
+            self.book(f"Future {hours}", hours * 24, seats=10)
+            self.book(f"Past {hours}", -hours * 24, seats=10)
+        self.assertEqual(count_queries(), few)
+
+    def test_each_list_is_paged_on_its_own(self):
+        for hours in range(1, 26):
+            self.book(f"Future {hours}", hours)
+        for hours in range(1, 4):
+            self.book(f"Past {hours}", -hours)
+
+        response = self.client.get(self.url, {"upcoming_page": 2})
+
+        self.assertEqual(len(response.context["upcoming_page"]), 5)
+        self.assertEqual(len(response.context["past_page"]), 3)
+        self.assertEqual(response.context["upcoming_previous_url"], "?upcoming_page=1")
+        self.assertNotIn("past_next_url", response.context)
+
+    def test_moving_a_showtime_moves_its_orders(self):
+        booking, = self.book("Moved", 24)
+        showtime = booking.showtime
+        showtime.start_time = timezone.now() - timedelta(hours=1)
+        showtime.save()
+
+        booking.order.refresh_from_db()
+        self.assertEqual(booking.order.starts_at, showtime.start_time)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context["upcoming_page"]), 0)
+        self.assertEqual(len(response.context["past_page"]), 1)
+
+
+class OrderTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="buyer@example.com", password="Pass123!")
+        self.hall = Hall.objects.create(name="Orders", rows=2, seats_per_row=10)
+        self.showtime = Showtime.objects.create(movie=Movie.objects.create(title="Orders"), hall=self.hall,
+                                                price=100, start_time=timezone.now() + timedelta(days=1))
+        self.seat_ids = list(Seat.objects.filter(hall=self.hall).values_list("id", flat=True))
+
+    def test_checkout_creates_one_order_with_totals(self):
+        bookings = book_seats(self.showtime, self.user, self.seat_ids[:4])
+
+        order = Order.objects.get()
+        self.assertEqual({booking.order_id for booking in bookings}, {order.id})
+        self.assertEqual(order.seat_count, 4)
+        self.assertEqual(order.total_price, 400)
+        self.assertEqual(order.starts_at, self.showtime.start_time)
+
+    def test_cancel_order_takes_constant_queries(self):
+        small = book_seats(self.showtime, self.user, self.seat_ids[:1])[0].order
+        big = book_seats(self.showtime, self.user, self.seat_ids[1:16])[0].order
+
+        with CaptureQueriesContext(connection) as one:
+            self.assertEqual(cancel_order(small), {self.seat_ids[0]})
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(cancel_order(big), set(self.seat_ids[1:16]))
+
+        self.assertEqual(len(one), len(many))
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Order.objects.exists())
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.seats_sold, 0)
+        self.assertEqual(cancel_order(big), set())
+
+    def test_cancelling_one_seat_updates_the_order(self):
+        first, second = book_seats(self.showtime, self.user, self.seat_ids[:2])
+
+        delete_booking(first)
+        order = Order.objects.get()
+        self.assertEqual((order.seat_count, order.total_price), (1, 100))
+
+        delete_booking(second)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cancel_view_cancels_the_whole_order(self):
+        order = book_seats(self.showtime, self.user, self.seat_ids[:3])[0].order
+        other = get_user_model().objects.create_user(email="not-buyer@example.com", password="Pass123!")
+        self.client.force_login(other)
+        self.assertEqual(self.client.post(reverse("movies:cancel_booking", args=[order.id])).status_code, 404)
+
+        self.client.force_login(self.user)
+        self.client.post(reverse("movies:cancel_booking", args=[order.id]))
+
+        self.assertFalse(Booking.objects.filter(showtime=self.showtime).exists())
+
+    def test_booking_outside_checkout_gets_its_own_order(self):
+        booking = Booking.objects.create(showtime=self.showtime, seat_id=self.seat_ids[0], user=self.user)
+
+        self.assertEqual(booking.order.seat_count, 1)
+        self.assertEqual(booking.order.total_price, 100)
+
+
+class BulkCancelTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="canceller@example.com", password="Pass123!")
+        self.hall = Hall.objects.create(name="Bulk", rows=2, seats_per_row=10)
+        self.movie = Movie.objects.create(title="Bulk")
+        self.seat_ids = list(Seat.objects.filter(hall=self.hall).values_list("id", flat=True))
+        self.future = self.showtime(hours=24)
+        self.url = reverse("movies:cancel_bookings")
+
+    def showtime(self, hours):
+        return Showtime.objects.create(movie=self.movie, hall=self.hall, price=100,
+                                       start_time=timezone.now() + timedelta(hours=hours))
+
+    def sold(self, showtime):
+        showtime.refresh_from_db()
+        return showtime.seats_sold
+
+    def test_cancels_selected_seats_across_orders(self):
+        first = book_seats(self.future, self.user, self.seat_ids[:3])
+        second = book_seats(self.future, self.user, self.seat_ids[3:5])
+
+        released = cancel_bookings(self.user, booking_ids=[first[0].id, second[0].id, second[1].id])
+
+        self.assertEqual(released, {self.future.id: {self.seat_ids[0], self.seat_ids[3], self.seat_ids[4]}})
+        order = Order.objects.get()
+        self.assertEqual((order.id, order.seat_count, order.total_price), (first[0].order_id, 2, 200))
+        self.assertEqual(self.sold(self.future), 2)
+
+    def test_cancels_a_whole_showtime(self):
+        book_seats(self.future, self.user, self.seat_ids[:2])
+        book_seats(self.future, self.user, self.seat_ids[2:4])
+        other = get_user_model().objects.create_user(email="stays@example.com", password="Pass123!")
+        book_seats(self.future, other, self.seat_ids[4:5])
+
+        cancel_bookings(self.user, showtime_ids=[self.future.id])
+
+        self.assertEqual(list(Booking.objects.values_list("user", flat=True)), [other.id])
+        self.assertEqual(self.sold(self.future), 1)
+
+    def test_leaves_started_showtimes_and_other_users_alone(self):
+        past = self.showtime(hours=-1)
+        old = book_seats(past, self.user, self.seat_ids[:1])
+        other = get_user_model().objects.create_user(email="owner@example.com", password="Pass123!")
+        theirs = book_seats(self.future, other, self.seat_ids[1:2])
+
+        released = cancel_bookings(self.user, booking_ids=[old[0].id, theirs[0].id],
+                                   showtime_ids=[past.id, self.future.id])
+
+        self.assertEqual(released, {})
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_counter_is_updated_once_per_showtime(self):
+        later = self.showtime(hours=48)
+        ids = [b.id for b in book_seats(self.future, self.user, self.seat_ids[:6])]
+        ids += [b.id for b in book_seats(later, self.user, self.seat_ids[:6])]
+
+        with CaptureQueriesContext(connection) as ctx:
+            cancel_bookings(self.user, booking_ids=ids)
+
+        counter_updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "movies_showtime"')]
+        self.assertEqual(len(counter_updates), 2)
+        self.assertEqual((self.sold(self.future), self.sold(later)), (0, 0))
+
+    def test_view_reports_cancelled_seats(self):
+        bookings = book_seats(self.future, self.user, self.seat_ids[:3])
+        self.client.force_login(self.user)
+
+        response = self.client.post(self.url, {"booking": [b.id for b in bookings[:2]] + ["junk"]}, follow=True)
+
+        self.assertContains(response, "Скасовано місць: 2.")
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+
+class BulkSchedulingTests(TestCase):
+    def setUp(self):
+        self.long = Movie.objects.create(title="Long", duration_minutes=150)
+        self.short = Movie.objects.create(title="Short", duration_minutes=90)
+        self.halls = [Hall.objects.create(name=f"Sched {i}", rows=1, seats_per_row=1) for i in range(3)]
+        self.day = cinema_now().date() + timedelta(days=3)
+        self.tz = cinema_timezone()
+
+    def at(self, day_offset, hour, minute=0):
+        day = self.day + timedelta(days=day_offset)
+        return datetime.combine(day, datetime.min.time().replace(hour=hour, minute=minute), tzinfo=self.tz)
+
+    def test_sweep_rejects_overlaps_with_existing_and_accepted(self):
+        existing = [(0, 10), (30, 40), (5, 12)]
+        candidates = [(12, 20, "a"), (18, 25, "b"), (25, 31, "c"), (40, 50, "d"), (11, 13, "e")]
+
+        accepted, rejected = sweep(candidates, existing)
+
+        self.assertEqual(accepted, ["a", "d"])
+        self.assertEqual(sorted(rejected), ["b", "c", "e"])
+
+    def test_generates_weeks_of_showtimes_with_few_queries(self):
+        slots = parse_slots("10:00, 14:00, 18:00")
+        with CaptureQueriesContext(connection) as ctx:
+            plan = schedule_showtimes([self.long, self.short], self.halls, self.day, 14, slots, buffer_minutes=15)
+
+        self.assertEqual(len(plan.showtimes), 3 * 14 * 3)
+        self.assertEqual(plan.conflicts, [])
+        self.assertEqual(Showtime.objects.count(), 3 * 14 * 3)
+        self.assertLess(len(ctx), 10)
+        first = Showtime.objects.filter(hall=self.halls[0]).order_by("start_time").first()
+        self.assertEqual(first.start_time, self.at(0, 10))
+
+    def test_skips_slots_overlapping_existing_showtimes_and_each_other(self):
+        hall = self.halls[0]
+        # the evening before runs past midnight; another one blocks 14:00
+        Showtime.objects.create(movie=self.long, hall=hall, start_time=self.at(-1, 22, 30))
+        Showtime.objects.create(movie=self.short, hall=hall, start_time=self.at(0, 13))
+
+        plan = schedule_showtimes([self.long], [hall], self.day, 1, parse_slots("00:30, 10:00, 12:00, 15:00"),
+                                  buffer_minutes=15)
+
+        self.assertEqual([s.start_time for s in plan.showtimes], [self.at(0, 10), self.at(0, 15)])
+        self.assertEqual(sorted(s.start_time for s in plan.conflicts), [self.at(0, 0, 30), self.at(0, 12)])
+
+    def test_dry_run_writes_nothing(self):
+        plan = schedule_showtimes([self.short], self.halls, self.day, 7, parse_slots("12:00"), dry_run=True)
+
+        self.assertEqual(len(plan.showtimes), 21)
+        self.assertFalse(Showtime.objects.exists())
+
+    def test_command_and_admin_view(self):
+        out = StringIO()
+        call_command("schedule_showtimes", "--movie", str(self.short.id), "--hall", str(self.halls[0].id),
+                     "--start", self.day.isoformat(), "--weeks", "1", "--slots", "11:00,15:00",
+                     "--price", "99.50", stdout=out)
+        self.assertIn("Створено сеансів: 14", out.getvalue())
+        self.assertEqual(set(Showtime.objects.values_list("price", flat=True)), {Decimal("99.50")})
+
+        admin_user = get_user_model().objects.create_superuser(email="admin@example.com", password="Pass123!")
+        self.client.force_login(admin_user)
+        url = reverse("admin:movies_showtime_bulk_schedule")
+        self.assertContains(self.client.get(reverse("admin:movies_showtime_changelist")), url)
+        response = self.client.post(url, {
+            "movies": [self.short.id], "halls": [self.halls[0].id], "first_day": self.day.isoformat(),
+            "weeks": 1, "slots": "11:00, 19:00", "buffer_minutes": 15, "price": "120",
+        }, follow=True)
+        self.assertContains(response, "Створено сеансів: 7, пропущено через накладки: 7.")
+
+
+class ShowtimeSpanTests(TestCase):
+    def setUp(self):
+        self.movie = Movie.objects.create(title="Span", duration_minutes=100)
+        self.hall = Hall.objects.create(name="Span", rows=1, seats_per_row=1)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        self.showtime = Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.start)
+
+    def test_end_time_follows_start_and_duration(self):
+        self.assertEqual(self.showtime.end_time, self.start + timedelta(minutes=100))
+
+        self.movie.duration_minutes = 130
+        self.movie.save()
+        self.showtime.refresh_from_db()
+        self.assertEqual(self.showtime.end_time, self.start + timedelta(minutes=130))
+
+        untimed = Showtime.objects.create(movie=Movie.objects.create(title="Untimed"), hall=self.hall,
+                                          start_time=self.start + timedelta(days=1))
+        self.assertEqual(untimed.end_time, untimed.start_time + timedelta(minutes=120))
+
+    def test_overlapping_and_playing_at(self):
+        other_hall = Hall.objects.create(name="Elsewhere", rows=1, seats_per_row=1)
+        Showtime.objects.create(movie=self.movie, hall=other_hall, start_time=self.start)
+        in_hall = Showtime.objects.filter(hall=self.hall)
+
+        self.assertEqual(list(in_hall.playing_at(self.start + timedelta(minutes=99))), [self.showtime])
+        self.assertFalse(in_hall.playing_at(self.start + timedelta(minutes=100)).exists())
+        self.assertTrue(in_hall.overlapping(self.start - timedelta(hours=1), self.start + timedelta(minutes=1)).exists())
+        self.assertFalse(in_hall.overlapping(self.start - timedelta(hours=1), self.start).exists())
+
+    def test_range_queries_use_the_gist_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        # without ORDER BY, so the start_time indexes aren't picked for sorting
+        plan = Showtime.objects.playing_at(self.start).order_by().explain()
+        # either GiST index over the span: its own or the overlap constraint's
+        self.assertRegex(plan, "movies_showtime_(span_gist|no_overlap)")
+
+    def test_clean_rejects_overlaps_in_the_same_hall(self):
+        clash = Showtime(movie=self.movie, hall=self.hall, start_time=self.start + timedelta(minutes=90))
+        with self.assertRaisesMessage(ValidationError, "зал зайнятий"):
+            clash.full_clean()
+
+        Showtime(movie=self.movie, hall=self.hall, start_time=self.start + timedelta(minutes=100)).full_clean()
+        self.showtime.full_clean()
+
+    def test_database_rejects_overlaps_in_the_same_hall(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.start + timedelta(minutes=30))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.movie.duration_minutes = 300  # stretches into the next showtime
+            Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.start + timedelta(hours=4))
+            self.movie.save()
+        self.movie.refresh_from_db()
+
+        elsewhere = Hall.objects.create(name="Elsewhere", rows=1, seats_per_row=1)
+        Showtime.objects.create(movie=self.movie, hall=elsewhere, start_time=self.start)
+        Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.start + timedelta(minutes=100))
+
+    def test_migration_lists_overlaps_before_adding_the_constraint(self):
+        migration = importlib.import_module("movies.migrations.0019_showtime_no_overlap")
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")  # flush setUp's deferred FK checks
+            cursor.execute(migration.DROP_OPT_IN_CONSTRAINT)
+        clash = Showtime.objects.create(movie=self.movie, hall=self.hall, start_time=self.start + timedelta(minutes=30))
+
+        with connection.schema_editor() as editor, self.assertRaisesMessage(RuntimeError, f"{clash.id}"):
+            migration.check_no_overlaps(None, editor)
+
+    def test_admin_reports_an_overlap_that_slipped_past_clean(self):
+        admin_user = get_user_model().objects.create_superuser(email="race@example.com", password="Pass123!")
+        self.client.force_login(admin_user)
+        local = timezone.localtime(self.start + timedelta(minutes=30))
+
+        with patch.object(Showtime, "clean"):  # as if the clash was saved after clean() ran
+            response = self.client.post(reverse("admin:movies_showtime_add"), {
+                "movie": self.movie.id, "hall": self.hall.id, "price": "120.00",
+                "start_time_0": local.strftime("%Y-%m-%d"), "start_time_1": local.strftime("%H:%M:%S"),
+            }, follow=True)
+
+        self.assertContains(response, "зал зайнятий")
+        self.assertEqual(Showtime.objects.count(), 1)
+
+    def test_scheduler_reports_an_overlap_that_slipped_past_the_sweep(self):
+        day = timezone.localtime(self.start).date()
+        slot = timezone.localtime(self.start + timedelta(minutes=30)).time()
+
+        with patch("movies.scheduling.sweep", lambda candidates, existing: ([c[2] for c in candidates], [])):
+            with self.assertRaisesMessage(ValidationError, "зал зайнятий"):
+                schedule_showtimes([self.movie], [self.hall], day, 1, [slot])
+            with self.assertRaisesMessage(CommandError, "зал зайнятий"):
+                call_command("schedule_showtimes", "--movie", self.movie.id, "--hall", self.hall.id,
+                             "--start", day.isoformat(), "--weeks", 1, "--slots", slot.strftime("%H:%M:%S"),
+                             "--buffer", 0, stdout=StringIO())
+        self.assertEqual(Showtime.objects.count(), 1)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(email="staff@example.com", password="Pass123!")
+        self.client.force_login(self.admin)
+        self.hall = Hall.objects.create(name="Admin", rows=2, seats_per_row=5)
+        self.seat_ids = list(Seat.objects.filter(hall=self.hall).values_list("id", flat=True))
+        self.buyer = get_user_model().objects.create_user(email="buyer@example.com", password="Pass123!")
+
+    def add_showtimes(self, count):
+        for _ in range(count):
+            movie = Movie.objects.create(title=f"Admin {Movie.objects.count()}", duration_minutes=60)
+            start = timezone.now() + timedelta(days=1, hours=2 * Showtime.objects.count())
+            showtime = Showtime.objects.create(movie=movie, hall=self.hall, price=100, start_time=start)
+            book_seats(showtime, self.buyer, self.seat_ids[:3])
+
+    def changelist_queries(self, model):
+        url = reverse(f"admin:movies_{model}_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_changelists_do_not_grow_with_rows(self):
+        self.add_showtimes(1)
+        few = {model: self.changelist_queries(model)[0] for model in ("showtime", "booking", "order")}
+        self.add_showtimes(5)
+        many = {model: self.changelist_queries(model)[0] for model in ("showtime", "booking", "order")}
+        self.assertEqual(few, many)
+
+    def test_showtime_occupancy_and_revenue(self):
+        self.add_showtimes(1)
+
+        _, response = self.changelist_queries("showtime")
+
+        self.assertContains(response, "30% (3)")
+        self.assertContains(response, "300.00")
+
+    def test_booking_str_and_add_without_order(self):
+        self.add_showtimes(1)
+        showtime = Showtime.objects.get()
+        booking = Booking.objects.select_related("seat__hall", "showtime__movie", "showtime__hall").first()
+        self.assertEqual(str(booking), f"{booking.seat} for {showtime}")
+
+        version = showtime.seat_version
+        response = self.client.post(reverse("admin:movies_booking_add"), {
+            "showtime": showtime.id, "seat": self.seat_ids[5], "user": self.buyer.id,
+        })
+        self.assertEqual(response.status_code, 302)
+        added = Booking.objects.get(seat_id=self.seat_ids[5])
+        self.assertEqual((added.order.seat_count, added.order.total_price), (1, showtime.price))
+        showtime.refresh_from_db()
+        self.assertEqual(showtime.seats_sold, 4)
+        self.assertGreater(showtime.seat_version, version)
+
+        elsewhere = Hall.objects.create(name="Elsewhere", rows=1, seats_per_row=1).seats.get()
+        response = self.client.post(reverse("admin:movies_booking_add"), {
+            "showtime": showtime.id, "seat": elsewhere.id, "user": self.buyer.id,
+        }, follow=True)
+        self.assertContains(response, "не належить залу")
+        self.assertEqual(Booking.objects.count(), 4)
+
+        response = self.client.post(reverse("admin:movies_booking_delete", args=[added.id]), {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        first, second, _ = Booking.objects.order_by("id")
+        response = self.client.post(reverse("admin:movies_booking_changelist"), {
+            "action": "delete_selected", "_selected_action": [first.id, second.id], "post": "yes",
+        })
+        self.assertEqual(response.status_code, 302)
+
+        showtime.refresh_from_db()
+        self.assertEqual(showtime.seats_sold, 1)
+        self.assertFalse(Order.objects.filter(pk=added.order_id).exists())
+        order = Order.objects.get()
+        self.assertEqual((order.seat_count, order.total_price), (1, showtime.price))
+
+    def test_deleting_an_order_releases_its_seats(self):
+        self.add_showtimes(1)
+        order = Order.objects.get()
+
+        response = self.client.post(reverse("admin:movies_order_delete", args=[order.id]), {"post": "yes"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Showtime.objects.get().seats_sold, 0)
+
+    def test_estimated_count_paginator(self):
+        self.add_showtimes(2)
+        bookings = Booking.objects.order_by("id")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE movies_booking")
+
+        with patch("movies.pagination.EXACT_COUNT_LIMIT", 1):
+            with CaptureQueriesContext(connection) as ctx:
+                estimated = EstimatedCountPaginator(bookings, 2).count
+            self.assertEqual(estimated, 6)
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+            self.assertGreaterEqual(EstimatedCountPaginator(bookings.filter(user=self.buyer), 2).count, 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(EstimatedCountPaginator(bookings, 2).count, 6)
+        self.assertTrue(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+
+class BookingExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="finance@example.com", password="Pass123!")
+        self.hall = Hall.objects.create(name="Export", rows=1, seats_per_row=5)
+        self.movie = Movie.objects.create(title="Експорт, \"quoted\"")
+        self.seat_ids = list(Seat.objects.filter(hall=self.hall).values_list("id", flat=True))
+        start = datetime(2026, 3, 10, 18, 0, tzinfo=cinema_timezone())
+        self.showtime = Showtime.objects.create(movie=self.movie, hall=self.hall, price=150, start_time=start)
+        self.bookings = book_seats(self.showtime, self.user, self.seat_ids[:3])
+
+    def test_csv_rows_are_joined_and_local(self):
+        rows = list(csv.DictReader(StringIO("".join(export_lines(Booking.objects.all(), "csv")))))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["movie"], self.movie.title)
+        self.assertEqual(rows[0]["hall"], "Export")
+        self.assertEqual(rows[0]["seat_row"] + rows[0]["seat_number"], "A1")
+        self.assertEqual(rows[0]["starts_at"], "2026-03-10T18:00:00+02:00")
+        self.assertEqual(rows[0]["price"], "150.00")
+        self.assertEqual(rows[0]["user_email"], "finance@example.com")
+
+    def test_export_streams_through_a_server_side_cursor(self):
+        with CaptureQueriesContext(connection) as ctx:
+            lines = export_lines(Booking.objects.all(), "jsonl")
+            self.assertEqual(len(ctx), 0)  # nothing runs before the first row is asked for
+            first = json.loads(next(lines))
+            rest = list(lines)
+
+        self.assertEqual(first["booking_id"], self.bookings[0].id)
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(len([q for q in ctx.captured_queries if "movies_booking" in q["sql"]]), 1)
+
+    def test_admin_actions_stream_downloads(self):
+        admin_user = get_user_model().objects.create_superuser(email="boss@example.com", password="Pass123!")
+        self.client.force_login(admin_user)
+
+        response = self.client.post(reverse("admin:movies_showtime_changelist"), {
+            "action": "export_bookings_csv", "_selected_action": [self.showtime.id],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+        self.assertIn('filename="bookings.csv"', response["Content-Disposition"])
+        self.assertEqual(len(b"".join(response.streaming_content).decode().splitlines()), 4)
+
+        response = self.client.post(reverse("admin:movies_booking_changelist"), {
+            "action": "export_bookings_jsonl", "_selected_action": [self.bookings[1].id],
+        })
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["booking_id"] for row in rows], [self.bookings[1].id])
+
+    async def test_async_lines_send_one_piece_per_cursor_chunk(self):
+        pieces = [piece async for piece in aexport_lines(Booking.objects.all(), "jsonl", chunk_size=2)]
+
+        self.assertEqual([len(piece.splitlines()) for piece in pieces], [2, 1])
+        self.assertEqual(json.loads(pieces[1])["booking_id"], self.bookings[2].id)
+
+    async def test_admin_action_streams_asynchronously_under_asgi(self):
+        admin_user = await sync_to_async(get_user_model().objects.create_superuser)(
+            email="async@example.com", password="Pass123!"
+        )
+        await self.async_client.aforce_login(admin_user)
+
+        response = await self.async_client.post(reverse("admin:movies_showtime_changelist"), {
+            "action": "export_bookings_jsonl", "_selected_action": [self.showtime.id],
+        })
+
+        self.assertTrue(response.is_async)  # served as it is read, not drained into a list first
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.decode().splitlines()), 3)
+
+    def test_command_filters_by_showtime_day(self):
+        out = StringIO()
+        call_command("export_bookings", "--format", "jsonl", "--from", "2026-03-10", "--to", "2026-03-10",
+                     stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+        out = StringIO()
+        call_command("export_bookings", "--from", "2026-03-11", stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), [",".join(BOOKING_COLUMNS)])
+
+
+class CatalogImportTests(TestCase):
+    CSV = (
+        "movie_id,title,duration_minutes,genres,hall,start_time,price\n"
+        "tt1,Імпорт,90,Драма|Нуар,Import,2026-05-01T18:00,150\n"
+        "tt1,,,,Import,2026-05-01T21:00,\n"
+        "tt2,Другий,,Драма,,,\n"
+        ",Без ключа,,,,,\n"
+        "tt3,,,,Import,2026-05-02T10:00,\n"
+        "tt2,,,,Nowhere,2026-05-02T10:00,\n"
+        "tt2,Другий,,Драма,Import,not-a-date,\n"
+    )
+
+    def setUp(self):
+        self.hall = Hall.objects.create(name="Import", rows=1, seats_per_row=2)
+
+    def import_csv(self, text, **kwargs):
+        return import_file(BytesIO(text.encode()), "csv", **kwargs)
+
+    def test_rows_are_upserted_and_bad_rows_reported(self):
+        report = self.import_csv(self.CSV)
+
+        self.assertEqual([line for line, _ in report.errors], [5, 6, 7, 8])
+        movie = Movie.objects.get(external_id="tt1")
+        self.assertEqual(movie.duration_minutes, 90)
+        self.assertEqual(sorted(movie.genres.values_list("name", flat=True)), ["Драма", "Нуар"])
+        self.assertEqual(Movie.objects.get(external_id="tt2").genres.get().name, "Драма")
+        showtimes = list(Showtime.objects.filter(hall=self.hall).order_by("start_time"))
+        self.assertEqual([s.movie_id for s in showtimes], [movie.id, movie.id])
+        self.assertEqual(showtimes[0].price, Decimal("150"))
+        self.assertEqual(showtimes[0].start_time, datetime(2026, 5, 1, 18, 0, tzinfo=cinema_timezone()))
+        self.assertEqual(showtimes[0].end_time - showtimes[0].start_time, timedelta(minutes=90))
+
+    def test_reimport_updates_in_place(self):
+        self.import_csv(self.CSV)
+        report = self.import_csv(
+            "movie_id,title,duration_minutes,genres,hall,start_time,price\n"
+            "tt1,Нова назва,100,Комедія,Import,2026-05-01T18:00,200\n"
+        )
+
+        self.assertEqual(report.errors, [])
+        movie = Movie.objects.get(external_id="tt1")
+        self.assertEqual(movie.title, "Нова назва")
+        self.assertEqual(list(movie.genres.values_list("name", flat=True)), ["Комедія"])
+        self.assertEqual(Movie.objects.filter(external_id="tt1").count(), 1)
+        showtime = Showtime.objects.get(hall=self.hall, start_time=datetime(2026, 5, 1, 18, 0, tzinfo=cinema_timezone()))
+        self.assertEqual(showtime.price, Decimal("200"))
+        self.assertEqual(showtime.end_time - showtime.start_time, timedelta(minutes=100))
+
+    def test_batch_costs_a_fixed_number_of_queries(self):
+        rows = "".join(
+            f'{{"movie_id": "m{i}", "title": "Фільм {i}", "duration_minutes": 50, "genres": ["Жанр {i % 3}"], '
+            f'"hall": "Import", "start_time": "2026-06-01T{i:02d}:00"}}\n'
+            for i in range(20)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            report = import_file(BytesIO(rows.encode()), "jsonl", batch_size=10)
+
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.written["showtimes"], 20)
+        self.assertEqual(Showtime.objects.filter(hall=self.hall).count(), 20)
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        # genres (first batch only), movies, genre links, showtimes
+        self.assertEqual(len(inserts), 7)
+
+    def test_rejected_showtime_does_not_lose_its_batch(self):
+        other = Movie.objects.create(title="Стоїть у розкладі", external_id="old")
+        Showtime.objects.create(movie=other, hall=self.hall,
+                                start_time=datetime(2026, 5, 1, 18, 0, tzinfo=cinema_timezone()))
+        text = (
+            "movie_id,title,hall,start_time,price\n"
+            "new,Новий,Import,2026-05-02T18:00,-5\n"
+            "new,Новий,Import,2026-05-03T18:00,100000000\n"
+        )
+        report = self.import_csv(text)
+
+        self.assertEqual([line for line, _ in report.errors], [3])
+        self.assertEqual(Showtime.objects.filter(movie__external_id="new").count(), 1)
+
+    def test_values_the_database_would_reject_fail_their_row_only(self):
+        report = self.import_csv(
+            "movie_id,title,duration_minutes,hall,start_time,price\n"
+            "neg,Мінус,-5,,,\n"
+            f"{'x' * 65},Задовгий ключ,90,,,\n"
+            "ok,Гаразд,90,Import,2026-05-01T18:00,99999999\n"
+            "ok,Гаразд,90,Import,2026-05-01T21:00,100\n"
+        )
+
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4])
+        self.assertEqual(list(Movie.objects.values_list("external_id", flat=True)), ["ok"])
+        self.assertEqual(Showtime.objects.get().price, Decimal("100"))
+
+    def test_new_duration_moves_existing_end_times(self):
+        self.import_csv(self.CSV)
+        report = self.import_csv("movie_id,title,duration_minutes\ntt1,Імпорт,150\n")
+
+        self.assertEqual(report.errors, [])
+        for showtime in Showtime.objects.filter(movie__external_id="tt1"):
+            self.assertEqual(showtime.end_time - showtime.start_time, timedelta(minutes=150))
+
+        # 18:00 would now run into the 21:00 showtime of the same movie
+        report = self.import_csv("movie_id,title,duration_minutes\ntt1,Імпорт,200\ntt2,Другий,80\n")
+        self.assertEqual(report.errors, [(2, "сеанси фільму з новою тривалістю накладаються")])
+        self.assertEqual(Movie.objects.get(external_id="tt1").duration_minutes, 150)
+        self.assertEqual(Movie.objects.get(external_id="tt2").duration_minutes, 80)
+
+    def test_absent_columns_keep_stored_values(self):
+        self.import_csv(self.CSV)
+        Movie.objects.filter(external_id="tt1").update(
+            description="Опис", poster_url="https://example.com/tt1.png"
+        )
+        report = self.import_csv(
+            "movie_id,title,description,duration_minutes,poster_url\n"
+            "tt1,Нова назва,,,\n"
+            "tt3,Новий,,,\n"
+        )
+
+        self.assertEqual(report.errors, [])
+        movie = Movie.objects.get(external_id="tt1")
+        self.assertEqual(movie.title, "Нова назва")
+        self.assertEqual((movie.description, movie.duration_minutes), ("Опис", 90))
+        self.assertEqual(movie.poster_url, "https://example.com/tt1.png")
+        for showtime in movie.showtimes.all():
+            self.assertEqual(showtime.end_time - showtime.start_time, timedelta(minutes=90))
+        self.assertIsNone(Movie.objects.get(external_id="tt3").duration_minutes)
+
+        report = import_file(BytesIO(
+            '{"movie_id": "tt1", "title": "Ще раз", "hall": "Import", "start_time": "2026-05-04T18:00"}\n'.encode()
+        ), "jsonl")
+        self.assertEqual(report.errors, [])
+        showtime = Showtime.objects.get(start_time=datetime(2026, 5, 4, 18, 0, tzinfo=cinema_timezone()))
+        self.assertEqual(showtime.end_time - showtime.start_time, timedelta(minutes=90))
+
+    def test_ambiguous_hall_name_is_a_row_error(self):
+        Hall.objects.create(name="Import", rows=1, seats_per_row=1)
+        report = self.import_csv("movie_id,title,hall,start_time\ntt1,Імпорт,Import,2026-05-01T18:00\n")
+
+        self.assertEqual(report.errors, [(2, "кілька залів з назвою Import")])
+        self.assertFalse(Showtime.objects.exists())
+
+    def test_booked_showtime_keeps_its_movie(self):
+        self.import_csv(self.CSV)
+        showtime = Showtime.objects.order_by("start_time").first()
+        user = get_user_model().objects.create_user(email="seat@example.com", password="Pass123!")
+        book_seats(showtime, user, [self.hall.seats.first().id])
+
+        report = self.import_csv(
+            "movie_id,hall,start_time,price\n"
+            "tt2,Import,2026-05-01T18:00,\n"
+            "tt2,Import,2026-05-03T18:00,170\n"
+        )
+
+        self.assertEqual(report.errors, [(2, "на цей сеанс уже є бронювання, фільм змінити не можна")])
+        self.assertEqual(report.written["showtimes"], 1)
+        showtime.refresh_from_db()
+        self.assertEqual(showtime.movie.external_id, "tt1")
+
+    def test_migration_lists_duplicate_showtimes(self):
+        migration = importlib.import_module("movies.migrations.0018_catalog_import")
+        movie = Movie.objects.create(title="Двічі")
+        start = datetime(2026, 5, 1, 18, 0, tzinfo=cinema_timezone())
+        first = Showtime.objects.create(movie=movie, hall=self.hall, start_time=start)
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute("ALTER TABLE movies_showtime DROP CONSTRAINT unique_showtime_hall_start, "
+                           "DROP CONSTRAINT movies_showtime_no_overlap")
+        second = Showtime.objects.create(movie=movie, hall=self.hall, start_time=start)
+
+        with connection.schema_editor() as editor:
+            with self.assertRaisesMessage(RuntimeError, f"showtimes {first.id}, {second.id}"):
+                migration.check_no_duplicates(None, editor)
+
+    def test_admin_upload_and_command(self):
+        admin_user = get_user_model().objects.create_superuser(email="catalog@example.com", password="Pass123!")
+        self.client.force_login(admin_user)
+        upload = ContentFile(self.CSV.encode(), name="catalog.csv")
+
+        response = self.client.post(reverse("admin:movies_movie_import_catalog"), {"file": upload})
+        self.assertContains(response, "Рядок 5")
+        self.assertEqual(Movie.objects.filter(external_id__isnull=False).count(), 2)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8", delete=False) as f:
+            f.write('{"movie_id": "tt9", "title": "З команди"}\n{broken\n')
+        self.addCleanup(os.remove, f.name)
+        out, err = StringIO(), StringIO()
+        call_command("import_catalog", f.name, stdout=out, stderr=err)
+        self.assertIn("фільмів: 1", out.getvalue())
+        self.assertIn("Рядок 2", err.getvalue())
+        self.assertTrue(Movie.objects.filter(external_id="tt9").exists())
@@ -9,7 +9,11 @@ urlpatterns = [
     path("all/", views.MovieListView.as_view(), name="movie_list"),
     path('<int:movie_id>/', views.movie_detail, name='movie_detail'),
     path("booking/<int:showtime_id>/", views.booking_detail, name="booking_detail"),
+    path("booking/<int:showtime_id>/hold/", views.seat_hold, name="seat_hold"),
+    path("showtime/<int:showtime_id>/seats.json", views.seat_availability, name="seat_availability"),
+    path("showtime/<int:showtime_id>/events/", views.seat_events, name="seat_events"),
     path("showtime/<int:showtime_id>/success/", views.booking_success, name="booking_success"),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
-    path('cancel-booking/<int:booking_id>/', views.cancel_booking, name='cancel_booking'),
+    path('cancel-booking/<int:order_id>/', views.cancel_booking, name='cancel_booking'),
+    path('cancel-bookings/', views.cancel_selected_bookings, name='cancel_bookings'),
 ]
@@ -1,7 +1,13 @@
+import asyncio
+import json
 from datetime import timedelta, datetime, date
 from django.conf import settings
-from django.db.models import Prefetch
+from django.core.paginator import Paginator
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.views.generic import ListView
 from django.utils import timezone
 from django.conf import settings
@@ -9,18 +15,35 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
-from .azure_sas import generate_azure_read_sas_url
-from .models import Movie, Showtime, MovieGenre, Seat, Booking
-
-
+from .azure_sas import sign_poster_urls
+from .best_available import MAX_GROUP_SIZE, NoContiguousSeatsError, book_best_available
+from .booking import (
+    InvalidSeatsError, SeatsTakenError, book_seats, cancel_bookings, cancel_order, hold_seats,
+    parse_seat_ids,
+)
+from .cache import cached_schedule, schedule_version
+from .conditional import catalog_page
+from .events import SYNC, get_broker
+from .facets import filter_by_genres, genre_facets, parse_genre_ids
+from .models import Movie, Showtime, MovieGenre, Seat, SeatHold, Booking, Order
+from .pagination import InvalidCursor, keyset_page, ranked_page
+from .schedule import cinema_now, showtimes_on
+from .search import get_search_backend
+from .seatmap import SeatMap
+
+MY_BOOKINGS_PER_PAGE = 20
+
+
+@method_decorator(catalog_page, name="dispatch")
 class MovieListView(ListView):
     model = Movie
     template_name = "movies/movie_list.html"
     context_object_name = "movies"
+    paginate_by = 24
 
     def get_queryset(self):
         """
-        Return movies with optional filtering by genre and search query.
+        Return movies with optional filtering by genres and search query.
         Prefetch genres to avoid N+1 queries.
         """
         queryset = (
@@ -28,19 +51,48 @@ class MovieListView(ListView):
             .prefetch_related("genres")
             .order_by("-created_at")
         )
+
+        # Search matches before the genre filter: what the genre counts are of
+        self.matches = self.search(queryset)
         
-        # Filter by genre
-        genre_filter = self.request.GET.get('genre')
-        if genre_filter:
-            queryset = queryset.filter(genres__id=genre_filter)
-        
-        # Search by title
+        # Filter by genres: any of the selected ones, or all of them
+        return filter_by_genres(
+            self.matches,
+            parse_genre_ids(self.request.GET.getlist('genre')),
+            match_all=self.request.GET.get('genre_match') == 'all',
+        )
+
+    def search(self, queryset):
+        """Search by title and description, best matches first."""
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(title__icontains=search_query)
-        
-        # Use distinct() to avoid duplicates when filtering by genres
-        return queryset.distinct()
+            queryset = get_search_backend().search(queryset, search_query)
+        return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Keyset pagination on ``(-created_at, id)`` driven by the ``after`` /
+        ``before`` cursors instead of page numbers; search results are paged
+        the same way on ``(-rank, -created_at, id)``.
+        """
+        paginate = ranked_page if self.request.GET.get('q') else keyset_page
+        try:
+            page = paginate(
+                queryset, page_size,
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        except InvalidCursor:
+            raise Http404("Невірний курсор сторінки")
+        return None, page, page.object_list, page.has_other_pages()
+
+    def page_url(self, **cursor):
+        """Current URL (filters included) pointing at another page."""
+        params = self.request.GET.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        params.update(cursor)
+        return f"?{params.urlencode()}"
 
     def get_context_data(self, **kwargs):
         """
@@ -48,45 +100,48 @@ class MovieListView(ListView):
         """
         context = super().get_context_data(**kwargs)
         
-        # Add all genres for the filter dropdown
-        context['genres'] = MovieGenre.objects.all()
+        # Add all genres for the filter, counting the movies matching the search
+        search_query = self.request.GET.get('q')
+        context['genres'] = genre_facets(self.matches if search_query else None)
         
-        # Add current time (with timezone offset)
-        context['now'] = timezone.now() + timedelta(hours=3)
+        # Add current time in the cinema's time zone
+        context['now'] = cinema_now()
         
         # Preserve filter state for the template
-        context['genre_filter'] = self.request.GET.get('genre')
-        context['search_query'] = self.request.GET.get('q')
+        context['genre_filter'] = [str(genre_id) for genre_id in parse_genre_ids(self.request.GET.getlist('genre'))]
+        context['genre_match'] = self.request.GET.get('genre_match', 'any')
+        context['search_query'] = search_query
+
+        # Links to the neighbouring pages
+        page = context['page_obj']
+        if page.has_next():
+            context['next_page_url'] = self.page_url(after=page.next_cursor)
+        if page.has_previous():
+            context['previous_page_url'] = self.page_url(before=page.previous_cursor)
         
         # Add Azure SAS URLs if using Azure storage
         if settings.USE_AZURE_STORAGE:
-            for movie in context["movies"]:
-                if movie.image:
-                    movie.poster_url = generate_azure_read_sas_url(movie.image.name)
-                else:
-                    movie.poster_url = None
+            sign_poster_urls(context["movies"])
         
         return context
 
 
+@catalog_page
 def upcoming_showtimes(request, date_str=None):
-    now = timezone.now()+ timedelta(hours=3)
+    now = cinema_now()
     if date_str:
         selected_date = timezone.datetime.strptime(date_str, "%Y-%m-%d").date()
     else:
         selected_date = now.date()
 
-    # Вибираємо всі showtimes на певну дату і зв'язуємо з фільмами
-    showtimes = Showtime.objects.filter(
-        start_time__date=selected_date
-    ).select_related('movie', 'hall').order_by('start_time')
-
-    # Створюємо словник: movie -> list of showtimes
-    movies_dict = {}
-    for s in showtimes:
-        if s.movie not in movies_dict:
-            movies_dict[s.movie] = []
-        movies_dict[s.movie].append(s)
+    # Розклад дня (фільми з сеансами) береться з кешу
+    version = schedule_version()
+    schedule = cached_schedule(
+        f"day:{selected_date.isoformat()}",
+        lambda: _day_schedule(selected_date),
+        version,
+    )
+    movies_dict = dict(schedule)
 
     # Дні для вкладок (поточний день + наступні 6 днів)
     days = [now.date() + timezone.timedelta(days=i) for i in range(7)]
@@ -96,15 +151,38 @@ def upcoming_showtimes(request, date_str=None):
         'days': days,
         'selected_date': selected_date,
         'movies_dict': movies_dict,  # передаємо словник movie → showtimes
+        'schedule_version': version,
+        'schedule_cache_seconds': settings.SCHEDULE_CACHE_SECONDS,
     }
     return render(request, "movies/upcoming_showtimes.html", context)
 
 
+def _day_schedule(day):
+    """``[(movie, [showtimes])]`` for a cinema day, ordered by first showtime."""
+    showtimes = showtimes_on(
+        day,
+        Showtime.objects.select_related('movie', 'hall').prefetch_related('movie__genres'),
+    ).order_by('start_time')
+
+    schedule = {}
+    for s in showtimes:
+        schedule.setdefault(s.movie, []).append(s)
+    return list(schedule.items())
+
+
+@catalog_page
 def movie_detail(request, movie_id):
-    movie = get_object_or_404(Movie, id=movie_id)
+    version = schedule_version()
+    movie = cached_schedule(
+        f"movie:{movie_id}",
+        lambda: Movie.objects.prefetch_related('genres').filter(id=movie_id).first(),
+        version,
+    )
+    if movie is None:
+        raise Http404("Фільм не знайдено")
 
     # Дні для вибору у випадаючому списку (сьогодні + наступні 6 днів)
-    now = (timezone.localtime(timezone.now())+ timedelta(hours=3))
+    now = cinema_now()
     days = [now + timedelta(days=i) for i in range(7)]
 
     # Вибрана дата
@@ -115,9 +193,13 @@ def movie_detail(request, movie_id):
         selected_date = now.date()
 
     # Showtimes для обраної дати
-    showtimes = movie.showtimes.filter(
-        start_time__date=selected_date
-    ).order_by('start_time')
+    showtimes = cached_schedule(
+        f"movie:{movie_id}:{selected_date.isoformat()}",
+        lambda: list(showtimes_on(
+            selected_date, movie.showtimes.select_related('hall')
+        ).order_by('start_time')),
+        version,
+    )
 
     context = {
         'movie': movie,
@@ -125,6 +207,8 @@ def movie_detail(request, movie_id):
         'selected_date': selected_date,
         'showtimes': showtimes,
         'now': now,
+        'schedule_version': version,
+        'schedule_cache_seconds': settings.SCHEDULE_CACHE_SECONDS,
     }
     return render(request, "movies/movie_detail.html", context)
 
@@ -132,74 +216,219 @@ from django.contrib.auth.decorators import login_required
 
 @login_required
 def booking_detail(request, showtime_id):
-    showtime = get_object_or_404(Showtime, id=showtime_id)
-    hall = showtime.hall
-
-    # Формування рядів і місць
-    seat_rows = []
-    rows = [chr(65 + i) for i in range(hall.rows)]
-    for row_letter in rows:
-        row_seats = []
-        for number in range(1, hall.seats_per_row + 1):
-            seat, _ = Seat.objects.get_or_create(hall=hall, row=row_letter, number=number)
-            is_occupied = Booking.objects.filter(showtime=showtime, seat=seat).exists()
-            row_seats.append({
-                "id": seat.id,
-                "row": seat.row,
-                "number": seat.number,
-                "occupied": is_occupied
-            })
-        seat_rows.append({"row": row_letter, "seats": row_seats})
+    showtime = get_object_or_404(
+        Showtime.objects.select_related('movie', 'hall'), id=showtime_id
+    )
 
     if request.method == "POST":
-        selected_ids = request.POST.getlist("selected_seats")
-
-        for sid in selected_ids:
-            seat = Seat.objects.get(id=sid)
-            Booking.objects.create(
-                showtime=showtime,
-                seat=seat,
-                user=request.user  # ✅ нове поле
-            )
+        try:
+            if "quantity" in request.POST:
+                quantity = int(request.POST["quantity"])
+                if not 1 <= quantity <= MAX_GROUP_SIZE:
+                    raise ValueError(quantity)
+                book_best_available(showtime, request.user, quantity)
+            else:
+                seat_ids = parse_seat_ids(request.POST.getlist("selected_seats"))
+                book_seats(showtime, request.user, seat_ids)
+        except ValueError:
+            messages.error(request, f"Можна підібрати від 1 до {MAX_GROUP_SIZE} місць.")
+            return redirect("movies:booking_detail", showtime_id=showtime.id)
+        except NoContiguousSeatsError:
+            messages.error(request, "Немає стільки вільних місць поруч. Оберіть місця вручну.")
+            return redirect("movies:booking_detail", showtime_id=showtime.id)
+        except SeatsTakenError as e:
+            messages.error(request, f"Ці місця вже заброньовані: {', '.join(e.labels)}. Оберіть інші.")
+            return redirect("movies:booking_detail", showtime_id=showtime.id)
+        except InvalidSeatsError:
+            messages.error(request, "Обрані місця недоступні для цього сеансу.")
+            return redirect("movies:booking_detail", showtime_id=showtime.id)
 
         return redirect("movies:booking_success", showtime_id=showtime.id)
 
+    # Схема залу: місця та зайняті місця завантажуються двома запитами
+    seat_map = SeatMap.for_showtime(showtime, request.user)
+
     return render(request, "movies/booking_detail.html", {
         "showtime": showtime,
-        "seat_rows": seat_rows
+        "seat_rows": seat_map.rows,
+        "max_group_size": MAX_GROUP_SIZE,
     })
 
+
+@login_required
+@require_POST
+def seat_hold(request, showtime_id):
+    """Hold the currently selected seats while the user finishes checkout."""
+    showtime = get_object_or_404(Showtime, id=showtime_id)
+    try:
+        seat_ids = parse_seat_ids(request.POST.getlist("selected_seats"))
+        expires_at = hold_seats(showtime, request.user, seat_ids)
+    except SeatsTakenError as e:
+        return JsonResponse({"taken": e.seat_ids, "labels": e.labels}, status=409)
+    except InvalidSeatsError as e:
+        return JsonResponse({"invalid": e.seat_ids}, status=400)
+
+    return JsonResponse({"held": sorted(seat_ids), "expires_at": expires_at.isoformat()})
+
+
+def _seat_availability_etag(request, showtime_id):
+    """
+    The seat version plus the expiry of the next live hold to expire: the
+    map leaves a hold out as soon as it expires, before the reaper deletes
+    it and bumps the version.
+    """
+    next_expiry = Subquery(
+        SeatHold.objects.filter(showtime=OuterRef("pk"), expires_at__gt=timezone.now())
+        .order_by("expires_at")
+        .values("expires_at")[:1]
+    )
+    row = Showtime.objects.filter(id=showtime_id).values_list("seat_version", next_expiry).first()
+    if row is None:
+        return None
+    version, expires_at = row
+    if expires_at is None:
+        return f"{showtime_id}-{version}"
+    return f"{showtime_id}-{version}-{expires_at.timestamp():.6f}"
+
+
+@require_GET
+@condition(etag_func=_seat_availability_etag)
+def seat_availability(request, showtime_id):
+    """
+    Seat availability of a showtime as one bitstring per row.
+
+    The ETag comes from the showtime's seat version and next hold expiry,
+    so polls that send ``If-None-Match`` get a 304 after a single query.
+    """
+    showtime = get_object_or_404(Showtime.objects.select_related("hall"), id=showtime_id)
+    seat_map = SeatMap.for_showtime(showtime)
+    response = JsonResponse({
+        "showtime": showtime.id,
+        "version": showtime.seat_version,
+        "seats_per_row": showtime.hall.seats_per_row,
+        "rows": seat_map.encode(),
+    })
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+async def seat_events(request, showtime_id):
+    """
+    Server-sent events with seat deltas (booked / released / held) of a showtime.
+
+    Meant to be served through ASGI: every viewer keeps one connection open
+    instead of polling. Events come from the in-process broker; on each
+    heartbeat the seat version is compared as well, so changes made by other
+    processes still reach the browser as a ``sync`` event.
+    """
+    version = await Showtime.objects.filter(id=showtime_id).values_list("seat_version", flat=True).afirst()
+    if version is None:
+        raise Http404("Showtime not found")
+
+    async def stream(last_version):
+        with get_broker().subscribe(showtime_id) as subscription:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.SEAT_EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    current = await Showtime.objects.filter(id=showtime_id).values_list(
+                        "seat_version", flat=True).afirst()
+                    if current == last_version:
+                        yield ": keep-alive\n\n"
+                        continue
+                    last_version = current
+                    event = {"type": SYNC}
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    response = StreamingHttpResponse(stream(version), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 @login_required
 def my_bookings(request):
-    # Отримуємо всі бронювання поточного користувача
-    bookings = Booking.objects.filter(user=request.user).select_related('showtime', 'seat', 'showtime__movie')
-    
+    """
+    The user's upcoming and past orders, each paged on its own.
+
+    Both lists are read from the ``(user, starts_at)`` index in start order
+    (upcoming soonest first, past latest first) with the movie and hall
+    joined in and the seats prefetched, fetching only the columns the
+    template shows: a page costs the same few queries however long the
+    user's history is.
+    """
     now = timezone.now()
-    # Передамо у шаблон інформацію, чи можна скасувати бронювання
-    booking_list = []
-    for b in bookings:
-        can_cancel = b.showtime.start_time > now
-        booking_list.append({
-            'id': b.id,
-            'movie_title': b.showtime.movie.title,
-            'showtime': b.showtime.start_time,
-            'hall_name': b.showtime.hall.name, 
-            'seat': f"{b.seat.row}{b.seat.number}",
-            'can_cancel': can_cancel
-        })
-
-    return render(request, 'movies/my_bookings.html', {'bookings': booking_list})
+    orders = (
+        Order.objects
+        .filter(user=request.user)
+        .select_related('showtime__movie', 'showtime__hall')
+        .only('starts_at', 'seat_count', 'total_price', 'showtime__movie__title', 'showtime__hall__name')
+        .prefetch_related(Prefetch(
+            'bookings',
+            queryset=Booking.objects.select_related('seat').only('order', 'seat__row', 'seat__number')
+            .order_by('seat__row', 'seat__number'),
+        ))
+    )
+    upcoming = orders.filter(starts_at__gt=now).order_by('starts_at', 'id')
+    past = orders.filter(starts_at__lte=now).order_by('-starts_at', '-id')
+
+    context = {}
+    for name, queryset in (('upcoming', upcoming), ('past', past)):
+        page_kwarg = f'{name}_page'
+        page = Paginator(queryset, MY_BOOKINGS_PER_PAGE).get_page(request.GET.get(page_kwarg))
+        context[f'{name}_page'] = page
+        if page.has_next():
+            context[f'{name}_next_url'] = _page_url(request, page_kwarg, page.next_page_number())
+        if page.has_previous():
+            context[f'{name}_previous_url'] = _page_url(request, page_kwarg, page.previous_page_number())
+
+    return render(request, 'movies/my_bookings.html', context)
+
+
+def _page_url(request, page_kwarg, number):
+    """Current URL with one of its page numbers replaced."""
+    params = request.GET.copy()
+    params[page_kwarg] = number
+    return f"?{params.urlencode()}"
 
 @login_required
-def cancel_booking(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
-    if booking.showtime.start_time <= timezone.now():
+def cancel_booking(request, order_id):
+    """Cancel one of the user's upcoming orders with all its seats."""
+    order = get_object_or_404(Order.objects.only('showtime', 'starts_at'), id=order_id, user=request.user)
+    if order.starts_at <= timezone.now():
         messages.warning(request, "Це бронювання вже відбулося, його не можна скасувати.")
     else:
-        booking.delete()
+        cancel_order(order)
         messages.success(request, "Бронювання успішно скасоване.")
     return redirect('movies:my_bookings')
 
+
+@login_required
+@require_POST
+def cancel_selected_bookings(request):
+    """
+    Cancel several of the user's upcoming seats (``booking``) and/or all of
+    their seats for whole showtimes (``showtime``) in one go.
+    """
+    released = cancel_bookings(
+        request.user,
+        booking_ids=_parse_ids(request.POST.getlist("booking")),
+        showtime_ids=_parse_ids(request.POST.getlist("showtime")),
+    )
+    cancelled = sum(len(seat_ids) for seat_ids in released.values())
+    if cancelled:
+        messages.success(request, f"Скасовано місць: {cancelled}.")
+    else:
+        messages.warning(request, "Немає бронювань, які можна скасувати.")
+    return redirect('movies:my_bookings')
+
+
+def _parse_ids(raw_ids):
+    """Ids from a form; blanks and garbage are ignored."""
+    return sorted({int(raw) for raw in raw_ids if raw.isdigit()})
+
     
 def booking_success(request, showtime_id):
     showtime = get_object_or_404(Showtime, id=showtime_id)